@@ -144,6 +144,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@gpms.edu.ye'
 
+# صندوق البريد الصادر: حجم الدفعة، عدد المحاولات، وتأخير إعادة المحاولة الأولى
+# بالثواني (يتضاعف مع كل محاولة)، ومدة حجز الدفعة قبل أن تعود لعامل آخر
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 300
+
 # -------------------------
 # CORS
 # -------------------------
@@ -173,6 +180,22 @@ CHANNEL_LAYERS = {
     },
 }
 
+# عدد المستلمين الذي تُرسل بعده رسالة مزامنة واحدة لجميع المتصلين بدلاً من رسالة لكل مستلم
+REALTIME_PING_MAX_RECIPIENTS = 200
+
+# -------------------------
+# CACHE
+# -------------------------
+# cache مشترك بين جميع العمليات (gunicorn/daphne/celery) حتى يصل إبطال
+# الصلاحيات وخيارات الفلترة إلى كل العمليات وليس إلى العملية المعدِّلة فقط
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+        'KEY_PREFIX': 'graduation_projects',
+    }
+}
+
 # -------------------------
 # SERIALIZERS
 # -------------------------
@@ -180,6 +203,39 @@ REST_AUTH_SERIALIZERS = {
     'USER_DETAILS_SERIALIZER': 'core.serializers.UserSerializer'
 }
 
+# -------------------------
+# PERMISSION CACHE
+# -------------------------
+# الـ cache المستخدم للصلاحيات (يجب أن يكون مشتركاً بين العمليات مثل CACHES['default'])
+PERMISSION_CACHE_ALIAS = 'default'
+PERMISSION_CACHE_TIMEOUT = 300
+
+# مدة صلاحية خيارات فلترة المشاريع (تُبطل تلقائياً عند تعديل البيانات)
+FILTER_OPTIONS_CACHE_TIMEOUT = 600
+
+# -------------------------
+# NOTIFICATION RETENTION
+# -------------------------
+# حذف الإشعارات القديمة على دفعات صغيرة مع توقف بين الدفعات (بالثواني)
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATION_PURGE_BATCH_SIZE = 1000
+NOTIFICATION_PURGE_PAUSE = 0.5
+# الإشعارات المقروءة الأقدم من هذا تُنقل إلى جدول الأرشيف
+NOTIFICATION_ARCHIVE_DAYS = 30
+# تجميع التذكيرات في إشعار ملخص واحد لكل مستلم في كل نافذة (بالساعات)
+REMINDER_DIGEST_ENABLED = True
+REMINDER_DIGEST_WINDOW_HOURS = 24
+
+# -------------------------
+# SCHEDULER
+# -------------------------
+# عقد قيادة الجدولة: تجديد كل HEARTBEAT ثانية، وتستولي عملية احتياطية
+# على القيادة إذا لم يُجدد خلال TTL ثانية
+SCHEDULER_LEASE_TTL = 60
+SCHEDULER_LEASE_HEARTBEAT = 15
+# مدة الاحتفاظ بسجل تشغيل المهام (بالأيام)
+JOB_RUN_RETENTION_DAYS = 30
+
 # -------------------------
 # CELERY
 # -------------------------
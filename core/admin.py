@@ -7,7 +7,7 @@ from .models import (
     User, Project, Group, Notification, AcademicAffiliation,
     GroupMembers, GroupSupervisors, Role, Permission, RolePermission,
     UserRoles, GroupInvitation, ApprovalRequest, NotificationLog,
-    SystemSettings, ApprovalSequence
+    SystemSettings, ApprovalSequence, EmailOutbox, JobRun
 )
 
 
@@ -178,6 +178,14 @@ class NotificationLogAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'read_at')
 
 
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('outbox_id', 'recipient_email', 'subject', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status',)
+    search_fields = ('recipient_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('not_ID', 'user', 'state', 'date')
@@ -216,6 +224,18 @@ class SystemSettingsAdmin(admin.ModelAdmin):
     readonly_fields = ('updated_at',)
 
 
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('run_id', 'job_name', 'source', 'status', 'started_at', 'duration_ms', 'rows_processed', 'worker')
+    list_filter = ('status', 'source', 'job_name')
+    search_fields = ('job_name', 'worker', 'error')
+    date_hierarchy = 'started_at'
+    readonly_fields = [field.name for field in JobRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ApprovalSequence)
 class ApprovalSequenceAdmin(admin.ModelAdmin):
     list_display = ('sequence_id', 'sequence_type', 'approval_levels')
@@ -0,0 +1,398 @@
+# core/approval_workflow.py
+
+from collections import namedtuple
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import (
+    ApprovalRequest, ApprovalSequence, AcademicAffiliation, UserRoles, Role,
+    Department, College, Branch
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# 1. فهرس التسلسلات والموافقين
+# ==============================================================================
+# تسلسلات ApprovalSequence وأصحاب المناصب (رئيس القسم، العميد، رئيس الجامعة)
+# تُترجم مرة واحدة داخل العملية إلى فهرس، فيصبح نقل الطلب إلى المستوى التالي بحثاً
+# في الذاكرة ثم UPDATE واحد. الإبطال برقم إصدار في الـ cache مثل permission_cache.
+
+# مقدم الطلب نفسه (مقترح المشروع يبدأ بتأكيد الطالب ثم ينتقل إلى المشرف)
+LEVEL_REQUESTER = 0
+LEVEL_SUPERVISOR = 1
+LEVEL_DEPARTMENT_HEAD = 2
+LEVEL_DEAN = 3
+LEVEL_PRESIDENT = 4
+
+# مستوى كل دور (أسماء الأدوار تُقارن بحروف صغيرة)
+ROLE_LEVELS = {
+    'supervisor': LEVEL_SUPERVISOR,
+    'co-supervisor': LEVEL_SUPERVISOR,
+    'department head': LEVEL_DEPARTMENT_HEAD,
+    'dean': LEVEL_DEAN,
+    'university president': LEVEL_PRESIDENT,
+}
+
+# التسلسلات المستخدمة إذا لم يُعرّف النوع في ApprovalSequence
+DEFAULT_SEQUENCES = {
+    'single_department': (1,),  # المشرف فقط
+    'multi_department': (1, 2),  # المشرف + رئيس القسم
+    'multi_college': (1, 2, 3, 4),  # المشرف + رئيس القسم + العميد + رئيس الجامعة
+    'external': (1, 2),  # المشرف + رئيس القسم
+    'government': (1, 2, 3, 4),  # تسلسل كامل
+}
+DEFAULT_SEQUENCE_TYPE = 'multi_department'
+
+VERSION_KEY = 'core:approval_workflow:version'
+
+# الوحدة الأكاديمية لمستخدم أو طلب
+Unit = namedtuple('Unit', ['department_id', 'college_id', 'university_id'])
+
+
+class WorkflowIndex:
+    """
+    التسلسلات، وحدة كل صاحب دور موافقة، وصاحب كل منصب لكل وحدة
+    """
+
+    __slots__ = ('sequences', 'user_units', 'college_units', 'department_units', 'holders')
+
+    def __init__(self, sequences, user_units, college_units, department_units, holders):
+        self.sequences = sequences
+        self.user_units = user_units
+        self.college_units = college_units
+        self.department_units = department_units
+        # {المستوى: {معرف الوحدة: معرف المستخدم}}
+        self.holders = holders
+
+    def get_sequence(self, sequence_type):
+        return self.sequences.get(sequence_type) or DEFAULT_SEQUENCES.get(sequence_type) or DEFAULT_SEQUENCES[DEFAULT_SEQUENCE_TYPE]
+
+    def unit_of(self, user_id):
+        return self.user_units.get(user_id)
+
+    def unit_of_college(self, college_id):
+        return self.college_units.get(college_id)
+
+    def unit_of_department(self, department_id):
+        return self.department_units.get(department_id)
+
+    def approver_for(self, level, unit):
+        """
+        صاحب منصب المستوى في وحدة معينة (None إذا لم يوجد)
+        المشرف ليس منصباً في الوحدة بل يخص الطلب نفسه: انظر get_request_supervisor
+        """
+        if unit is None:
+            return None
+        key = {
+            LEVEL_DEPARTMENT_HEAD: unit.department_id,
+            LEVEL_DEAN: unit.college_id,
+            LEVEL_PRESIDENT: unit.university_id,
+        }.get(level)
+        return self.holders.get(level, {}).get(key)
+
+
+# (الإصدار, الفهرس) - يُستبدل كاملاً عند إعادة البناء
+_compiled = (None, None)
+
+
+def _backend():
+    return caches[getattr(settings, 'PERMISSION_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300)
+
+
+def _current_version():
+    backend = _backend()
+    version = backend.get(VERSION_KEY)
+    if version is None:
+        backend.add(VERSION_KEY, uuid4().hex, _timeout())
+        version = backend.get(VERSION_KEY)
+    return version
+
+
+def _approver_roles_q():
+    # أدوار الموافقة فقط، بدون حساسية لحالة الأحرف كما في ROLE_LEVELS
+    condition = models.Q()
+    for role_type in ROLE_LEVELS:
+        condition |= models.Q(user__userroles__role__type__iexact=role_type)
+    return condition
+
+
+def _build_index():
+    """
+    بناء الفهرس بأربعة استعلامات مهما كان عدد الطلبات والمستخدمين
+    """
+    sequences = {}
+    for sequence_type, levels in ApprovalSequence.objects.values_list('sequence_type', 'approval_levels'):
+        try:
+            sequences[sequence_type] = tuple(sorted(int(level) for level in levels))
+        except (TypeError, ValueError):
+            logger.warning(f"⚠ تسلسل موافقات غير صالح ({sequence_type}): {levels}")
+
+    college_universities = dict(College.objects.values_list('cid', 'branch__university_id'))
+    department_colleges = dict(Department.objects.values_list('department_id', 'college_id'))
+    college_units = {
+        college_id: Unit(None, college_id, university_id)
+        for college_id, university_id in college_universities.items()
+    }
+    department_units = {
+        department_id: Unit(department_id, college_id, college_universities.get(college_id))
+        for department_id, college_id in department_colleges.items()
+    }
+
+    # أصحاب أدوار الموافقة مع انتمائهم الساري باستعلام واحد (الأحدث يغلب)
+    rows = AcademicAffiliation.objects.current().filter(_approver_roles_q()).values_list(
+        'user_id', 'user__userroles__role__type', 'department_id', 'college_id', 'university_id'
+    )
+    role_levels, user_units = {}, {}
+    for user_id, role_type, department_id, college_id, university_id in rows:
+        level = ROLE_LEVELS.get((role_type or '').strip().lower())
+        if level is not None:
+            role_levels.setdefault(user_id, set()).add(level)
+        if user_id not in user_units:
+            college_id = college_id or department_colleges.get(department_id)
+            university_id = college_universities.get(college_id) or university_id
+            user_units[user_id] = Unit(department_id, college_id, university_id)
+
+    holders = {LEVEL_DEPARTMENT_HEAD: {}, LEVEL_DEAN: {}, LEVEL_PRESIDENT: {}}
+    for user_id, levels in role_levels.items():
+        unit = user_units[user_id]
+        for level in levels:
+            key = {
+                LEVEL_DEPARTMENT_HEAD: unit.department_id,
+                LEVEL_DEAN: unit.college_id,
+                LEVEL_PRESIDENT: unit.university_id,
+            }.get(level)
+            if key is not None:
+                holders[level].setdefault(key, user_id)
+
+    return WorkflowIndex(sequences, user_units, college_units, department_units, holders)
+
+
+def get_index():
+    """
+    الحصول على الفهرس المترجم (يُعاد بناؤه فقط عند تغير رقم الإصدار)
+    """
+    global _compiled
+    version = _current_version()
+    compiled_version, index = _compiled
+    if compiled_version != version or index is None:
+        index = _build_index()
+        _compiled = (version, index)
+    return index
+
+
+def invalidate():
+    """
+    إبطال الفهرس في جميع العمليات بعد نجاح الـ transaction الحالية
+    """
+    def _invalidate():
+        global _compiled
+        _backend().set(VERSION_KEY, uuid4().hex, _timeout())
+        _compiled = (None, None)
+    transaction.on_commit(_invalidate)
+
+
+# ==============================================================================
+# 2. نقل الطلبات بين المستويات
+# ==============================================================================
+
+def get_sequence_type(approval):
+    """
+    نوع التسلسل المطبق على طلب موافقة
+    """
+    if approval.approval_type == 'external_project':
+        return 'external'
+    if approval.project_id and approval.project.type == 'Government':
+        return 'government'
+    return DEFAULT_SEQUENCE_TYPE
+
+
+def _requested_department(approval):
+    """
+    القسم المحفوظ في بيانات طلب إنشاء المجموعة (GroupCreateSerializer)
+    """
+    try:
+        return int(approval.request_data['department_id'])
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+def get_request_supervisor(approval, index=None):
+    """
+    مشرف الطلب: مشرف المجموعة (الأساسي قبل المشارك)، وإلا أول مشرف مطلوب في بيانات
+    طلب إنشاء المجموعة بشرط أن يكون صاحب دور موافقة بانتماء ساري
+    """
+    if approval.group_id:
+        supervisors = sorted(approval.group.groupsupervisors_set.all(), key=lambda supervisor: supervisor.type != 'supervisor')
+        if supervisors:
+            return supervisors[0].user_id
+    index = index or get_index()
+    data = approval.request_data or {}
+    for key in ('supervisor_ids', 'co_supervisor_ids'):
+        for user_id in data.get(key) or []:
+            if index.unit_of(user_id) is not None:
+                return user_id
+    return None
+
+
+def get_request_unit(approval, index=None):
+    """
+    الوحدة الأكاديمية للطلب: وحدة موافقه الحالي إذا كان صاحب دور موافقة، وإلا (الطالب
+    مقدم الطلب مثلاً) القسم المطلوب، ثم وحدة مشرف المجموعة، ثم كلية المشروع
+    """
+    index = index or get_index()
+    unit = index.unit_of(approval.current_approver_id)
+    if unit is None:
+        department_id = _requested_department(approval)
+        unit = index.unit_of_department(department_id) if department_id else None
+    if unit is None and approval.group_id:
+        for supervisor in approval.group.groupsupervisors_set.all():
+            unit = index.unit_of(supervisor.user_id)
+            if unit is not None:
+                break
+    if unit is None and approval.project_id and approval.project.college_id:
+        unit = index.unit_of_college(approval.project.college_id)
+    return unit
+
+
+def get_next_step(approval, index=None):
+    """
+    المستوى التالي لطلب وموافقه، مع تخطي المستويات التي ليس لها صاحب في وحدة الطلب
+
+    Returns:
+        tuple: (المستوى, معرف الموافق)، أو (None, None) إذا لم يبق مستوى له موافق
+               فيُعتمد الطلب نهائياً كما كان قبل تسلسل المستويات
+    """
+    index = index or get_index()
+    unit = get_request_unit(approval, index)
+    for level in index.get_sequence(get_sequence_type(approval)):
+        if level <= approval.approval_level:
+            continue
+        if level == LEVEL_SUPERVISOR:
+            approver_id = get_request_supervisor(approval, index)
+        else:
+            approver_id = index.approver_for(level, unit)
+        if approver_id is not None and approver_id != approval.current_approver_id:
+            return level, approver_id
+        logger.warning(f"⚠ لا يوجد موافق للمستوى {level} في الطلب {approval.approval_id}، تخطي المستوى")
+    return None, None
+
+
+def approve(approvals, approver, comments=None):
+    """
+    موافقة الموافق الحالي على مجموعة طلبات معلقة: كل طلب ينتقل إلى المستوى التالي
+    في تسلسله أو يُعتمد نهائياً، بـ UPDATE شرطي واحد للمجموعة كلها
+
+    Args:
+        approvals: طلبات محملة (ويُفضل مقفلة) موافقها الحالي approver وحالتها pending
+        approver: الموافق
+        comments: تعليقات (اختياري)
+
+    Returns:
+        dict: {approval_id: approved | advanced | conflict}
+    """
+    from .notification_manager import ApprovalNotificationManager
+
+    approvals = list(approvals)
+    models.prefetch_related_objects(approvals, 'project', 'requested_by', 'group__groupsupervisors_set')
+    index = get_index()
+    now = timezone.now()
+
+    outcomes, final, advanced, steps = {}, [], [], {}
+    level_cases, approver_cases = [], []
+    for approval in approvals:
+        level, next_approver_id = get_next_step(approval, index)
+        steps[approval.approval_id] = (level, next_approver_id)
+        if level is None:
+            outcomes[approval.approval_id] = 'approved'
+            final.append(approval)
+        else:
+            outcomes[approval.approval_id] = 'advanced'
+            advanced.append(approval)
+            level_cases.append(When(approval_id=approval.approval_id, then=Value(level)))
+            approver_cases.append(When(approval_id=approval.approval_id, then=Value(next_approver_id)))
+
+    if not approvals:
+        return outcomes
+
+    changes = {'updated_at': now}
+    if comments is not None:
+        changes['comments'] = comments
+    final_ids = [approval.approval_id for approval in final]
+    advanced_ids = [approval.approval_id for approval in advanced]
+    if final_ids:
+        changes['status'] = Case(When(approval_id__in=final_ids, then=Value('approved')), default=F('status'))
+        changes['approved_at'] = Case(When(approval_id__in=final_ids, then=Value(now)), default=F('approved_at'))
+    if advanced_ids:
+        changes['approval_level'] = Case(*level_cases, default=F('approval_level'))
+        changes['current_approver_id'] = Case(
+            *approver_cases,
+            default=F('current_approver_id'),
+            output_field=ApprovalRequest._meta.get_field('current_approver').target_field
+        )
+        # الموافق الجديد يُذكَّر من جديد
+        changes['last_reminded_at'] = Case(
+            When(approval_id__in=advanced_ids, then=Value(None)),
+            default=F('last_reminded_at'),
+            output_field=models.DateTimeField()
+        )
+
+    with transaction.atomic():
+        updated = ApprovalRequest.objects.filter(
+            approval_id__in=final_ids + advanced_ids,
+            current_approver=approver,
+            status='pending'
+        ).update(**changes)
+        if updated != len(final_ids) + len(advanced_ids):
+            # طلب آخر بت في بعض الصفوف بين القراءة والتحديث (الصفوف لم تُقفل): تراجع كامل
+            transaction.set_rollback(True)
+            for approval_id in final_ids + advanced_ids:
+                outcomes[approval_id] = 'conflict'
+            return outcomes
+
+        for approval in final:
+            approval.status = 'approved'
+            approval.approved_at = now
+        for approval in advanced:
+            approval.approval_level, approval.current_approver_id = steps[approval.approval_id]
+            approval.last_reminded_at = None
+        for approval in final + advanced:
+            approval.updated_at = now
+            if comments is not None:
+                approval.comments = comments
+
+        ApprovalNotificationManager.notify_approvals_decided(final, approver, 'approved')
+        ApprovalNotificationManager.notify_approvals_forwarded(advanced)
+    return outcomes
+
+
+# ==============================================================================
+# 3. إبطال الفهرس عند تعديل البيانات
+# ==============================================================================
+
+@receiver(post_save, sender=ApprovalSequence)
+@receiver(post_delete, sender=ApprovalSequence)
+@receiver(post_save, sender=UserRoles)
+@receiver(post_delete, sender=UserRoles)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=AcademicAffiliation)
+@receiver(post_delete, sender=AcademicAffiliation)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+@receiver(post_save, sender=Branch)
+def handle_workflow_change(sender, **kwargs):
+    invalidate()
+    logger.debug(f"تم إبطال فهرس الموافقات بعد تعديل {sender.__name__}")
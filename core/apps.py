@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # تسجيل معالجات إبطال الـ cache ونشر الإشعارات
+        from . import permission_cache, filter_options, realtime, notification_counters, approval_workflow  # noqa: F401
@@ -5,6 +5,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import NotificationLog, User
 from .serializers import NotificationLogSerializer
+from .notification_manager import NotificationManager
+from .realtime import BROADCAST_GROUP
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -31,6 +33,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(BROADCAST_GROUP, self.channel_name)
         
         await self.accept()
         print(f"المستخدم {self.user.username} متصل بـ WebSocket")
@@ -44,6 +47,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.room_group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_discard(BROADCAST_GROUP, self.channel_name)
         print(f"المستخدم {self.user.username} قطع الاتصال")
     
     async def receive(self, text_data):
@@ -71,42 +75,25 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 'message': 'خطأ في صيغة البيانات'
             }))
     
-    async def notification_message(self, event):
+    async def notification_sync(self, event):
         """
-        استقبال إشعار من المجموعة وإرساله للعميل
+        استقبال تنبيه بوجود إشعارات جديدة وإبلاغ العميل ليجلبها من نقطة المزامنة
         """
-        notification_data = event['notification']
-        
-        await self.send(text_data=json.dumps({
-            'type': 'notification',
-            'notification': notification_data
-        }))
+        await self.send(text_data=json.dumps({'type': 'sync'}))
     
     @database_sync_to_async
     def mark_notification_as_read(self, notification_id):
         """
         تحديد إشعار كمقروء
         """
-        try:
-            notification = NotificationLog.objects.get(
-                notification_id=notification_id,
-                recipient=self.user
-            )
-            notification.is_read = True
-            notification.save()
-            return True
-        except NotificationLog.DoesNotExist:
-            return False
+        return NotificationManager.mark_as_read(notification_id, self.user)
     
     @database_sync_to_async
     def get_unread_count(self):
         """
         الحصول على عدد الإشعارات غير المقروءة
         """
-        return NotificationLog.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).count()
+        return NotificationManager.get_unread_count(self.user)
 
 
 class ApprovalConsumer(AsyncWebsocketConsumer):
@@ -0,0 +1,186 @@
+# core/email_outbox.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection, EmailMessage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import EmailOutbox, NotificationLog, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# 1. صندوق البريد الصادر
+# ==============================================================================
+# الطلب الذي ينشئ الإشعار لا ينتظر SMTP: يكتب صف EmailOutbox في نفس الـ transaction،
+# فيظهر للعمال عند نجاحها فقط. العامل (مهمة Celery أو الجدولة أو أمر الإدارة) يحجز
+# دفعة، يرسلها عبر اتصال بريد واحد، ثم يحدّث الحالة و is_sent_email دفعة واحدة.
+# الفشل يُعاد لاحقاً بتأخير يتضاعف حتى EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def build_email(notification):
+    subject = f"[{notification.get_notification_type_display()}] {notification.title}"
+    created_at = notification.created_at or timezone.now()
+    body = f"{notification.message}\n\nتم الإرسال في: {created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+    return subject, body
+
+
+def enqueue(notifications):
+    """
+    إضافة بريد مجموعة إشعارات إلى الصندوق
+
+    Returns:
+        list: صفوف EmailOutbox المنشأة
+    """
+    notifications = list(notifications)
+    # بريد المستلمين باستعلام واحد بدلاً من notification.recipient لكل إشعار
+    emails = dict(User.objects.filter(
+        pk__in={n.recipient_id for n in notifications if n.recipient_id}
+    ).values_list('id', 'email'))
+
+    entries = []
+    for notification in notifications:
+        email = emails.get(notification.recipient_id)
+        if not email:
+            continue
+        subject, body = build_email(notification)
+        entries.append(EmailOutbox(
+            notification_id=notification.pk,
+            recipient_email=email,
+            subject=subject[:255],
+            body=body,
+        ))
+    return EmailOutbox.objects.bulk_create(entries)
+
+
+def enqueue_email(subject, body, recipient_email):
+    """
+    إضافة بريد مستقل (غير مرتبط بإشعار) إلى الصندوق
+    """
+    return EmailOutbox.objects.create(subject=subject[:255], body=body, recipient_email=recipient_email)
+
+
+# ==============================================================================
+# 2. الإرسال على دفعات
+# ==============================================================================
+
+def claim_batch(batch_size):
+    """
+    حجز دفعة من الرسائل المستحقة بتأجيل موعدها مدة الحجز
+    إذا توقف العامل أثناء الإرسال تعود الرسائل تلقائياً بعد انتهاء المدة
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+            status='pending',
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'outbox_id')[:batch_size])
+        if batch:
+            EmailOutbox.objects.filter(outbox_id__in=[entry.outbox_id for entry in batch]).update(
+                next_attempt_at=now + timedelta(seconds=_setting('EMAIL_OUTBOX_LEASE', 300))
+            )
+    return batch
+
+
+def send_batch(batch, connection):
+    """
+    إرسال دفعة عبر اتصال مفتوح
+
+    Returns:
+        tuple: (المرسلة، [(الفاشلة، سبب الفشل)])
+    """
+    sent, failed = [], []
+    for entry in batch:
+        message = EmailMessage(
+            entry.subject,
+            entry.body,
+            settings.DEFAULT_FROM_EMAIL,
+            [entry.recipient_email],
+            connection=connection,
+        )
+        try:
+            message.send()
+            sent.append(entry)
+        except Exception as e:
+            failed.append((entry, str(e)))
+    return sent, failed
+
+
+def record_results(sent, failed):
+    """
+    تحديث نتائج الدفعة باستعلامات جماعية
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if sent:
+            EmailOutbox.objects.filter(outbox_id__in=[entry.outbox_id for entry in sent]).update(
+                status='sent',
+                sent_at=now,
+                attempts=F('attempts') + 1,
+                last_error=''
+            )
+            notification_ids = [entry.notification_id for entry in sent if entry.notification_id]
+            if notification_ids:
+                NotificationLog.objects.filter(notification_id__in=notification_ids).update(is_sent_email=True)
+
+        if failed:
+            max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+            retry_delay = _setting('EMAIL_OUTBOX_RETRY_DELAY', 60)
+            for entry, error in failed:
+                entry.attempts += 1
+                entry.last_error = error
+                if entry.attempts >= max_attempts:
+                    entry.status = 'failed'
+                else:
+                    entry.next_attempt_at = now + timedelta(seconds=retry_delay * 2 ** (entry.attempts - 1))
+            EmailOutbox.objects.bulk_update(
+                [entry for entry, _ in failed],
+                ['attempts', 'last_error', 'status', 'next_attempt_at']
+            )
+
+
+def drain(batch_size=None, max_batches=None):
+    """
+    إرسال الرسائل المستحقة دفعة بعد دفعة عبر اتصال بريد واحد
+
+    Returns:
+        dict: sent، failed، batches
+    """
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    totals = {'sent': 0, 'failed': 0, 'batches': 0}
+    connection = None
+    try:
+        while max_batches is None or totals['batches'] < max_batches:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            if connection is None:
+                try:
+                    connection = get_connection()
+                    connection.open()
+                except Exception as e:
+                    # خادم البريد غير متاح: تُحسب محاولة فاشلة للدفعة كلها وتُعاد لاحقاً
+                    connection = None
+                    record_results([], [(entry, str(e)) for entry in batch])
+                    totals['failed'] += len(batch)
+                    totals['batches'] += 1
+                    break
+
+            sent, failed = send_batch(batch, connection)
+            record_results(sent, failed)
+            totals['sent'] += len(sent)
+            totals['failed'] += len(failed)
+            totals['batches'] += 1
+    finally:
+        if connection is not None:
+            connection.close()
+
+    if totals['batches']:
+        logger.info(f"✓ البريد الصادر: أُرسل {totals['sent']}، فشل {totals['failed']}")
+    return totals
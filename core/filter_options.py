@@ -0,0 +1,97 @@
+# core/filter_options.py
+
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import ExtractYear
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User, Project, College, GroupSupervisors
+
+# ==============================================================================
+# 1. خيارات فلترة المشاريع المخزنة مؤقتاً
+# ==============================================================================
+# تُبنى الخيارات مرة واحدة وتُحفظ مع رقم الإصدار الذي بُنيت عليه. أي تعديل على
+# المشاريع أو الكليات أو المشرفين يغيّر رقم الإصدار بعد نجاح الـ transaction،
+# فتُعتبر النسخة المحفوظة قديمة وتُعاد بناؤها عند أول قراءة.
+
+VERSION_KEY = 'core:filter_options:version'
+PAYLOAD_KEY = 'core:filter_options:payload'
+
+# الحقول التي تؤثر على أسماء المشرفين المعروضة
+SUPERVISOR_NAME_FIELDS = {'first_name', 'last_name'}
+
+
+def _timeout():
+    return getattr(settings, 'FILTER_OPTIONS_CACHE_TIMEOUT', 600)
+
+
+def build_filter_options():
+    """
+    بناء خيارات الفلترة من قاعدة البيانات
+    """
+    colleges = College.objects.values('cid', 'name_ar')
+    college_list = [{"id": c['cid'], "name": c['name_ar']} for c in colleges]
+
+    active_supervisors = User.objects.filter(groupsupervisors__isnull=False).distinct().values('id', 'first_name', 'last_name')
+    supervisor_list = [{"id": s['id'], "name": f"{s['first_name']} {s['last_name']}".strip() or "Unnamed Supervisor"} for s in active_supervisors]
+
+    years_qs = Project.objects.annotate(year=ExtractYear('start_date')).values_list('year', flat=True).distinct().order_by('-year')
+    years = [str(int(y)) for y in years_qs if y is not None]
+
+    return {
+        "colleges": college_list,
+        "supervisors": supervisor_list,
+        "years": years if years else ["2025"],
+        "types": list(Project.objects.values_list('type', flat=True).distinct()),
+        "states": list(Project.objects.values_list('state', flat=True).distinct())
+    }
+
+
+def get_filter_options():
+    """
+    الحصول على خيارات الفلترة (قراءة واحدة من الـ cache عندما تكون النسخة المحفوظة حديثة)
+    """
+    cached = cache.get_many([VERSION_KEY, PAYLOAD_KEY])
+    version = cached.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    payload = cached.get(PAYLOAD_KEY)
+    if payload and payload['version'] == version:
+        return payload['data']
+
+    data = build_filter_options()
+    cache.set(PAYLOAD_KEY, {'version': version, 'data': data}, _timeout())
+    return data
+
+
+def invalidate_filter_options():
+    """
+    تغيير رقم الإصدار بعد نجاح الـ transaction الحالية
+    """
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid4().hex, None))
+
+
+# ==============================================================================
+# 2. إبطال الخيارات عند تعديل البيانات
+# ==============================================================================
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+@receiver(post_save, sender=GroupSupervisors)
+@receiver(post_delete, sender=GroupSupervisors)
+def handle_filter_options_change(sender, **kwargs):
+    invalidate_filter_options()
+
+
+@receiver(post_save, sender=User)
+def handle_supervisor_name_change(sender, instance, created, update_fields=None, **kwargs):
+    # حفظ last_login عند كل تسجيل دخول لا يغيّر الأسماء
+    if created or (update_fields is not None and not SUPERVISOR_NAME_FIELDS & set(update_fields)):
+        return
+    invalidate_filter_options()
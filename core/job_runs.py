@@ -0,0 +1,120 @@
+# core/job_runs.py
+
+import functools
+import os
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+from .models import JobRun
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+# التشغيل الحالي حتى تسجل المهمة عدد الصفوف دون تمرير الكائن عبر الدوال
+_current_run = ContextVar('current_job_run', default=None)
+
+
+# ==============================================================================
+# 1. تسجيل التشغيل
+# ==============================================================================
+
+@contextmanager
+def track(job_name, source):
+    """
+    تسجيل تشغيل مهمة: البداية، النهاية، المدة، عدد الصفوف، الخطأ والعامل
+
+    Args:
+        job_name: اسم المهمة
+        source: scheduler أو celery
+    """
+    run = JobRun.objects.create(job_name=job_name, source=source, worker=WORKER)
+    token = _current_run.set(run)
+    started = time.monotonic()
+    try:
+        yield run
+    except Exception as e:
+        run.status = 'failed'
+        run.error = str(e)
+        raise
+    else:
+        if run.status == 'running':
+            run.status = 'success'
+    finally:
+        _current_run.reset(token)
+        run.finished_at = timezone.now()
+        run.duration_ms = int((time.monotonic() - started) * 1000)
+        try:
+            run.save(update_fields=['status', 'finished_at', 'duration_ms', 'rows_processed', 'error'])
+        except Exception as e:
+            # فشل التسجيل لا يُفشل المهمة نفسها
+            logger.error(f"✗ خطأ في تسجيل تشغيل {job_name}: {str(e)}")
+
+
+def tracked(source):
+    """
+    مُزخرف يسجل كل تشغيل للدالة باسمها
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(func.__name__, source):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_rows(count):
+    """
+    تسجيل عدد الصفوف التي عالجها التشغيل الحالي (لا شيء خارج track)
+    """
+    run = _current_run.get()
+    if run is not None:
+        run.rows_processed = count
+
+
+def record_error(error):
+    """
+    تعليم التشغيل الحالي بالفشل عندما تلتقط المهمة الاستثناء بنفسها
+    """
+    run = _current_run.get()
+    if run is not None:
+        run.status = 'failed'
+        run.error = str(error)
+
+
+# ==============================================================================
+# 2. الإحصائيات والتنظيف
+# ==============================================================================
+
+def get_summary(days=7):
+    """
+    ملخص أداء كل مهمة خلال آخر days يوم
+
+    Returns:
+        list: عدد التشغيلات، الفاشلة، متوسط وأقصى مدة، إجمالي الصفوف، وآخر تشغيل
+    """
+    since = timezone.now() - timedelta(days=days)
+    return list(JobRun.objects.filter(started_at__gte=since).values('job_name').annotate(
+        runs=Count('run_id'),
+        failures=Count('run_id', filter=Q(status='failed')),
+        avg_duration_ms=Avg('duration_ms'),
+        max_duration_ms=Max('duration_ms'),
+        rows_processed=Sum('rows_processed'),
+        last_started_at=Max('started_at'),
+    ).order_by('job_name'))
+
+
+def prune(days=None):
+    """
+    حذف سجلات التشغيل الأقدم من JOB_RUN_RETENTION_DAYS
+    """
+    days = days or getattr(settings, 'JOB_RUN_RETENTION_DAYS', 30)
+    deleted, _ = JobRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
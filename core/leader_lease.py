@@ -0,0 +1,110 @@
+# core/leader_lease.py
+
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import SchedulerLease
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# عقد القيادة
+# ==============================================================================
+# كل عملية تشغّل الجدولة تحاول تجديد العقد كل SCHEDULER_LEASE_HEARTBEAT ثانية.
+# التجديد والاستيلاء تحديثان شرطيان (UPDATE ... WHERE holder = أنا أو انتهى العقد)
+# فتنجح عملية واحدة فقط حتى في SQLite و MySQL بدون أقفال صريحة. إذا توقفت القائدة
+# عن التجديد تستولي عملية احتياطية على العقد بعد انتهاء SCHEDULER_LEASE_TTL.
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LeaderLease:
+    """
+    عقد قيادة قائم على صف في قاعدة البيانات مع نبض ومهلة استيلاء
+    """
+
+    def __init__(self, name, holder=None, ttl=None):
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = timedelta(seconds=ttl or _setting('SCHEDULER_LEASE_TTL', 60))
+        # حد محلي (ساعة العملية) تتوقف بعده القائدة عن التنفيذ إذا تعذر التجديد،
+        # قبل أن تتمكن عملية أخرى من الاستيلاء
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self):
+        return time.monotonic() < self._valid_until
+
+    def heartbeat(self):
+        """
+        تجديد العقد أو الاستيلاء عليه إذا انتهى
+
+        Returns:
+            bool: هل هذه العملية هي القائدة
+        """
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = self._renew() or self._take_over() or self._create()
+        except Exception as e:
+            logger.error(f"✗ خطأ في تجديد عقد القيادة {self.name}: {str(e)}")
+            acquired = False
+
+        if acquired:
+            self._valid_until = started + self.ttl.total_seconds()
+            if not was_leader:
+                logger.info(f"✓ {self.holder} أصبحت قائدة {self.name}")
+        elif was_leader:
+            self._valid_until = 0.0
+            logger.warning(f"⚠ {self.holder} فقدت قيادة {self.name}")
+        return acquired
+
+    def release(self):
+        """
+        التنازل عن العقد حتى تستولي عليه عملية أخرى فوراً
+        """
+        if not self.is_leader:
+            return
+        self._valid_until = 0.0
+        SchedulerLease.objects.filter(name=self.name, holder=self.holder).update(expires_at=timezone.now())
+        logger.info(f"✓ {self.holder} تنازلت عن قيادة {self.name}")
+
+    def _renew(self):
+        now = timezone.now()
+        return SchedulerLease.objects.filter(name=self.name, holder=self.holder).update(
+            renewed_at=now,
+            expires_at=now + self.ttl
+        ) == 1
+
+    def _take_over(self):
+        now = timezone.now()
+        return SchedulerLease.objects.filter(name=self.name, expires_at__lt=now).update(
+            holder=self.holder,
+            acquired_at=now,
+            renewed_at=now,
+            expires_at=now + self.ttl
+        ) == 1
+
+    def _create(self):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                SchedulerLease.objects.create(
+                    name=self.name,
+                    holder=self.holder,
+                    acquired_at=now,
+                    renewed_at=now,
+                    expires_at=now + self.ttl
+                )
+        except IntegrityError:
+            # عملية أخرى أنشأت الصف أولاً ولا يزال عقدها سارياً
+            return False
+        return True
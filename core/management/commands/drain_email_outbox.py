@@ -0,0 +1,18 @@
+# core/management/commands/drain_email_outbox.py
+
+from django.core.management.base import BaseCommand
+from core import email_outbox
+
+
+class Command(BaseCommand):
+    help = 'إرسال الرسائل المستحقة في صندوق البريد الصادر على دفعات عبر اتصال واحد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='عدد الرسائل في كل دفعة')
+        parser.add_argument('--max-batches', type=int, help='الحد الأقصى لعدد الدفعات')
+
+    def handle(self, *args, **options):
+        totals = email_outbox.drain(options['batch_size'], options['max_batches'])
+        self.stdout.write(
+            f"أُرسل {totals['sent']} بريد، فشل {totals['failed']} في {totals['batches']} دفعة"
+        )
@@ -0,0 +1,35 @@
+# core/management/commands/purge_notifications.py
+
+from django.core.management.base import BaseCommand
+from core.retention import NotificationPurge, NotificationArchivePurge
+
+
+class Command(BaseCommand):
+    help = 'حذف الإشعارات القديمة على دفعات مع إمكانية الاستئناف'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='حذف الإشعارات الأقدم من هذا العدد من الأيام')
+        parser.add_argument('--batch-size', type=int, help='عدد الصفوف في كل دفعة')
+        parser.add_argument('--pause', type=float, help='التوقف بين الدفعات بالثواني')
+        parser.add_argument('--max-seconds', type=float, help='إيقاف التشغيل بعد هذه المدة (يُستأنف لاحقاً)')
+        parser.add_argument('--restart', action='store_true', help='تجاهل نقطة الاستئناف المحفوظة')
+        parser.add_argument('--archive', action='store_true', help='حذف الإشعارات المؤرشفة القديمة بدلاً من الإشعارات الحالية')
+
+    def handle(self, *args, **options):
+        purge_class = NotificationArchivePurge if options['archive'] else NotificationPurge
+        purge = purge_class(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            max_seconds=options['max_seconds'],
+        )
+        report = purge.run(restart=options['restart'])
+
+        self.stdout.write(
+            f"حُذف {report['deleted']} إشعار في {report['batches']} دفعة "
+            f"خلال {report['seconds']} ثانية ({report['rows_per_second']} صف/ثانية)"
+        )
+        if report['completed']:
+            self.stdout.write(self.style.SUCCESS('✓ اكتمل الحذف'))
+        else:
+            self.stdout.write(self.style.WARNING('⚠ توقف قبل الاكتمال، سيُستأنف في التشغيل التالي'))
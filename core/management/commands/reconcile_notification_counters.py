@@ -0,0 +1,25 @@
+# core/management/commands/reconcile_notification_counters.py
+
+from django.core.management.base import BaseCommand
+from core import notification_counters
+
+
+class Command(BaseCommand):
+    help = 'مقارنة عدادات الإشعارات المخزنة بالقيم الفعلية وإصلاح أي انحراف'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='فحص مستخدم محدد (يمكن تكراره)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='الإبلاغ عن الانحراف دون إصلاحه')
+
+    def handle(self, *args, **options):
+        drifted = notification_counters.reconcile(options['user_ids'], dry_run=options['dry_run'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('✓ جميع العدادات مطابقة'))
+            return
+
+        verb = 'يحتاج إلى إصلاح' if options['dry_run'] else 'تم إصلاح'
+        self.stdout.write(self.style.WARNING(f'{verb}: {len(drifted)} مستخدم'))
+        for user_id in drifted:
+            self.stdout.write(f'  - {user_id}')
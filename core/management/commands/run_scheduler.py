@@ -0,0 +1,23 @@
+# core/management/commands/run_scheduler.py
+
+import signal
+import time
+from django.core.management.base import BaseCommand
+from core.scheduler import NotificationScheduler
+
+
+class Command(BaseCommand):
+    help = 'تشغيل جدولة الإشعارات في المقدمة (يمكن تشغيل عدة نسخ: واحدة فقط تنفذ المهام)'
+
+    def handle(self, *args, **options):
+        # SIGTERM يُعامل مثل Ctrl+C حتى يُتنازل عن القيادة عند الإيقاف
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        NotificationScheduler.start()
+        self.stdout.write(f"الجدولة تعمل ({NotificationScheduler.lease.holder})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            NotificationScheduler.stop()
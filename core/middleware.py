@@ -0,0 +1,40 @@
+# core/middleware.py
+
+from urllib.parse import parse_qs
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    """
+    الحصول على المستخدم من رمز JWT (access token)
+    """
+    try:
+        token = AccessToken(raw_token)
+        return get_user_model().objects.get(pk=token['user_id'])
+    except (TokenError, KeyError, get_user_model().DoesNotExist):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    مصادقة اتصالات WebSocket برمز JWT في الرابط (?token=...)
+    لأن المتصفح لا يسمح بإضافة ترويسة Authorization لاتصال WebSocket
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if token:
+            scope['user'] = await get_user_from_token(token[0])
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    # الجلسة (session) أولاً ثم JWT إن وُجد رمز في الرابط
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    NotificationLog = apps.get_model('core', 'NotificationLog')
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+    NotificationTypeCounter = apps.get_model('core', 'NotificationTypeCounter')
+
+    rows = NotificationLog.objects.filter(recipient__isnull=False).order_by().values(
+        'recipient_id', 'notification_type'
+    ).annotate(
+        total=Count('notification_id'),
+        unread=Count('notification_id', filter=Q(is_read=False))
+    )
+    totals = {}
+    type_counters = {}
+    for row in rows:
+        user_id, notification_type = row['recipient_id'], row['notification_type'] or ''
+        unread, total = totals.get(user_id, (0, 0))
+        totals[user_id] = (unread + row['unread'], total + row['total'])
+        unread, total = type_counters.get((user_id, notification_type), (0, 0))
+        type_counters[(user_id, notification_type)] = (unread + row['unread'], total + row['total'])
+
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread_count=unread, total_count=total)
+         for user_id, (unread, total) in totals.items()],
+        batch_size=1000
+    )
+    NotificationTypeCounter.objects.bulk_create(
+        [NotificationTypeCounter(user_id=user_id, notification_type=notification_type, unread_count=unread, total_count=total)
+         for (user_id, notification_type), (unread, total) in type_counters.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_project_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Notification Counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationTypeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(max_length=50)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_type_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Notification Type Counters',
+                'unique_together': {('user', 'notification_type')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
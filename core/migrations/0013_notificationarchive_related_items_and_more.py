@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationarchive',
+            name='related_items',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='related_items',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_notificationarchive_related_items_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalrequest',
+            name='last_reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='approvalrequest',
+            index=models.Index(fields=['status', 'created_at'], name='core_approv_status_feb88f_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_approvalrequest_last_reminded_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLedger',
+            fields=[
+                ('ledger_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=50)),
+                ('object_id', models.IntegerField(default=0)),
+                ('window', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Reminder Ledger',
+                'unique_together': {('kind', 'object_id', 'recipient', 'window')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_schedulerlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('run_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('job_name', models.CharField(max_length=100)),
+                ('source', models.CharField(choices=[('scheduler', 'الجدولة'), ('celery', 'Celery')], max_length=20)),
+                ('status', models.CharField(choices=[('running', 'قيد التشغيل'), ('success', 'نجح'), ('failed', 'فشل')], default='running', max_length=20)),
+                ('worker', models.CharField(max_length=255)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('rows_processed', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Job Runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job_name', '-started_at'], name='core_jobrun_job_nam_359a16_idx'), models.Index(fields=['started_at'], name='core_jobrun_started_04c1ad_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_notificationcounter_deleted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderledger',
+            name='claim_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:41
+
+import json
+
+from django.db import migrations, models
+
+
+def move_proposal_data(apps, schema_editor):
+    # مقترحات المشاريع كانت تحفظ بيانات GroupCreateSerializer في comments
+    ApprovalRequest = apps.get_model('core', 'ApprovalRequest')
+    proposals = ApprovalRequest.objects.filter(approval_type='project_proposal', comments__isnull=False)
+    moved = []
+    for approval in proposals.only('approval_id', 'comments').iterator():
+        try:
+            data = json.loads(approval.comments)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            approval.request_data, approval.comments = data, None
+            moved.append(approval)
+    ApprovalRequest.objects.bulk_update(moved, ['request_data', 'comments'], batch_size=1000)
+
+
+def restore_proposal_data(apps, schema_editor):
+    ApprovalRequest = apps.get_model('core', 'ApprovalRequest')
+    approvals = ApprovalRequest.objects.filter(request_data__isnull=False, comments__isnull=True)
+    restored = []
+    for approval in approvals.only('approval_id', 'request_data').iterator():
+        approval.comments = json.dumps(approval.request_data)
+        restored.append(approval)
+    ApprovalRequest.objects.bulk_update(restored, ['comments'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_reminderledger_claim_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalrequest',
+            name='request_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(move_proposal_data, restore_proposal_data),
+    ]
@@ -156,6 +156,18 @@ class Notification(models.Model):
     class Meta:
         verbose_name_plural = "Notifications"
 
+class AcademicAffiliationQuerySet(models.QuerySet):
+    def current(self):
+        """
+        الانتماءات السارية اليوم، الأحدث أولاً: أول صف لكل مستخدم هو انتماؤه الحالي
+        """
+        today = timezone.localdate()
+        return self.filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gte=today),
+            start_date__lte=today
+        ).order_by('-start_date', '-affiliation_id')
+
+
 class AcademicAffiliation(models.Model):
     affiliation_id = models.AutoField(primary_key=True)
     user = models.ForeignKey('User', on_delete=models.CASCADE)
@@ -165,6 +177,8 @@ class AcademicAffiliation(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(blank=True, null=True)
 
+    objects = AcademicAffiliationQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.university.uname_ar}"
 
@@ -271,9 +285,12 @@ class ApprovalRequest(models.Model):
     approval_level = models.IntegerField(default=1)
     status = models.CharField(max_length=20, choices=APPROVAL_STATUS_CHOICES, default='pending')
     comments = models.TextField(blank=True, null=True)
+    # بيانات الطلب نفسه (مثل GroupCreateSerializer في مقترح المشروع) منفصلة عن تعليقات الموافقين
+    request_data = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     approved_at = models.DateTimeField(blank=True, null=True)
+    last_reminded_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.get_approval_type_display()} - {self.get_status_display()}"
@@ -281,6 +298,7 @@ class ApprovalRequest(models.Model):
     class Meta:
         verbose_name_plural = "Approval Requests"
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['status','created_at'])]
 
 class NotificationLog(models.Model):
     NOTIFICATION_TYPE_CHOICES = [('invitation','دعوة مجموعة'),('approval','موافقة/رفض'),('rejection','رفض'),('transfer','نقل'),('reminder','تذكير'),('system','إشعار نظام'),('message','رسالة')]
@@ -293,6 +311,8 @@ class NotificationLog(models.Model):
     related_project = models.ForeignKey('Project', on_delete=models.SET_NULL, blank=True, null=True)
     related_user = models.ForeignKey('User', on_delete=models.SET_NULL, blank=True, null=True, related_name='notifications_about_user')
     related_approval = models.ForeignKey('ApprovalRequest', on_delete=models.SET_NULL, blank=True, null=True)
+    # روابط العناصر التي يلخصها إشعار التذكير المجمّع {'kind': ..., 'items': [{'type': ..., 'id': ...}]}
+    related_items = models.JSONField(blank=True, null=True)
     is_read = models.BooleanField(default=False)
     is_sent_email = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -304,7 +324,160 @@ class NotificationLog(models.Model):
     class Meta:
         verbose_name_plural = "Notification Logs"
         ordering = ['-created_at']
-        indexes = [models.Index(fields=['recipient','-created_at']), models.Index(fields=['is_read','recipient'])]
+        indexes = [
+            models.Index(fields=['recipient','-created_at']),
+            models.Index(fields=['is_read','recipient']),
+            # معرفات الإشعارات المقروءة منذ آخر مزامنة (notification_sync)
+            models.Index(fields=['recipient','read_at']),
+        ]
+
+class ReminderLedger(models.Model):
+    """سجل التذكيرات المرسلة - مفتاح فريد يمنع تكرار التذكير نفسه لنفس المستلم في نفس النافذة"""
+    ledger_id = models.BigAutoField(primary_key=True)
+    recipient = models.ForeignKey('User', on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=50)
+    # معرف العنصر المذكَّر به (0 للتذكيرات المجمعة على مستوى المستلم)
+    object_id = models.IntegerField(default=0)
+    window = models.DateTimeField()
+    # رمز التشغيل الذي أدرج الصف، لمعرفة ما حجزه التشغيل فعلاً بعد INSERT ... IGNORE
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} - {self.recipient_id} - {self.object_id}"
+
+    class Meta:
+        verbose_name_plural = "Reminder Ledger"
+        unique_together = ('kind', 'object_id', 'recipient', 'window')
+
+class EmailOutbox(models.Model):
+    """صندوق البريد الصادر - يُكتب في نفس transaction الإشعار ويُرسل لاحقاً على دفعات"""
+    STATUS_CHOICES = [('pending','قيد الانتظار'),('sent','أُرسل'),('failed','فشل')]
+    outbox_id = models.BigAutoField(primary_key=True)
+    # بدون قيد حتى لا يمنع حذف/أرشفة الإشعارات أو يبطئها
+    notification = models.ForeignKey('NotificationLog', on_delete=models.DO_NOTHING, null=True, blank=True, db_constraint=False, related_name='+')
+    recipient_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.recipient_email} - {self.subject} ({self.status})"
+
+    class Meta:
+        verbose_name_plural = "Email Outbox"
+        indexes = [models.Index(fields=['status','next_attempt_at'])]
+
+class SchedulerLease(models.Model):
+    """عقد قيادة الجدولة - صف واحد لكل جدولة يحدد العملية الوحيدة التي تنفذ المهام الدورية"""
+    name = models.CharField(max_length=100, primary_key=True)
+    holder = models.CharField(max_length=255)
+    acquired_at = models.DateTimeField()
+    renewed_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} - {self.holder}"
+
+    class Meta:
+        verbose_name_plural = "Scheduler Leases"
+
+class JobRun(models.Model):
+    """سجل تشغيل المهام الدورية (الجدولة و Celery) لمتابعة المدة وعدد الصفوف والأخطاء"""
+    STATUS_CHOICES = [('running','قيد التشغيل'),('success','نجح'),('failed','فشل')]
+    SOURCE_CHOICES = [('scheduler','الجدولة'),('celery','Celery')]
+    run_id = models.BigAutoField(primary_key=True)
+    job_name = models.CharField(max_length=100)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    worker = models.CharField(max_length=255)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.job_name} - {self.started_at} ({self.status})"
+
+    class Meta:
+        verbose_name_plural = "Job Runs"
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['job_name','-started_at']), models.Index(fields=['started_at'])]
+
+class NotificationArchive(models.Model):
+    """أرشيف الإشعارات المقروءة القديمة (جدول ضيق بدون فهارس أو قيود على العلاقات)"""
+    notification_id = models.IntegerField(primary_key=True)
+    recipient = models.ForeignKey('User', on_delete=models.CASCADE, related_name='archived_notifications', db_index=False)
+    notification_type = models.CharField(max_length=50, null=True)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    related_group = models.ForeignKey('Group', on_delete=models.SET_NULL, null=True, db_index=False, db_constraint=False, related_name='+')
+    related_project = models.ForeignKey('Project', on_delete=models.SET_NULL, null=True, db_index=False, db_constraint=False, related_name='+')
+    related_user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, db_index=False, db_constraint=False, related_name='+')
+    related_approval = models.ForeignKey('ApprovalRequest', on_delete=models.SET_NULL, null=True, db_index=False, db_constraint=False, related_name='+')
+    related_items = models.JSONField(null=True)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True)
+
+    ARCHIVED_FIELDS = [
+        'notification_id', 'recipient_id', 'notification_type', 'title', 'message',
+        'related_group_id', 'related_project_id', 'related_user_id', 'related_approval_id',
+        'related_items', 'created_at', 'read_at',
+    ]
+
+    @classmethod
+    def from_notification(cls, notification):
+        return cls(**{field: getattr(notification, field) for field in cls.ARCHIVED_FIELDS})
+
+    def to_notification(self):
+        """إشعار غير محفوظ بنفس البيانات حتى تعمل عليه الـ Serializers كالمعتاد"""
+        return NotificationLog(
+            is_read=True,
+            is_sent_email=True,
+            **{field: getattr(self, field) for field in self.ARCHIVED_FIELDS}
+        )
+
+    def __str__(self):
+        return f"{self.notification_id} - {self.recipient_id}"
+
+    class Meta:
+        verbose_name_plural = "Notification Archive"
+        indexes = [models.Index(fields=['recipient','-created_at'])]
+
+class NotificationCounter(models.Model):
+    """عدادات إشعارات المستخدم المحسوبة مسبقاً (تُحدَّث ذرياً مع كل إدراج/قراءة/حذف)"""
+    user = models.OneToOneField('User', on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    # وقت آخر حذف لإشعارات المستخدم: المزامنة تعيد تحميل القائمة كاملة بعده
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count}/{self.total_count}"
+
+    class Meta:
+        verbose_name_plural = "Notification Counters"
+
+class NotificationTypeCounter(models.Model):
+    """عدادات إشعارات المستخدم حسب النوع"""
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='notification_type_counters')
+    notification_type = models.CharField(max_length=50)
+    unread_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.notification_type}: {self.unread_count}/{self.total_count}"
+
+    class Meta:
+        verbose_name_plural = "Notification Type Counters"
+        unique_together = ('user', 'notification_type')
 
 # ============================================================================== 
 # 7. إعدادات النظام وتسلسل الموافقات
@@ -362,26 +535,43 @@ class GroupMemberApproval(models.Model):
         unique_together = ('request','user')
 
 def check_and_finalize_group(request_id):
+    """
+    إنشاء المجموعة النهائية عند موافقة جميع أعضاء الطلب
+    صف الطلب يُقفل أولاً، فموافقتان متزامنتان لا تنشئان مجموعتين: الثانية تنتظر
+    ثم تجد الطلب مكتملاً
+    """
     try:
-        group_request = GroupCreationRequest.objects.get(id=request_id)
-        if group_request.is_fully_confirmed:
-            return False
-
-        total_members = group_request.approvals.count()
-        accepted_members = group_request.approvals.filter(status='accepted').count()
-
-        if total_members > 0 and total_members == accepted_members:
-            with transaction.atomic():
-                final_group = Group.objects.create(group_name=group_request.group_name)
-                for approval in group_request.approvals.all():
-                    if approval.role == 'student':
-                        GroupMembers.objects.create(group=final_group, user=approval.user)
-                    elif approval.role in ['supervisor','co_supervisor']:
-                        GroupSupervisors.objects.create(group=final_group, user=approval.user, type=approval.role)
-                group_request.is_fully_confirmed = True
-                group_request.save()
-                return True
+        with transaction.atomic():
+            group_request = GroupCreationRequest.objects.select_for_update().get(id=request_id)
+            if group_request.is_fully_confirmed:
+                return False
+
+            # أول قراءة عادية بعد القفل، فترى كل الموافقات المحفوظة قبله
+            counts = group_request.approvals.aggregate(
+                total=models.Count('id'),
+                accepted=models.Count('id', filter=models.Q(status='accepted'))
+            )
+            if not counts['total'] or counts['total'] != counts['accepted']:
+                return False
+
+            final_group = Group.objects.create(group_name=group_request.group_name)
+            approvals = list(group_request.approvals.values_list('user_id', 'role'))
+            GroupMembers.objects.bulk_create([
+                GroupMembers(group=final_group, user_id=user_id)
+                for user_id, role in approvals if role == 'student'
+            ])
+            supervisors = GroupSupervisors.objects.bulk_create([
+                GroupSupervisors(group=final_group, user_id=user_id, type=role)
+                for user_id, role in approvals if role in ['supervisor', 'co_supervisor']
+            ])
+            if supervisors:
+                # bulk_create لا يرسل post_save
+                from .filter_options import invalidate_filter_options
+                invalidate_filter_options()
+
+            group_request.is_fully_confirmed = True
+            group_request.save(update_fields=['is_fully_confirmed'])
+            return True
     except Exception as e:
         print(f"Error finalizing group: {e}")
         return False
-    return False
@@ -0,0 +1,282 @@
+# core/notification_counters.py
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import NotificationLog, NotificationArchive, NotificationCounter, NotificationTypeCounter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# 1. عدادات الإشعارات المحسوبة مسبقاً
+# ==============================================================================
+# بدلاً من COUNT(*) على NotificationLog عند كل تحديث للشارة، يحتفظ كل مستخدم بصف
+# في NotificationCounter (وصف لكل نوع في NotificationTypeCounter). التعديل يتم
+# بـ UPDATE ... SET x = x + n داخل نفس الـ transaction التي أنشأت/قرأت/حذفت الإشعار،
+# فلا يضيع أي تحديث مع الطلبات المتزامنة. أي انحراف (تعديل من لوحة الإدارة مثلاً)
+# يُصلح بأمر reconcile_notification_counters.
+
+
+def _type_key(notification_type):
+    # الإشعارات بدون نوع تُجمع تحت نوع فارغ
+    return notification_type or ''
+
+
+def _counter_update(unread_delta, total_delta):
+    fields = {}
+    if unread_delta:
+        fields['unread_count'] = Greatest(F('unread_count') + unread_delta, 0)
+    if total_delta:
+        fields['total_count'] = Greatest(F('total_count') + total_delta, 0)
+    return fields
+
+
+def apply_deltas(deltas):
+    """
+    تطبيق تغييرات على العدادات
+
+    Args:
+        deltas: قاموس {(user_id, notification_type): (تغيير غير المقروء, تغيير الإجمالي)}
+    """
+    deltas = {key: delta for key, delta in deltas.items() if key[0] and any(delta)}
+    if not deltas:
+        return
+
+    user_deltas = defaultdict(lambda: [0, 0])
+    for (user_id, _), (unread_delta, total_delta) in deltas.items():
+        user_deltas[user_id][0] += unread_delta
+        user_deltas[user_id][1] += total_delta
+
+    # إنشاء الصفوف الناقصة أولاً (بدون تعارض مع الطلبات المتزامنة) ثم الزيادة الذرية
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id, delta in user_deltas.items() if max(delta) > 0],
+        ignore_conflicts=True
+    )
+    NotificationTypeCounter.objects.bulk_create(
+        [
+            NotificationTypeCounter(user_id=user_id, notification_type=notification_type)
+            for (user_id, notification_type), delta in deltas.items() if max(delta) > 0
+        ],
+        ignore_conflicts=True
+    )
+
+    # المستخدمون الذين لهم نفس التغيير يُحدَّثون باستعلام واحد (حالة الإرسال الجماعي)
+    by_delta = defaultdict(list)
+    for user_id, delta in user_deltas.items():
+        by_delta[tuple(delta)].append(user_id)
+    now = timezone.now()
+    for delta, user_ids in by_delta.items():
+        if any(delta):
+            # updated_at يُحدَّث صراحةً لأن auto_now لا يعمل مع update()، وتعتمد عليه ETag المزامنة
+            fields = _counter_update(*delta)
+            if delta[1] < 0:
+                fields['deleted_at'] = now
+            NotificationCounter.objects.filter(user_id__in=user_ids).update(updated_at=now, **fields)
+
+    by_type_delta = defaultdict(list)
+    for (user_id, notification_type), delta in deltas.items():
+        by_type_delta[(notification_type, tuple(delta))].append(user_id)
+    for (notification_type, delta), user_ids in by_type_delta.items():
+        NotificationTypeCounter.objects.filter(
+            user_id__in=user_ids,
+            notification_type=notification_type
+        ).update(**_counter_update(*delta))
+
+
+def record_created(notifications):
+    """
+    زيادة العدادات لإشعارات جديدة
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for notification in notifications:
+        delta = deltas[(notification.recipient_id, _type_key(notification.notification_type))]
+        delta[0] += 0 if notification.is_read else 1
+        delta[1] += 1
+    apply_deltas({key: tuple(delta) for key, delta in deltas.items()})
+
+
+def record_read(rows):
+    """
+    إنقاص عداد غير المقروء
+
+    Args:
+        rows: صفوف (user_id, notification_type, العدد)
+    """
+    deltas = defaultdict(int)
+    for user_id, notification_type, count in rows:
+        deltas[(user_id, _type_key(notification_type))] -= count
+    apply_deltas({key: (delta, 0) for key, delta in deltas.items()})
+
+
+def record_deleted(queryset):
+    """
+    إنقاص العدادات لإشعارات ستُحذف (يُستدعى قبل الحذف داخل نفس الـ transaction)
+    """
+    rows = queryset.order_by().values('recipient_id', 'notification_type').annotate(
+        total=Count('notification_id'),
+        unread=Count('notification_id', filter=Q(is_read=False))
+    )
+    apply_deltas({
+        (row['recipient_id'], _type_key(row['notification_type'])): (-row['unread'], -row['total'])
+        for row in rows
+    })
+
+
+def record_archive_deleted(queryset):
+    """
+    إنقاص الإجمالي لإشعارات مؤرشفة ستُحذف (المؤرشف مقروء دائماً)
+    """
+    rows = queryset.order_by().values('recipient_id', 'notification_type').annotate(total=Count('notification_id'))
+    apply_deltas({
+        (row['recipient_id'], _type_key(row['notification_type'])): (0, -row['total'])
+        for row in rows
+    })
+
+
+# ==============================================================================
+# 2. قراءة العدادات
+# ==============================================================================
+
+def get_unread_count(user):
+    """
+    عدد الإشعارات غير المقروءة (قراءة صف واحد بالمفتاح الأساسي)
+    """
+    count = NotificationCounter.objects.filter(user_id=user.pk).values_list('unread_count', flat=True).first()
+    return count or 0
+
+
+def get_counts(user):
+    """
+    الإجمالي وغير المقروء للمستخدم ووقت آخر تغيير وآخر حذف
+    """
+    counts = NotificationCounter.objects.filter(user_id=user.pk).values(
+        'total_count', 'unread_count', 'updated_at', 'deleted_at'
+    ).first()
+    return counts or {'total_count': 0, 'unread_count': 0, 'updated_at': None, 'deleted_at': None}
+
+
+def get_type_counts(user, field):
+    """
+    العدادات حسب النوع بنفس شكل values('notification_type').annotate(count=...)
+    """
+    return NotificationTypeCounter.objects.filter(
+        user_id=user.pk,
+        **{f'{field}__gt': 0}
+    ).annotate(count=F(field)).values('notification_type', 'count')
+
+
+# ==============================================================================
+# 3. إصلاح الانحراف
+# ==============================================================================
+
+def _actual_counts(user_ids=None):
+    """
+    حساب العدادات الفعلية من NotificationLog والأرشيف (المؤرشف مقروء دائماً)
+
+    Returns:
+        dict: {user_id: {notification_type: (unread, total)}}
+    """
+    queryset = NotificationLog.objects.filter(recipient__isnull=False)
+    archived = NotificationArchive.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(recipient_id__in=user_ids)
+        archived = archived.filter(recipient_id__in=user_ids)
+    rows = list(queryset.order_by().values('recipient_id', 'notification_type').annotate(
+        total=Count('notification_id'),
+        unread=Count('notification_id', filter=Q(is_read=False))
+    ))
+    rows += archived.order_by().values('recipient_id', 'notification_type').annotate(
+        total=Count('notification_id'),
+        unread=Value(0)
+    )
+    actual = defaultdict(dict)
+    for row in rows:
+        by_type = actual[row['recipient_id']]
+        previous = by_type.get(_type_key(row['notification_type']), (0, 0))
+        by_type[_type_key(row['notification_type'])] = (previous[0] + row['unread'], previous[1] + row['total'])
+    return actual
+
+
+def _stored_counts(user_ids=None):
+    counters = NotificationCounter.objects.all()
+    type_counters = NotificationTypeCounter.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(user_id__in=user_ids)
+        type_counters = type_counters.filter(user_id__in=user_ids)
+
+    totals = {row[0]: row[1:] for row in counters.values_list('user_id', 'unread_count', 'total_count')}
+    stored = defaultdict(dict)
+    for user_id, notification_type, unread, total in type_counters.values_list(
+        'user_id', 'notification_type', 'unread_count', 'total_count'
+    ):
+        if unread or total:
+            stored[user_id][notification_type] = (unread, total)
+    return totals, stored
+
+
+def _is_drifted(by_type, total, stored_by_type):
+    expected = (sum(c[0] for c in by_type.values()), sum(c[1] for c in by_type.values()))
+    return expected != (total or (0, 0)) or by_type != stored_by_type
+
+
+def _rebuild_user(user_id):
+    """
+    إعادة كتابة عدادات مستخدم واحد من البيانات الفعلية مع قفل صف العداد
+    """
+    with transaction.atomic():
+        NotificationCounter.objects.get_or_create(user_id=user_id)
+        counter = NotificationCounter.objects.select_for_update().get(user_id=user_id)
+        by_type = _actual_counts([user_id]).get(user_id, {})
+
+        counter.unread_count = sum(c[0] for c in by_type.values())
+        counter.total_count = sum(c[1] for c in by_type.values())
+        counter.save(update_fields=['unread_count', 'total_count', 'updated_at'])
+
+        NotificationTypeCounter.objects.filter(user_id=user_id).exclude(notification_type__in=by_type).delete()
+        for notification_type, (unread, total) in by_type.items():
+            NotificationTypeCounter.objects.update_or_create(
+                user_id=user_id,
+                notification_type=notification_type,
+                defaults={'unread_count': unread, 'total_count': total}
+            )
+
+
+def reconcile(user_ids=None, dry_run=False):
+    """
+    مقارنة العدادات المخزنة بالقيم الفعلية وإصلاح المنحرف منها
+
+    Args:
+        user_ids: تقييد الفحص بمستخدمين محددين (الكل إذا كان None)
+        dry_run: الاكتفاء بالإبلاغ دون إصلاح
+
+    Returns:
+        list: معرفات المستخدمين الذين وُجد انحراف في عداداتهم
+    """
+    actual = _actual_counts(user_ids)
+    totals, stored = _stored_counts(user_ids)
+
+    drifted = sorted(
+        user_id for user_id in set(actual) | set(totals) | set(stored)
+        if _is_drifted(actual.get(user_id, {}), totals.get(user_id), stored.get(user_id, {}))
+    )
+    if not dry_run:
+        for user_id in drifted:
+            _rebuild_user(user_id)
+        if drifted:
+            logger.warning(f"⚠ تم إصلاح عدادات الإشعارات لـ {len(drifted)} مستخدم")
+    return drifted
+
+
+# ==============================================================================
+# 4. تحديث العدادات عند إنشاء إشعار عبر save()
+# ==============================================================================
+
+@receiver(post_save, sender=NotificationLog)
+def handle_notification_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_created([instance])
@@ -1,8 +1,11 @@
 # core/notification_manager.py
 
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Count
-from .models import NotificationLog, GroupInvitation, ApprovalRequest
+from django.db import transaction
+from django.db.models import Q, QuerySet, Exists, OuterRef
+from .models import NotificationLog, NotificationArchive, GroupInvitation, ApprovalRequest, ReminderLedger
+from . import notification_counters
 from datetime import timedelta
 import logging
 
@@ -14,6 +17,9 @@ class NotificationManager:
     مدير الإشعارات المتقدم - يدير جميع عمليات الإشعارات
     """
     
+    # عدد الإشعارات في كل دفعة عند الإرسال الجماعي
+    FAN_OUT_CHUNK_SIZE = 1000
+    
     # قاموس أنواع الإشعارات مع معلوماتها
     NOTIFICATION_TYPES = {
         'invitation': {
@@ -119,24 +125,123 @@ class NotificationManager:
             return None
     
     @staticmethod
-    def get_user_notifications(user, limit=50, unread_only=False):
+    def bulk_create_notifications(notifications, batch_size=None):
+        """
+        إدراج مجموعة إشعارات جاهزة دفعة واحدة (المسار المشترك لجميع الإشعارات المتعددة)
+        
+        Args:
+            notifications: قائمة كائنات NotificationLog غير محفوظة
+            batch_size: عدد الصفوف في كل INSERT
+        
+        Returns:
+            list: الإشعارات المنشأة
+        """
+        from .realtime import publish_on_commit
+        
+        notifications = list(notifications)
+        if not notifications:
+            return []
+        with transaction.atomic():
+            created = NotificationLog.objects.bulk_create(
+                notifications,
+                batch_size=batch_size or NotificationManager.FAN_OUT_CHUNK_SIZE
+            )
+            # bulk_create لا يُطلق post_save، لذلك تُحدَّث العدادات ويُنشر الإشعار هنا مباشرة
+            notification_counters.record_created(created)
+            publish_on_commit(created)
+        return created
+    
+    @staticmethod
+    def fan_out(recipients, notification_type, title, message,
+                related_group=None, related_project=None,
+                related_user=None, related_approval=None,
+                chunk_size=None, progress=None):
+        """
+        إرسال نفس الإشعار لعدد كبير من المستخدمين على دفعات
+        
+        Args:
+            recipients: QuerySet للمستخدمين أو قائمة معرفات/مستخدمين
+            notification_type: نوع الإشعار
+            title: عنوان الإشعار
+            message: محتوى الإشعار
+            related_group, related_project, related_user, related_approval: الكائنات المرتبطة (اختياري)
+            chunk_size: عدد المستلمين في كل دفعة
+            progress: دالة تُستدعى بعد كل دفعة بعدد الإشعارات المرسلة حتى الآن
+        
+        Returns:
+            int: عدد الإشعارات المنشأة
+        """
+        chunk_size = chunk_size or NotificationManager.FAN_OUT_CHUNK_SIZE
+        if isinstance(recipients, QuerySet):
+            recipient_ids = recipients.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+        else:
+            recipient_ids = (getattr(recipient, 'pk', recipient) for recipient in recipients)
+        
+        total = 0
+        batch = []
+        for recipient_id in recipient_ids:
+            batch.append(NotificationLog(
+                recipient_id=recipient_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                related_group=related_group,
+                related_project=related_project,
+                related_user=related_user,
+                related_approval=related_approval,
+                is_read=False
+            ))
+            if len(batch) >= chunk_size:
+                total += len(NotificationManager.bulk_create_notifications(batch, chunk_size))
+                batch = []
+                logger.info(f"… تم إرسال {total} إشعار حتى الآن")
+                if progress:
+                    progress(total)
+        
+        if batch:
+            total += len(NotificationManager.bulk_create_notifications(batch, chunk_size))
+            if progress:
+                progress(total)
+        
+        logger.info(f"✓ تم إرسال {total} إشعار من نوع {notification_type}")
+        return total
+    
+    @staticmethod
+    def get_user_notifications(user, limit=50, unread_only=False, before=None):
         """
-        الحصول على إشعارات المستخدم
+        الحصول على إشعارات المستخدم، مع الانتقال إلى الأرشيف تلقائياً بعد النافذة الحديثة
         
         Args:
             user: المستخدم
             limit: عدد الإشعارات المطلوب
             unread_only: عرض الإشعارات غير المقروءة فقط
+            before: (created_at, notification_id) لآخر إشعار في الصفحة السابقة
         
         Returns:
-            QuerySet: قائمة الإشعارات
+            list: قائمة الإشعارات مرتبة من الأحدث
         """
-        query = NotificationLog.objects.filter(recipient=user)
+        seek = Q()
+        if before is not None:
+            created_at, notification_id = before
+            seek = Q(created_at__lt=created_at) | Q(created_at=created_at, notification_id__lt=notification_id)
         
+        query = NotificationLog.objects.filter(seek, recipient=user)
         if unread_only:
             query = query.filter(is_read=False)
+        notifications = list(query.order_by('-created_at', '-notification_id')[:limit])
         
-        return query.order_by('-created_at')[:limit]
+        # الأرشيف لا يحوي إلا إشعارات مقروءة أقدم من NOTIFICATION_ARCHIVE_DAYS، فلا يُقرأ
+        # إلا إذا وصلت الصفحة إلى ما قبل هذا الحد أو لم تمتلئ من الجدول الحديث
+        horizon = timezone.now() - timedelta(days=getattr(settings, 'NOTIFICATION_ARCHIVE_DAYS', 30))
+        if unread_only or (len(notifications) == limit and notifications[-1].created_at >= horizon):
+            return notifications
+        
+        archived = NotificationArchive.objects.filter(seek, recipient=user).order_by(
+            '-created_at', '-notification_id'
+        )[:limit]
+        notifications += [notification.to_notification() for notification in archived]
+        notifications.sort(key=lambda n: (n.created_at, n.notification_id), reverse=True)
+        return notifications[:limit]
     
     @staticmethod
     def get_unread_count(user):
@@ -149,10 +254,7 @@ class NotificationManager:
         Returns:
             int: عدد الإشعارات غير المقروءة
         """
-        return NotificationLog.objects.filter(
-            recipient=user,
-            is_read=False
-        ).count()
+        return notification_counters.get_unread_count(user)
     
     @staticmethod
     def get_unread_by_type(user):
@@ -165,10 +267,7 @@ class NotificationManager:
         Returns:
             QuerySet: إحصائيات الإشعارات حسب النوع
         """
-        return NotificationLog.objects.filter(
-            recipient=user,
-            is_read=False
-        ).values('notification_type').annotate(count=Count('notification_id'))
+        return notification_counters.get_type_counts(user, 'unread_count')
     
     @staticmethod
     def mark_as_read(notification_id, user):
@@ -187,14 +286,20 @@ class NotificationManager:
                 notification_id=notification_id,
                 recipient=user
             )
-            notification.is_read = True
-            notification.read_at = timezone.now()
-            notification.save()
-            logger.info(f"✓ تم تحديد الإشعار {notification_id} كمقروء")
-            return True
         except NotificationLog.DoesNotExist:
             logger.warning(f"⚠ محاولة تحديد إشعار غير موجود: {notification_id}")
             return False
+        
+        with transaction.atomic():
+            # التحديث المشروط يضمن إنقاص العداد مرة واحدة فقط مع الطلبات المتزامنة
+            updated = NotificationLog.objects.filter(
+                notification_id=notification_id,
+                is_read=False
+            ).update(is_read=True, read_at=timezone.now())
+            if updated:
+                notification_counters.record_read([(user.pk, notification.notification_type, updated)])
+        logger.info(f"✓ تم تحديد الإشعار {notification_id} كمقروء")
+        return True
     
     @staticmethod
     def mark_all_as_read(user):
@@ -207,13 +312,19 @@ class NotificationManager:
         Returns:
             int: عدد الإشعارات التي تم تحديثها
         """
-        count = NotificationLog.objects.filter(
-            recipient=user,
-            is_read=False
-        ).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        with transaction.atomic():
+            # قفل الصفوف غير المقروءة حتى لا يُنقص العداد مرتين مع الطلبات المتزامنة
+            unread = list(NotificationLog.objects.select_for_update().filter(
+                recipient=user,
+                is_read=False
+            ).values_list('notification_id', 'notification_type'))
+            count = NotificationLog.objects.filter(
+                notification_id__in=[notification_id for notification_id, _ in unread]
+            ).update(
+                is_read=True,
+                read_at=timezone.now()
+            )
+            notification_counters.record_read((user.pk, notification_type, 1) for _, notification_type in unread)
         logger.info(f"✓ تم تحديد {count} إشعار كمقروء للمستخدم {user.username}")
         return count
     
@@ -230,11 +341,15 @@ class NotificationManager:
             bool: True إذا نجحت العملية، False إذا فشلت
         """
         try:
-            notification = NotificationLog.objects.get(
-                notification_id=notification_id,
-                recipient=user
-            )
-            notification.delete()
+            with transaction.atomic():
+                # قفل الصف حتى الحذف: حذف متزامن لنفس الإشعار لا يجده، وتحديده كمقروء
+                # ينتظر ثم لا يُحدّث شيئاً، فيُنقص العداد مرة واحدة فقط
+                notification = NotificationLog.objects.select_for_update().get(
+                    notification_id=notification_id,
+                    recipient=user
+                )
+                notification_counters.record_deleted(NotificationLog.objects.filter(notification_id=notification_id))
+                notification.delete()
             logger.info(f"✓ تم حذف الإشعار {notification_id}")
             return True
         except NotificationLog.DoesNotExist:
@@ -242,22 +357,30 @@ class NotificationManager:
             return False
     
     @staticmethod
-    def delete_old_notifications(days=90):
+    def delete_old_notifications(days=None, max_seconds=None):
         """
-        حذف الإشعارات القديمة
+        حذف الإشعارات القديمة من الجدول والأرشيف على دفعات (يُستأنف من آخر نقطة إذا انقطع)
         
         Args:
-            days: عدد الأيام (حذف الإشعارات الأقدم من هذا العدد)
+            days: عدد الأيام (حذف الإشعارات الأقدم من هذا العدد، افتراضياً NOTIFICATION_RETENTION_DAYS)
+            max_seconds: الحد الأقصى لمدة التشغيل
         
         Returns:
             int: عدد الإشعارات المحذوفة
         """
-        cutoff_date = timezone.now() - timedelta(days=days)
-        deleted_count, _ = NotificationLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()
-        logger.info(f"✓ تم حذف {deleted_count} إشعار قديم")
-        return deleted_count
+        from .retention import NotificationPurge, NotificationArchivePurge
+        
+        report = NotificationPurge(days=days, max_seconds=max_seconds).run()
+        logger.info(
+            f"✓ تم حذف {report['deleted']} إشعار قديم "
+            f"({report['rows_per_second']} صف/ثانية)"
+        )
+        archive_report = NotificationArchivePurge(days=days, max_seconds=max_seconds).run()
+        logger.info(
+            f"✓ تم حذف {archive_report['deleted']} إشعار مؤرشف قديم "
+            f"({archive_report['rows_per_second']} صف/ثانية)"
+        )
+        return report['deleted'] + archive_report['deleted']
     
     @staticmethod
     def get_notification_stats(user):
@@ -270,15 +393,12 @@ class NotificationManager:
         Returns:
             dict: إحصائيات الإشعارات
         """
-        total = NotificationLog.objects.filter(recipient=user).count()
-        unread = NotificationLog.objects.filter(recipient=user, is_read=False).count()
-        by_type = NotificationLog.objects.filter(
-            recipient=user
-        ).values('notification_type').annotate(count=Count('notification_id'))
+        counts = notification_counters.get_counts(user)
+        by_type = notification_counters.get_type_counts(user, 'total_count')
         
         return {
-            'total': total,
-            'unread': unread,
+            'total': counts['total_count'],
+            'unread': counts['unread_count'],
             'by_type': list(by_type)
         }
 
@@ -288,6 +408,8 @@ class InvitationNotificationManager:
     مدير إشعارات الدعوات - يدير جميع إشعارات دعوات المجموعات
     """
     
+    EXPIRING_REMINDER_KIND = 'invitation_expiring'
+    
     @staticmethod
     def notify_invitation_sent(group, invited_student, invited_by):
         """
@@ -347,6 +469,57 @@ class InvitationNotificationManager:
             priority='medium'
         )
     
+    @staticmethod
+    def notify_invitations_expiring_soon(within=timedelta(hours=1), now=None):
+        """
+        تذكير جميع الطلاب الذين تنتهي دعواتهم خلال المدة المحددة، مرة واحدة لكل دعوة
+        
+        الدعوات التي سبق التذكير بها تُستبعد داخل نفس الاستعلام (anti-join على سجل
+        التذكيرات)، ثم تُحجز في السجل ولا يُرسل إلا ما حجزه هذا التشغيل فعلاً
+        
+        Returns:
+            int: عدد التذكيرات المرسلة
+        """
+        from .reminders import record_reminders
+        
+        now = now or timezone.now()
+        # مفتاح التذكير يشمل تاريخ الانتهاء، فتمديد الدعوة يسمح بتذكير جديد
+        already_reminded = ReminderLedger.objects.filter(
+            kind=InvitationNotificationManager.EXPIRING_REMINDER_KIND,
+            object_id=OuterRef('invitation_id'),
+            recipient_id=OuterRef('invited_student_id'),
+            window=OuterRef('expires_at')
+        )
+        invitations = list(GroupInvitation.objects.filter(
+            status='pending',
+            expires_at__gte=now,
+            expires_at__lte=now + within
+        ).exclude(Exists(already_reminded)).select_related('group'))
+        if not invitations:
+            return 0
+        
+        with transaction.atomic():
+            # الحجز أولاً: تشغيل متزامن قرأ نفس الدعوات لا يُرسل ما حجزه هذا التشغيل
+            claimed = record_reminders(
+                InvitationNotificationManager.EXPIRING_REMINDER_KIND,
+                [(invitation.invited_student_id, invitation.invitation_id, invitation.expires_at) for invitation in invitations]
+            )
+            invitations = [
+                invitation for invitation in invitations
+                if (invitation.invited_student_id, invitation.invitation_id) in claimed
+            ]
+            NotificationManager.bulk_create_notifications(
+                NotificationLog(
+                    recipient_id=invitation.invited_student_id,
+                    notification_type='reminder',
+                    title='تذكير: انتهاء صلاحية الدعوة قريباً',
+                    message=f'ستنتهي صلاحية دعوتك للانضمام إلى مجموعة "{invitation.group.group_name}" في {invitation.expires_at.strftime("%Y-%m-%d %H:%M")}',
+                    related_group=invitation.group,
+                )
+                for invitation in invitations
+            )
+        return len(invitations)
+    
     @staticmethod
     def notify_invitation_expired(invitation):
         """
@@ -414,6 +587,60 @@ class ApprovalNotificationManager:
             related_approval=approval,
             priority='high'
         )
+    
+    @staticmethod
+    def notify_approvals_decided(approvals, approver, decision):
+        """
+        إشعار مقدمي مجموعة طلبات بالموافقة أو الرفض دفعة واحدة
+        
+        Args:
+            approvals: طلبات الموافقة التي تم البت فيها
+            approver: الموافق
+            decision: approved أو rejected
+        
+        Returns:
+            list: الإشعارات المنشأة
+        """
+        notifications = []
+        for approval in approvals:
+            type_display = approval.get_approval_type_display()
+            if decision == 'approved':
+                notification_type = 'approval_approved'
+                title = 'تمت الموافقة على طلبك'
+                message = f'تمت الموافقة على طلب {type_display} الخاص بك من قبل {approver.name}'
+            else:
+                notification_type = 'approval_rejected'
+                title = 'تم رفض طلبك'
+                message = f'تم رفض طلب {type_display} الخاص بك من قبل {approver.name}. السبب: {approval.comments or "لم يتم تحديد سبب"}'
+            notifications.append(NotificationLog(
+                recipient_id=approval.requested_by_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                related_group_id=approval.group_id,
+                related_project_id=approval.project_id,
+                related_approval_id=approval.approval_id,
+            ))
+        return NotificationManager.bulk_create_notifications(notifications)
+    
+    @staticmethod
+    def notify_approvals_forwarded(approvals):
+        """
+        إشعار الموافقين الجدد بالطلبات التي انتقلت إليهم دفعة واحدة
+        (requested_by يجب أن يكون محملاً مسبقاً)
+        """
+        return NotificationManager.bulk_create_notifications(
+            NotificationLog(
+                recipient_id=approval.current_approver_id,
+                notification_type='approval_request',
+                title='طلب موافقة جديد',
+                message=f'لديك طلب موافقة جديد من {approval.requested_by.name} بخصوص {approval.get_approval_type_display()}',
+                related_group_id=approval.group_id,
+                related_project_id=approval.project_id,
+                related_approval_id=approval.approval_id,
+            )
+            for approval in approvals
+        )
 
 
 class SystemNotificationManager:
@@ -448,7 +675,7 @@ class SystemNotificationManager:
         )
     
     @staticmethod
-    def notify_all_users(title, message, notification_type='system_info'):
+    def notify_all_users(title, message, notification_type='system_info', progress=None):
         """
         إرسال إشعار لجميع المستخدمين النشطين
         
@@ -456,24 +683,20 @@ class SystemNotificationManager:
             title: عنوان الإشعار
             message: محتوى الإشعار
             notification_type: نوع الإشعار
+            progress: دالة تُستدعى بعد كل دفعة بعدد الإشعارات المرسلة حتى الآن (اختياري)
         
         Returns:
             int: عدد المستخدمين الذين تم إرسال الإشعار لهم
         """
         from .models import User
         
-        users = User.objects.filter(is_active=True)
-        count = 0
-        
-        for user in users:
-            NotificationManager.create_notification(
-                recipient=user,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                priority='medium'
-            )
-            count += 1
+        count = NotificationManager.fan_out(
+            User.objects.filter(is_active=True),
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            progress=progress
+        )
         
         logger.info(f"✓ تم إرسال إشعار نظام إلى {count} مستخدم")
         return count
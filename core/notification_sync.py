@@ -0,0 +1,132 @@
+# core/notification_sync.py
+
+import base64
+import hashlib
+import json
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import NotificationLog
+from . import notification_counters
+
+# ==============================================================================
+# 1. مزامنة الإشعارات بالتغييرات فقط
+# ==============================================================================
+# العميل يحتفظ برمز (cursor) يحوي آخر notification_id استلمه ووقت آخر مزامنة.
+# كل طلب يعيد الإشعارات الجديدة (id أكبر) ومعرفات الإشعارات التي قُرئت بعد ذلك
+# الوقت فقط، مع عدد غير المقروء. ETag مبني على صف NotificationCounter الذي يتغير مع كل
+# إدراج/قراءة/حذف، فإذا لم يتغير شيء يُرد بـ 304 بعد قراءة صف واحد فقط.
+#
+# المعرفات تُحجز عند الإدراج لا عند الاعتماد، فإشعار من transaction طويلة قد يظهر
+# بمعرف أصغر من آخر معرف استلمه العميل. لذلك تُعاد أيضاً الإشعارات ذات المعرف الأصغر
+# التي أُنشئت خلال LATE_INSERT_WINDOW قبل المزامنة السابقة، والعميل يدمجها بالمعرف.
+#
+# الحذف لا يترك أثراً في الجدول، فإذا حُذف أي إشعار للمستخدم بعد المزامنة السابقة
+# (NotificationCounter.deleted_at) تُعاد القائمة كاملة مع reset=True ويستبدل العميل
+# ما لديه بدلاً من دمجه.
+
+# هامش لتغطية التحديثات التي سُجّل وقتها قبل المزامنة السابقة ولم تُعتمد إلا بعدها
+CHANGE_WINDOW = timedelta(seconds=5)
+
+# أقصى مدة متوقعة بين إنشاء الإشعار واعتماد الـ transaction التي أنشأته
+LATE_INSERT_WINDOW = timedelta(minutes=2)
+
+MAX_ROWS = 200
+
+
+def encode_cursor(last_id, synced_at):
+    payload = json.dumps({'id': last_id, 't': synced_at.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(encoded):
+    """
+    فك رمز المزامنة
+
+    Raises:
+        ValueError: إذا كان الرمز غير صالح
+    """
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        synced_at = parse_datetime(cursor['t'])
+        if synced_at is None:
+            raise ValueError(cursor['t'])
+        return int(cursor['id']), synced_at
+    except (TypeError, KeyError, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(str(e))
+
+
+def get_etag(user, counts=None):
+    """
+    ETag حالة إشعارات المستخدم
+    """
+    counts = counts or notification_counters.get_counts(user)
+    updated_at = counts['updated_at'].isoformat() if counts['updated_at'] else ''
+    state = f"{user.pk}:{counts['unread_count']}:{counts['total_count']}:{updated_at}"
+    return 'W/"%s"' % hashlib.md5(state.encode('utf-8')).hexdigest()
+
+
+def get_changes(user, cursor=None, limit=MAX_ROWS, counts=None):
+    """
+    الإشعارات الجديدة والمتغيرة منذ رمز المزامنة
+
+    Args:
+        user: المستخدم
+        cursor: رمز المزامنة السابق (None لأول مزامنة)
+        limit: الحد الأقصى لعدد الإشعارات الجديدة
+        counts: عدادات المستخدم إن كانت مقروءة مسبقاً (get_counts)
+
+    Returns:
+        dict: notifications، read_ids، cursor الجديد، has_more، reset
+    """
+    synced_at = timezone.now()
+    queryset = NotificationLog.objects.filter(recipient=user).select_related(
+        'recipient', 'related_user', 'related_group', 'related_approval'
+    )
+
+    if cursor is not None:
+        last_id, changed_since = decode_cursor(cursor)
+        deleted_at = (counts or notification_counters.get_counts(user))['deleted_at']
+        reset = deleted_at is not None and deleted_at >= changed_since - CHANGE_WINDOW
+    else:
+        reset = False
+
+    if cursor is None or reset:
+        # أول مزامنة أو بعد حذف: آخر الإشعارات فقط، والرمز يبدأ من أحدثها
+        rows = list(queryset.order_by('-notification_id')[:limit])
+        last_id = rows[0].notification_id if rows else 0
+        return {
+            'notifications': rows,
+            'read_ids': [],
+            'cursor': encode_cursor(last_id, synced_at),
+            'has_more': False,
+            'reset': reset,
+        }
+
+    # الجديدة بترتيب تصاعدي حتى يتقدم الرمز بدون فجوات إذا تجاوزت الحد
+    new_rows = list(queryset.filter(notification_id__gt=last_id).order_by('notification_id')[:limit + 1])
+    has_more = len(new_rows) > limit
+    new_rows = new_rows[:limit]
+
+    # المعتمدة متأخرة بمعرف أصغر من الرمز (لا تؤثر على تقدمه)
+    late_rows = list(queryset.filter(
+        notification_id__lte=last_id,
+        created_at__gte=changed_since - LATE_INSERT_WINDOW
+    ).order_by('notification_id')[:limit])
+
+    # الإشعارات القديمة التي قُرئت: يكفي إرسال معرفاتها
+    read_ids = list(NotificationLog.objects.filter(
+        recipient=user,
+        notification_id__lte=last_id,
+        read_at__gte=changed_since - CHANGE_WINDOW
+    ).values_list('notification_id', flat=True))
+
+    if new_rows:
+        last_id = new_rows[-1].notification_id
+    return {
+        'notifications': late_rows + new_rows,
+        'read_ids': read_ids,
+        'cursor': encode_cursor(last_id, synced_at),
+        'has_more': has_more,
+        'reset': False,
+    }
@@ -0,0 +1,161 @@
+# core/pagination.py
+
+import base64
+import json
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    ترقيم الصفحات بالمفتاح (Keyset / Cursor) على الزوج (حقل الترتيب، المفتاح الأساسي)
+    كل صفحة تُجلب بشرط WHERE على آخر قيمة معروضة بدلاً من OFFSET، لذلك تكلفة
+    الصفحات العميقة مثل تكلفة الصفحة الأولى، ورموز next/previous ثابتة حتى مع إضافة صفوف جديدة
+
+    يجب أن يكون حقل الترتيب غير قابل لـ NULL
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'رمز الصفحة غير صالح'
+
+    # الترتيب الافتراضي عند عدم استخدام OrderingFilter
+    ordering = '-pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.pk_name = queryset.model._meta.pk.name
+        cursor = self.decode_cursor(request)
+        if cursor:
+            cursor = self.clean_cursor(cursor, queryset.model)
+        reverse = bool(cursor and cursor['r'])
+
+        # في الاتجاه العكسي (الصفحة السابقة) نقرأ بالترتيب المعاكس ثم نقلب النتائج
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}{self.pk_name}')
+        if cursor:
+            queryset = queryset.filter(self._seek(cursor['v'], cursor['pk'], descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        تحديد حقل الترتيب واتجاهه من OrderingFilter (إن وُجد) أو من الترتيب الافتراضي
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        field = (ordering or [self.ordering])[0]
+        if field.lstrip('-') == 'pk':
+            field = ('-' if field.startswith('-') else '') + queryset.model._meta.pk.name
+        return field.lstrip('-'), field.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    # ------------------------------------------------------------------
+    # ترميز وفك رموز الصفحات
+    # ------------------------------------------------------------------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return {'v': cursor['v'], 'pk': cursor['pk'], 'r': bool(cursor.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def clean_cursor(self, cursor, model):
+        """
+        تحويل قيم الرمز إلى نوع حقل الترتيب والمفتاح الأساسي قبل بناء الشرط،
+        حتى يُرفض الرمز المعدّل يدوياً بـ 404 بدلاً من خطأ في قاعدة البيانات
+        """
+        meta = model._meta
+        try:
+            value = meta.get_field(self.field).to_python(cursor['v'])
+            pk = meta.pk.to_python(cursor['pk'])
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None or pk is None:
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': value, 'pk': pk, 'r': cursor['r']}
+
+    def encode_cursor(self, value, pk, reverse):
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        payload = json.dumps({'v': value, 'pk': pk, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def _link(self, row, reverse):
+        token = self.encode_cursor(getattr(row, self.field), getattr(row, self.pk_name), reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def _seek(self, value, pk, descending):
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'{self.pk_name}__{op}': pk})
+
+
+class ProjectKeysetPagination(KeysetPagination):
+    ordering = '-start_date'
+
+
+class NotificationKeysetPagination(KeysetPagination):
+    ordering = '-created_at'
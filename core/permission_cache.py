@@ -0,0 +1,125 @@
+# core/permission_cache.py
+
+from collections import namedtuple
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Role, Permission, RolePermission, UserRoles
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# 1. ذاكرة مؤقتة للصلاحيات على مستوى العملية
+# ==============================================================================
+# جداول الأدوار والصلاحيات تُقرأ في كل طلب تقريباً ونادراً ما تتغير، لذلك تُترجم
+# مرة واحدة إلى فهرس {role_id: (type, frozenset(permissions))} داخل العملية.
+# رقم الإصدار يُحفظ في الـ cache المحدد بـ PERMISSION_CACHE_ALIAS، فإذا كان cache
+# مشتركاً (Redis مثلاً) يصل الإبطال إلى جميع العمليات، وإلا يبقى محلياً للعملية.
+
+VERSION_KEY = 'core:permissions:version'
+USER_ROLES_KEY = 'core:permissions:user_roles:{user_id}'
+
+RoleEntry = namedtuple('RoleEntry', ['type', 'permissions'])
+
+# (الإصدار, الفهرس) - يُستبدل كاملاً عند إعادة البناء
+_compiled = (None, {})
+
+
+def _backend():
+    return caches[getattr(settings, 'PERMISSION_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300)
+
+
+def _current_version():
+    backend = _backend()
+    version = backend.get(VERSION_KEY)
+    if version is None:
+        backend.add(VERSION_KEY, uuid4().hex, _timeout())
+        version = backend.get(VERSION_KEY)
+    return version
+
+
+def _compile_roles():
+    """
+    بناء فهرس الأدوار والصلاحيات باستعلامين
+    """
+    permissions = {}
+    for role_id, name in RolePermission.objects.values_list('role_id', 'permission__name'):
+        permissions.setdefault(role_id, set()).add(name)
+    return {
+        role_id: RoleEntry(role_type, frozenset(permissions.get(role_id, ())))
+        for role_id, role_type in Role.objects.values_list('role_ID', 'type')
+    }
+
+
+def get_role_index():
+    """
+    الحصول على فهرس الأدوار المترجم (يُعاد بناؤه فقط عند تغير رقم الإصدار)
+    """
+    global _compiled
+    version = _current_version()
+    compiled_version, roles = _compiled
+    if compiled_version != version:
+        roles = _compile_roles()
+        _compiled = (version, roles)
+    return roles
+
+
+def get_user_role_ids(user_id):
+    """
+    الحصول على معرفات أدوار المستخدم من الـ cache أو من قاعدة البيانات عند عدم وجودها
+    """
+    backend = _backend()
+    key = USER_ROLES_KEY.format(user_id=user_id)
+    role_ids = backend.get(key)
+    if role_ids is None:
+        role_ids = tuple(UserRoles.objects.filter(user_id=user_id).values_list('role_id', flat=True))
+        backend.set(key, role_ids, _timeout())
+    return role_ids
+
+
+def invalidate_roles():
+    """
+    إبطال فهرس الأدوار في جميع العمليات التي تشترك في نفس الـ cache
+    """
+    global _compiled
+    _backend().set(VERSION_KEY, uuid4().hex, _timeout())
+    _compiled = (None, {})
+
+
+def invalidate_user(user_id):
+    """
+    إبطال أدوار مستخدم معين
+    """
+    _backend().delete(USER_ROLES_KEY.format(user_id=user_id))
+
+
+# ==============================================================================
+# 2. إبطال الـ cache تلقائياً عند تعديل الجداول
+# ==============================================================================
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def handle_role_permissions_change(sender, **kwargs):
+    # بعد نجاح الـ transaction: طلب متزامن يقرأ قبلها كان سيعيد حفظ الأدوار القديمة
+    # في الـ cache لمدة PERMISSION_CACHE_TIMEOUT
+    transaction.on_commit(invalidate_roles)
+    logger.debug(f"تم إبطال cache الصلاحيات بعد تعديل {sender.__name__}")
+
+
+@receiver(post_save, sender=UserRoles)
+@receiver(post_delete, sender=UserRoles)
+def handle_user_roles_change(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -3,6 +3,7 @@
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from .models import Role, RolePermission, UserRoles
+from . import permission_cache
 
 # ==============================================================================
 # 1. قائمة الصلاحيات المتاحة في النظام
@@ -149,11 +150,79 @@ ROLES_PERMISSIONS = {
 # 3. دوال مساعدة للتحقق من الصلاحيات
 # ==============================================================================
 
+STUDENT_ROLES = ('Student',)
+SUPERVISOR_ROLES = ('Supervisor', 'Co-supervisor')
+ADMIN_ROLES = ('Department Head', 'Dean', 'University President', 'System Manager')
+
+
+class PermissionSnapshot:
+    """
+    لقطة أدوار وصلاحيات المستخدم
+    تُبنى مرة واحدة لكل طلب وتُحفظ على كائن المستخدم، فتصبح جميع عمليات التحقق
+    اللاحقة في نفس الطلب بدون أي استعلام لقاعدة البيانات
+    """
+
+    __slots__ = ('role_ids', 'role_types', 'permissions', '_role_keys')
+
+    def __init__(self, role_ids, role_types, permissions):
+        self.role_ids = frozenset(role_ids)
+        self.role_types = tuple(role_types)
+        self.permissions = frozenset(permissions)
+        # مطابقة أسماء الأدوار بدون حساسية لحالة الأحرف كما في ترتيب MySQL الافتراضي
+        self._role_keys = frozenset(role_type.casefold() for role_type in self.role_types if role_type)
+
+    def has_role(self, *role_types):
+        return any(role_type.casefold() in self._role_keys for role_type in role_types)
+
+    @classmethod
+    def build(cls, user):
+        """
+        بناء اللقطة من cache الصلاحيات المشترك بين الطلبات (بدون استعلامات عندما يكون دافئاً)
+        """
+        roles = permission_cache.get_role_index()
+        entries = [
+            (role_id, roles[role_id])
+            for role_id in permission_cache.get_user_role_ids(user.pk)
+            if role_id in roles
+        ]
+        permissions = set()
+        for _, entry in entries:
+            permissions |= entry.permissions
+        return cls(
+            [role_id for role_id, _ in entries],
+            [entry.type for _, entry in entries],
+            permissions
+        )
+
+
 class PermissionManager:
     """
     مدير الصلاحيات - يوفر دوال للتحقق من الصلاحيات والأدوار
     """
-    
+
+    SNAPSHOT_ATTR = '_permission_snapshot'
+
+    @staticmethod
+    def get_snapshot(user):
+        """
+        الحصول على لقطة أدوار وصلاحيات المستخدم (تُبنى عند أول استدعاء في الطلب)
+        """
+        if not user or not user.is_authenticated:
+            return None
+        snapshot = getattr(user, PermissionManager.SNAPSHOT_ATTR, None)
+        if snapshot is None:
+            snapshot = PermissionSnapshot.build(user)
+            setattr(user, PermissionManager.SNAPSHOT_ATTR, snapshot)
+        return snapshot
+
+    @staticmethod
+    def clear_snapshot(user):
+        """
+        حذف اللقطة المحفوظة (بعد تعديل أدوار المستخدم داخل نفس الطلب)
+        """
+        if user is not None and hasattr(user, PermissionManager.SNAPSHOT_ATTR):
+            delattr(user, PermissionManager.SNAPSHOT_ATTR)
+
     @staticmethod
     def has_permission(user, permission_code):
         """
@@ -163,17 +232,7 @@ class PermissionManager:
             return False
         if user.is_superuser:
             return True
-        
-        # الحصول على جميع الأدوار للمستخدم
-        user_roles = UserRoles.objects.filter(user=user).values_list('role_id', flat=True)
-        
-        # الحصول على جميع الصلاحيات المرتبطة بهذه الأدوار
-        permissions = RolePermission.objects.filter(
-            role_id__in=user_roles,
-            permission__name=permission_code
-        ).exists()
-        
-        return permissions
+        return permission_code in PermissionManager.get_snapshot(user).permissions
     
     @staticmethod
     def has_any_permission(user, permission_codes):
@@ -184,11 +243,8 @@ class PermissionManager:
             return False
         if user.is_superuser:
             return True
-        
-        for permission_code in permission_codes:
-            if PermissionManager.has_permission(user, permission_code):
-                return True
-        return False
+        permissions = PermissionManager.get_snapshot(user).permissions
+        return any(code in permissions for code in permission_codes)
     
     @staticmethod
     def has_all_permissions(user, permission_codes):
@@ -199,11 +255,8 @@ class PermissionManager:
             return False
         if user.is_superuser:
             return True
-        
-        for permission_code in permission_codes:
-            if not PermissionManager.has_permission(user, permission_code):
-                return False
-        return True
+        permissions = PermissionManager.get_snapshot(user).permissions
+        return all(code in permissions for code in permission_codes)
     
     @staticmethod
     def get_user_roles(user):
@@ -212,7 +265,7 @@ class PermissionManager:
         """
         if not user or not user.is_authenticated:
            return []
-        return UserRoles.objects.filter(user=user).select_related('role').values_list('role__type', flat=True)
+        return list(PermissionManager.get_snapshot(user).role_types)
     
     @staticmethod
     def get_user_permissions(user):
@@ -223,58 +276,45 @@ class PermissionManager:
             return []
         if user.is_superuser:
             return list(PERMISSIONS_LIST.keys())
-        
-        user_roles = UserRoles.objects.filter(user=user).values_list('role_id', flat=True)
-        permissions = RolePermission.objects.filter(
-            role_id__in=user_roles
-        ).values_list('permission__name', flat=True).distinct()
-        
-        return list(permissions)
+        return list(PermissionManager.get_snapshot(user).permissions)
     
     @staticmethod
     def is_supervisor(user):
         """التحقق من أن المستخدم مشرف"""
         if not user or not user.is_authenticated:
            return False
-        return UserRoles.objects.filter(
-            user=user,
-            role__type__in=['Supervisor', 'Co-supervisor']
-        ).exists()
+        return PermissionManager.get_snapshot(user).has_role(*SUPERVISOR_ROLES)
     
     @staticmethod
     def is_admin(user):
         """التحقق من أن المستخدم إداري"""
         if not user or not user.is_authenticated:
           return False
-        return UserRoles.objects.filter(
-            user=user,
-            role__type__in=['Department Head', 'Dean', 'University President', 'System Manager']
-        ).exists()
+        return PermissionManager.get_snapshot(user).has_role(*ADMIN_ROLES)
     
     @staticmethod
     def is_student(user):
         """التحقق من أن المستخدم طالب"""
         if not user or not user.is_authenticated:
           return False
-        return UserRoles.objects.filter(
-            user=user,
-            role__type='Student'
-        ).exists()
+        return PermissionManager.get_snapshot(user).has_role(*STUDENT_ROLES)
+    
+    @staticmethod
+    def can_manage_group(user):
+        """التحقق من أن المستخدم يستطيع إدارة أعضاء المجموعات"""
+        if not user or not user.is_authenticated:
+          return False
+        return PermissionManager.is_admin(user) or PermissionManager.has_permission(user, 'manage_group_members')
     
     @staticmethod
     def get_approval_chain(project_type):
         """
         الحصول على تسلسل الموافقات بناءً على نوع المشروع
-        المشاريع الحكومية المشتركة أو المجموعات التي ينشئها الإداريون
+        من ApprovalSequence عبر فهرس الموافقات المخزن، مع التسلسلات الافتراضية للأنواع غير المعرّفة
         """
-        approval_chains = {
-            'single_department': [1],  # المشرف فقط
-            'multi_department': [1, 2],  # المشرف + رئيس القسم
-            'multi_college': [1, 2, 3, 4],  # المشرف + رئيس القسم + العميد + رئيس الجامعة
-            'external': [1, 2],  # المشرف + رئيس القسم
-            'government': [1, 2, 3, 4],  # تسلسل كامل
-        }
-        return approval_chains.get(project_type, [1, 2])
+        from . import approval_workflow
+        
+        return list(approval_workflow.get_index().get_sequence(project_type))
     
     @staticmethod
     def get_next_approver(current_level, approval_chain):
@@ -0,0 +1,71 @@
+# core/realtime.py
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import NotificationLog
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# 1. تنبيه المتصفحات بوجود إشعارات جديدة عبر WebSocket
+# ==============================================================================
+# بعد نجاح الـ transaction تُرسل رسالة مزامنة خفيفة (بدون محتوى الإشعار) مرة واحدة
+# لكل مستلم في مجموعة notifications_<user_id>، فيجلب المتصفح التغييرات من
+# /notifications/sync/. إذا تجاوز عدد المستلمين REALTIME_PING_MAX_RECIPIENTS تُرسل
+# رسالة واحدة لمجموعة البث بدلاً من رسالة لكل مستلم، ومن لم يتغير شيء عنده يحصل
+# على 304 من نقطة المزامنة.
+
+BROADCAST_GROUP = 'notifications_all'
+
+
+def notification_group_name(user_id):
+    return f'notifications_{user_id}'
+
+
+def _max_recipients():
+    return getattr(settings, 'REALTIME_PING_MAX_RECIPIENTS', 200)
+
+
+def publish_notifications(notifications):
+    """
+    إرسال رسالة مزامنة لمستلمي مجموعة إشعارات محفوظة
+    """
+    channel_layer = get_channel_layer()
+    recipient_ids = {n.recipient_id for n in notifications if n.recipient_id}
+    if channel_layer is None or not recipient_ids:
+        return
+
+    message = {'type': 'notification_sync'}
+    try:
+        if len(recipient_ids) > _max_recipients():
+            async_to_sync(channel_layer.group_send)(BROADCAST_GROUP, message)
+            return
+        for recipient_id in recipient_ids:
+            async_to_sync(channel_layer.group_send)(notification_group_name(recipient_id), message)
+    except Exception as e:
+        # فشل الدفع لا يجب أن يُفشل العملية الأصلية، فالإشعار محفوظ في قاعدة البيانات
+        logger.error(f"✗ خطأ في دفع الإشعارات عبر WebSocket: {str(e)}")
+
+
+def publish_on_commit(notifications):
+    """
+    جدولة نشر الإشعارات بعد نجاح الـ transaction الحالية
+    """
+    notifications = list(notifications)
+    if notifications:
+        transaction.on_commit(lambda: publish_notifications(notifications))
+
+
+# ==============================================================================
+# 2. نشر الإشعارات المنشأة عبر save()
+# ==============================================================================
+
+@receiver(post_save, sender=NotificationLog)
+def handle_notification_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        publish_on_commit([instance])
@@ -0,0 +1,162 @@
+# core/reminders.py
+
+from collections import OrderedDict
+from uuid import uuid4
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import NotificationLog, ReminderLedger
+import logging
+
+logger = logging.getLogger(__name__)
+
+WINDOW_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def record_reminders(kind, keys):
+    """
+    تسجيل تذكيرات في السجل دفعة واحدة (المكرر يُتجاهل بفضل المفتاح الفريد)
+
+    Args:
+        kind: نوع التذكير
+        keys: صفوف (recipient_id, object_id, window)
+
+    Returns:
+        set: أزواج (recipient_id, object_id) التي أدرجها هذا الاستدعاء فعلاً، فالتشغيل
+        المتزامن الذي سبقه إلى نفس المفتاح هو من يرسل التذكير
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+    token = uuid4().hex
+    ReminderLedger.objects.bulk_create(
+        [
+            ReminderLedger(kind=kind, recipient_id=recipient_id, object_id=object_id, window=window, claim_token=token)
+            for recipient_id, object_id, window in keys
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+    return set(ReminderLedger.objects.filter(
+        kind=kind,
+        object_id__in={object_id for _, object_id, _ in keys},
+        recipient_id__in={recipient_id for recipient_id, _, _ in keys},
+        claim_token=token
+    ).values_list('recipient_id', 'object_id'))
+
+
+class ReminderDigest:
+    """
+    تجميع التذكيرات - بدلاً من إشعار (وبريد) لكل عنصر معلق في كل تشغيل، يحصل كل
+    مستلم على إشعار ملخص واحد لكل نافذة زمنية يحوي روابط العناصر في related_items.
+    المستلم الذي لديه عنصر واحد فقط يحصل على التذكير العادي لذلك العنصر.
+    """
+
+    # أقصى عدد من الأسطر في نص الملخص (الروابط في related_items تبقى كاملة)
+    MAX_LINES = 10
+
+    def __init__(self, kind, title, window_hours=None):
+        self.kind = kind
+        self.title = title
+        self.window = timedelta(hours=window_hours or getattr(settings, 'REMINDER_DIGEST_WINDOW_HOURS', 24))
+        self.items = OrderedDict()
+        # المستلمون الذين شملهم آخر تشغيل (كل عناصرهم ذُكّر بها)
+        self.reminded_recipients = []
+
+    def add(self, recipient, line, link, build_notification):
+        """
+        إضافة عنصر معلق
+
+        Args:
+            recipient: المستلم
+            line: سطر العنصر في نص الملخص
+            link: رابط العنصر {'type': ..., 'id': ...}
+            build_notification: دالة تبني إشعار العنصر المنفرد (تُستدعى فقط إذا لم يُجمع)
+        """
+        self.items.setdefault(recipient.pk, []).append((recipient, line, link, build_notification))
+
+    def build_single(self, entry):
+        _, _, link, build_notification = entry
+        notification = build_notification()
+        notification.related_items = {'kind': self.kind, 'items': [link]}
+        return notification
+
+    def window_start(self, now):
+        # النوافذ متتالية وثابتة الحدود حتى لا يتغير التجميع حسب وقت التشغيل
+        return WINDOW_EPOCH + self.window * ((now - WINDOW_EPOCH) // self.window)
+
+    def already_reminded(self, now):
+        """
+        المستلمون الذين وصلهم تذكير من هذا النوع في النافذة الحالية
+        """
+        return set(ReminderLedger.objects.filter(
+            kind=self.kind,
+            object_id=0,
+            window=self.window_start(now),
+            recipient_id__in=self.items.keys()
+        ).values_list('recipient_id', flat=True))
+
+    def build_digest(self, entries):
+        recipient = entries[0][0]
+        lines = [line for _, line, _, _ in entries[:self.MAX_LINES]]
+        if len(entries) > self.MAX_LINES:
+            lines.append(f'... و {len(entries) - self.MAX_LINES} أخرى')
+        return NotificationLog(
+            recipient=recipient,
+            notification_type='reminder',
+            title=f'{self.title} ({len(entries)})',
+            message='\n'.join(lines),
+            related_items={'kind': self.kind, 'items': [link for _, _, link, _ in entries]},
+        )
+
+    def build(self, now=None):
+        """
+        بناء الإشعارات المطلوبة (ملخص أو تذكير منفرد لكل مستلم)
+        """
+        now = now or timezone.now()
+        digest_enabled = getattr(settings, 'REMINDER_DIGEST_ENABLED', True)
+        skipped = self.already_reminded(now) if digest_enabled else set()
+
+        notifications = []
+        self.reminded_recipients = []
+        for recipient_id, entries in self.items.items():
+            if recipient_id in skipped:
+                continue
+            if not digest_enabled:
+                notifications.extend(self.build_single(entry) for entry in entries)
+            elif len(entries) == 1:
+                notifications.append(self.build_single(entries[0]))
+            else:
+                notifications.append(self.build_digest(entries))
+            self.reminded_recipients.append(recipient_id)
+        return notifications
+
+    def send(self, now=None):
+        """
+        إنشاء الإشعارات دفعة واحدة مع بريدها
+
+        Returns:
+            int: عدد الإشعارات المنشأة
+        """
+        from .utils import NotificationService
+
+        now = now or timezone.now()
+        notifications = self.build(now)
+        with transaction.atomic():
+            if getattr(settings, 'REMINDER_DIGEST_ENABLED', True):
+                window = self.window_start(now)
+                claimed = record_reminders(
+                    self.kind, [(recipient_id, 0, window) for recipient_id in self.reminded_recipients]
+                )
+                # المستلم الذي سبق تشغيلٌ متزامن إلى حجزه يُرسل له ذلك التشغيل
+                notifications = [n for n in notifications if (n.recipient_id, 0) in claimed]
+                self.reminded_recipients = [
+                    recipient_id for recipient_id in self.reminded_recipients if (recipient_id, 0) in claimed
+                ]
+            NotificationService.bulk_create_notifications(notifications)
+        logger.info(
+            f"✓ تذكيرات {self.kind}: {len(notifications)} إشعار "
+            f"لـ {sum(len(entries) for entries in self.items.values())} عنصر معلق"
+        )
+        return len(notifications)
@@ -0,0 +1,188 @@
+# core/retention.py
+
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import NotificationLog, NotificationArchive
+from . import notification_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationPurge:
+    """
+    حذف الإشعارات القديمة على دفعات مرتبة بالمفتاح الأساسي
+    كل دفعة transaction قصيرة مستقلة، مع توقف بين الدفعات حتى لا تُحجز الجداول
+    عن نقاط الإشعارات، ونقطة استئناف في SystemSettings بعد كل دفعة
+    """
+
+    CHECKPOINT_KEY = 'notification_purge_checkpoint'
+    CHECKPOINT_DESCRIPTION = 'نقطة استئناف حذف الإشعارات القديمة'
+    DAYS_SETTING = ('NOTIFICATION_RETENTION_DAYS', 90)
+
+    def __init__(self, days=None, batch_size=None, pause=None, max_seconds=None):
+        self.days = days if days is not None else getattr(settings, *self.DAYS_SETTING)
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_PURGE_BATCH_SIZE', 1000)
+        self.pause = pause if pause is not None else getattr(settings, 'NOTIFICATION_PURGE_PAUSE', 0.5)
+        # الحد الأقصى لمدة التشغيل (None بدون حد)، والباقي يُستأنف في التشغيل التالي
+        self.max_seconds = max_seconds
+
+    # ------------------------------------------------------------------
+    # نقطة الاستئناف
+    # ------------------------------------------------------------------
+
+    def load_checkpoint(self):
+        from .utils import get_system_setting
+
+        value = get_system_setting(self.CHECKPOINT_KEY)
+        if not value:
+            return None
+        try:
+            checkpoint = json.loads(value)
+            return parse_datetime(checkpoint['cutoff']), int(checkpoint['last_id'])
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"⚠ نقطة استئناف غير صالحة ({self.CHECKPOINT_KEY}): {value}")
+            return None
+
+    def save_checkpoint(self, cutoff, last_id):
+        from .utils import set_system_setting
+
+        set_system_setting(
+            self.CHECKPOINT_KEY,
+            json.dumps({'cutoff': cutoff.isoformat(), 'last_id': last_id}),
+            self.CHECKPOINT_DESCRIPTION
+        )
+
+    def clear_checkpoint(self):
+        from .utils import set_system_setting
+
+        set_system_setting(self.CHECKPOINT_KEY, '', self.CHECKPOINT_DESCRIPTION)
+
+    # ------------------------------------------------------------------
+    # التنفيذ
+    # ------------------------------------------------------------------
+
+    def get_candidates(self, cutoff):
+        return NotificationLog.objects.filter(created_at__lt=cutoff)
+
+    def process_batch(self, ids):
+        with transaction.atomic():
+            batch = NotificationLog.objects.filter(notification_id__in=ids)
+            notification_counters.record_deleted(batch)
+            deleted, _ = batch.delete()
+        return deleted
+
+    def delete_batch(self, cutoff, last_id):
+        """
+        معالجة دفعة واحدة بعد last_id
+
+        Returns:
+            tuple: (عدد المحذوف، آخر معرف في الدفعة أو None إذا انتهت الإشعارات)
+        """
+        ids = list(self.get_candidates(cutoff).filter(
+            notification_id__gt=last_id
+        ).order_by('notification_id').values_list('notification_id', flat=True)[:self.batch_size])
+        if not ids:
+            return 0, None
+        return self.process_batch(ids), ids[-1]
+
+    def run(self, restart=False):
+        """
+        تشغيل الدفعات حتى النهاية أو حتى انتهاء max_seconds
+
+        Args:
+            restart: تجاهل نقطة الاستئناف والبدء من جديد
+
+        Returns:
+            dict: deleted، batches، seconds، rows_per_second، completed
+        """
+        checkpoint = None if restart else self.load_checkpoint()
+        if checkpoint:
+            # إكمال التشغيل المنقطع بنفس تاريخ القطع حتى لا تُترك فجوات خلف نقطة الاستئناف
+            cutoff, last_id = checkpoint
+            logger.info(f"↻ استئناف {self.CHECKPOINT_KEY} بعد المعرف {last_id}")
+        else:
+            cutoff, last_id = timezone.now() - timedelta(days=self.days), 0
+
+        started = time.monotonic()
+        deleted_total = batches = 0
+        completed = False
+        while True:
+            deleted, batch_last_id = self.delete_batch(cutoff, last_id)
+            if batch_last_id is None:
+                completed = True
+                self.clear_checkpoint()
+                break
+
+            last_id = batch_last_id
+            deleted_total += deleted
+            batches += 1
+            self.save_checkpoint(cutoff, last_id)
+
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"✓ دفعة {batches}: معالجة {deleted} إشعار "
+                f"({deleted_total / elapsed if elapsed else 0:.0f} صف/ثانية)"
+            )
+            if self.max_seconds is not None and elapsed >= self.max_seconds:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        seconds = time.monotonic() - started
+        return {
+            'deleted': deleted_total,
+            'batches': batches,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(deleted_total / seconds, 1) if seconds else 0,
+            'completed': completed,
+        }
+
+
+class NotificationArchiver(NotificationPurge):
+    """
+    نقل الإشعارات المقروءة القديمة إلى NotificationArchive بنفس آلية الدفعات
+    حتى يبقى جدول NotificationLog وفهرسه (recipient, -created_at) صغيرين.
+    العدادات لا تتغير لأن الإشعارات المؤرشفة مقروءة وتبقى ضمن إجمالي المستخدم
+    """
+
+    CHECKPOINT_KEY = 'notification_archive_checkpoint'
+    CHECKPOINT_DESCRIPTION = 'نقطة استئناف أرشفة الإشعارات المقروءة'
+    DAYS_SETTING = ('NOTIFICATION_ARCHIVE_DAYS', 30)
+
+    def get_candidates(self, cutoff):
+        return NotificationLog.objects.filter(created_at__lt=cutoff, is_read=True)
+
+    def process_batch(self, ids):
+        with transaction.atomic():
+            batch = NotificationLog.objects.filter(notification_id__in=ids, is_read=True)
+            archived = [NotificationArchive.from_notification(notification) for notification in batch]
+            # ignore_conflicts يجعل إعادة الدفعة بعد انقطاع آمنة
+            NotificationArchive.objects.bulk_create(archived, ignore_conflicts=True)
+            NotificationLog.objects.filter(notification_id__in=[a.notification_id for a in archived]).delete()
+        return len(archived)
+
+
+class NotificationArchivePurge(NotificationPurge):
+    """
+    حذف الإشعارات المؤرشفة الأقدم من مدة الاحتفاظ بنفس آلية الدفعات ونقطة استئناف مستقلة،
+    حتى لا يكبر جدول الأرشيف بلا حد بعد أن ينقل إليه NotificationArchiver
+    """
+
+    CHECKPOINT_KEY = 'notification_archive_purge_checkpoint'
+    CHECKPOINT_DESCRIPTION = 'نقطة استئناف حذف الإشعارات المؤرشفة القديمة'
+
+    def get_candidates(self, cutoff):
+        return NotificationArchive.objects.filter(created_at__lt=cutoff)
+
+    def process_batch(self, ids):
+        with transaction.atomic():
+            batch = NotificationArchive.objects.filter(notification_id__in=ids)
+            notification_counters.record_archive_deleted(batch)
+            deleted, _ = batch.delete()
+        return deleted
@@ -1,9 +1,11 @@
 # core/scheduler.py
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from .models import GroupInvitation, NotificationLog
+from .leader_lease import LeaderLease
+from . import job_runs
 from .notification_manager import InvitationNotificationManager
 import logging
 
@@ -17,45 +19,109 @@ class NotificationScheduler:
     """
     
     scheduler = None
+    lease = None
+    
+    # اسم عقد القيادة: عملية واحدة فقط في المجموعة تنفذ المهام، والباقي احتياطي
+    LEASE_NAME = 'notification_scheduler'
+    
+    @staticmethod
+    def run_as_leader(job):
+        """
+        تغليف المهمة حتى لا تُنفذ إلا في العملية القائدة
+        """
+        def wrapper():
+            lease = NotificationScheduler.lease
+            if lease is None or not lease.is_leader:
+                return
+            with job_runs.track(job.__name__, 'scheduler'):
+                job()
+        wrapper.__name__ = job.__name__
+        return wrapper
+    
+    @staticmethod
+    def add_job(job, trigger, **options):
+        NotificationScheduler.scheduler.add_job(
+            NotificationScheduler.run_as_leader(job),
+            trigger,
+            id=job.__name__,
+            coalesce=True,
+            max_instances=1,
+            **options
+        )
     
     @staticmethod
     def start():
         """
         بدء جدولة الإشعارات
-        يتم استدعاء هذه الدالة عند بدء التطبيق
+        يتم استدعاء هذه الدالة عند بدء التطبيق، ويمكن استدعاؤها في كل العمليات:
+        المهام لا تُنفذ إلا في العملية التي تحمل عقد القيادة
         """
         if NotificationScheduler.scheduler is None:
+            NotificationScheduler.lease = LeaderLease(NotificationScheduler.LEASE_NAME)
             NotificationScheduler.scheduler = BackgroundScheduler()
             
-            # جدولة فحص الدعوات المنتهية الصلاحية كل ساعة
+            # نبض عقد القيادة (يبدأ فوراً ثم يتكرر)
             NotificationScheduler.scheduler.add_job(
+                NotificationScheduler.lease.heartbeat,
+                'interval',
+                seconds=getattr(settings, 'SCHEDULER_LEASE_HEARTBEAT', 15),
+                id='leader_heartbeat',
+                name='تجديد عقد قيادة الجدولة',
+                next_run_time=timezone.now(),
+                coalesce=True,
+                max_instances=1
+            )
+            
+            # جدولة فحص الدعوات المنتهية الصلاحية كل ساعة
+            NotificationScheduler.add_job(
                 NotificationScheduler.check_expiring_invitations,
                 'interval',
                 hours=1,
-                id='check_expiring_invitations',
                 name='فحص الدعوات المنتهية الصلاحية قريباً'
             )
             
             # جدولة فحص الدعوات المنتهية الصلاحية كل 6 ساعات
-            NotificationScheduler.scheduler.add_job(
+            NotificationScheduler.add_job(
                 NotificationScheduler.check_expired_invitations,
                 'interval',
                 hours=6,
-                id='check_expired_invitations',
                 name='فحص الدعوات المنتهية الصلاحية'
             )
             
             # جدولة حذف الإشعارات القديمة يومياً
-            NotificationScheduler.scheduler.add_job(
+            NotificationScheduler.add_job(
                 NotificationScheduler.cleanup_old_notifications,
                 'interval',
                 days=1,
-                id='cleanup_old_notifications',
                 name='حذف الإشعارات القديمة'
             )
             
+            # جدولة إرسال البريد الصادر كل دقيقة
+            NotificationScheduler.add_job(
+                NotificationScheduler.drain_email_outbox,
+                'interval',
+                minutes=1,
+                name='إرسال البريد الصادر'
+            )
+            
+            # جدولة أرشفة الإشعارات المقروءة القديمة يومياً
+            NotificationScheduler.add_job(
+                NotificationScheduler.archive_read_notifications,
+                'interval',
+                days=1,
+                name='أرشفة الإشعارات المقروءة القديمة'
+            )
+            
+            # جدولة حذف سجلات تشغيل المهام القديمة يومياً
+            NotificationScheduler.add_job(
+                NotificationScheduler.cleanup_old_job_runs,
+                'interval',
+                days=1,
+                name='حذف سجلات تشغيل المهام القديمة'
+            )
+            
             NotificationScheduler.scheduler.start()
-            logger.info("✓ تم بدء جدولة الإشعارات")
+            logger.info(f"✓ تم بدء جدولة الإشعارات ({NotificationScheduler.lease.holder})")
     
     @staticmethod
     def stop():
@@ -66,6 +132,9 @@ class NotificationScheduler:
         if NotificationScheduler.scheduler is not None:
             NotificationScheduler.scheduler.shutdown()
             NotificationScheduler.scheduler = None
+            # التنازل عن القيادة حتى تتولاها عملية احتياطية دون انتظار انتهاء العقد
+            NotificationScheduler.lease.release()
+            NotificationScheduler.lease = None
             logger.info("✓ تم إيقاف جدولة الإشعارات")
     
     @staticmethod
@@ -75,32 +144,12 @@ class NotificationScheduler:
         يتم استدعاء هذه الدالة تلقائياً كل ساعة
         """
         try:
-            now = timezone.now()
-            one_hour_later = now + timedelta(hours=1)
-            
-            # البحث عن الدعوات التي ستنتهي صلاحيتها قريباً
-            expiring_invitations = GroupInvitation.objects.filter(
-                status='pending',
-                expires_at__gte=now,
-                expires_at__lte=one_hour_later
-            )
-            
-            count = 0
-            for invitation in expiring_invitations:
-                # التحقق من أنه لم يتم إرسال تذكير مسبقاً
-                existing_reminder = NotificationLog.objects.filter(
-                    recipient=invitation.invited_student,
-                    notification_type='reminder',
-                    related_group=invitation.group,
-                    created_at__gte=now - timedelta(hours=2)
-                ).exists()
-                
-                if not existing_reminder:
-                    InvitationNotificationManager.notify_invitation_expiring_soon(invitation)
-                    count += 1
+            count = InvitationNotificationManager.notify_invitations_expiring_soon(within=timedelta(hours=1))
+            job_runs.record_rows(count)
             
             logger.info(f"✓ تم إرسال {count} تذكير للدعوات المنتهية الصلاحية قريباً")
         except Exception as e:
+            job_runs.record_error(e)
             logger.error(f"✗ خطأ في فحص الدعوات المنتهية الصلاحية: {str(e)}")
     
     @staticmethod
@@ -110,37 +159,72 @@ class NotificationScheduler:
         يتم استدعاء هذه الدالة تلقائياً كل 6 ساعات
         """
         try:
-            now = timezone.now()
-            
-            # البحث عن الدعوات المنتهية الصلاحية
-            expired_invitations = GroupInvitation.objects.filter(
-                status='pending',
-                expires_at__lt=now
-            )
+            from .utils import InvitationService
             
-            count = 0
-            for invitation in expired_invitations:
-                invitation.status = 'expired'
-                invitation.save()
-                
-                # إرسال إشعار للطالب
-                InvitationNotificationManager.notify_invitation_expired(invitation)
-                count += 1
+            count = InvitationService.expire_pending_invitations()
+            job_runs.record_rows(count)
             
             logger.info(f"✓ تم تحديث حالة {count} دعوة منتهية الصلاحية")
         except Exception as e:
+            job_runs.record_error(e)
             logger.error(f"✗ خطأ في فحص الدعوات المنتهية الصلاحية: {str(e)}")
     
     @staticmethod
     def cleanup_old_notifications():
         """
-        حذف الإشعارات القديمة (أكثر من 90 يوم)
+        حذف الإشعارات القديمة والمؤرشفة (أقدم من NOTIFICATION_RETENTION_DAYS)
         يتم استدعاء هذه الدالة تلقائياً يومياً
         """
         try:
             from .notification_manager import NotificationManager
             
-            deleted_count = NotificationManager.delete_old_notifications(days=90)
+            deleted_count = NotificationManager.delete_old_notifications()
+            job_runs.record_rows(deleted_count)
             logger.info(f"✓ تم حذف {deleted_count} إشعار قديم")
         except Exception as e:
+            job_runs.record_error(e)
             logger.error(f"✗ خطأ في حذف الإشعارات القديمة: {str(e)}")
+    
+    @staticmethod
+    def archive_read_notifications():
+        """
+        نقل الإشعارات المقروءة القديمة إلى جدول الأرشيف
+        يتم استدعاء هذه الدالة تلقائياً يومياً
+        """
+        try:
+            from .retention import NotificationArchiver
+            
+            report = NotificationArchiver().run()
+            job_runs.record_rows(report['deleted'])
+            logger.info(f"✓ تم أرشفة {report['deleted']} إشعار ({report['rows_per_second']} صف/ثانية)")
+        except Exception as e:
+            job_runs.record_error(e)
+            logger.error(f"✗ خطأ في أرشفة الإشعارات: {str(e)}")
+    
+    @staticmethod
+    def drain_email_outbox():
+        """
+        إرسال الرسائل المستحقة في صندوق البريد الصادر
+        يتم استدعاء هذه الدالة تلقائياً كل دقيقة
+        """
+        try:
+            from . import email_outbox
+            
+            totals = email_outbox.drain()
+            job_runs.record_rows(totals['sent'] + totals['failed'])
+        except Exception as e:
+            job_runs.record_error(e)
+            logger.error(f"✗ خطأ في إرسال البريد الصادر: {str(e)}")
+    
+    @staticmethod
+    def cleanup_old_job_runs():
+        """
+        حذف سجلات تشغيل المهام الأقدم من JOB_RUN_RETENTION_DAYS
+        يتم استدعاء هذه الدالة تلقائياً يومياً
+        """
+        try:
+            deleted_count = job_runs.prune()
+            job_runs.record_rows(deleted_count)
+        except Exception as e:
+            job_runs.record_error(e)
+            logger.error(f"✗ خطأ في حذف سجلات تشغيل المهام: {str(e)}")
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-import json
+from django.db import models
+from django.db.models import Prefetch, OuterRef, Subquery
 from django.utils import timezone
 from .models import (
     City, University, Branch, College, Department, Program,
@@ -7,8 +8,10 @@ from .models import (
     Group, GroupMembers, GroupSupervisors,
     Project, GroupInvitation, ApprovalRequest,
     NotificationLog, Notification,
-    GroupCreationRequest, AcademicAffiliation, GroupMemberApproval
+    GroupCreationRequest, AcademicAffiliation, GroupMemberApproval, JobRun
 )
+from .user_directory import UserDirectory
+from . import approval_workflow
 
 # ==============================================================================
 # 1. Serializers الموقع الجغرافي (Cities / Universities / Branches / Colleges)
@@ -72,7 +75,50 @@ class ProgramSerializer(serializers.ModelSerializer):
 # 2. Serializers المستخدمين
 # ==============================================================================
 
-class UserSerializer(serializers.ModelSerializer):
+class UserDirectoryListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer يحمّل بيانات جميع المستخدمين المرتبطين بالقائمة دفعة واحدة قبل التحويل
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        UserDirectory.from_context(self.context).load(
+            user for item in items for user in self.child.get_directory_users(item)
+        )
+        return super().to_representation(items)
+
+
+class UserDirectoryMixin:
+    """
+    يجمع المستخدمين الذين يعرضهم الـ Serializer (مباشرة أو عبر حقول متداخلة)
+    ويحمّل أدوارهم وانتماءهم من دليل المستخدمين المشترك بدلاً من استعلام لكل مستخدم
+    """
+
+    def get_directory_users(self, instance):
+        for field in self.fields.values():
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if not isinstance(field, UserDirectoryMixin) or field.write_only or field.source == '*':
+                continue
+            related = getattr(instance, field.source, None)
+            if related is None:
+                continue
+            if isinstance(related, models.manager.BaseManager):
+                for item in related.all():
+                    yield from field.get_directory_users(item)
+            else:
+                yield from field.get_directory_users(related)
+
+    @property
+    def user_directory(self):
+        return UserDirectory.from_context(self.context)
+
+    def to_representation(self, instance):
+        self.user_directory.load(self.get_directory_users(instance))
+        return super().to_representation(instance)
+
+
+class UserSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     roles = serializers.SerializerMethodField()
     department_id = serializers.SerializerMethodField()
     college_id = serializers.SerializerMethodField()
@@ -80,17 +126,21 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'name', 'email', 'phone', 'gender', 'roles', 'department_id', 'college_id']
+        list_serializer_class = UserDirectoryListSerializer
+
+    def get_directory_users(self, instance):
+        yield instance
 
     def get_roles(self, obj):
-        return list(UserRoles.objects.filter(user=obj).values('role__role_ID', 'role__type'))
+        return self.user_directory.get_roles(obj)
 
     def get_department_id(self, obj):
-        affiliation = getattr(obj, 'academicaffiliation', None)
-        return affiliation.department.id if affiliation and affiliation.department else None
+        affiliation = self.user_directory.get_affiliation(obj)
+        return affiliation['department_id'] if affiliation else None
 
     def get_college_id(self, obj):
-        affiliation = getattr(obj, 'academicaffiliation', None)
-        return affiliation.college.id if affiliation and affiliation.college else None
+        affiliation = self.user_directory.get_affiliation(obj)
+        return affiliation['college_id'] if affiliation else None
 
 
 class UserDetailSerializer(UserSerializer):
@@ -98,7 +148,7 @@ class UserDetailSerializer(UserSerializer):
         fields = UserSerializer.Meta.fields + ['company_name', 'date_joined']
 
 
-class AcademicAffiliationSerializer(serializers.ModelSerializer):
+class AcademicAffiliationSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     university = UniversitySerializer(read_only=True)
     college = CollegeSerializer(read_only=True)
@@ -107,47 +157,72 @@ class AcademicAffiliationSerializer(serializers.ModelSerializer):
     class Meta:
         model = AcademicAffiliation
         fields = '__all__'
+        list_serializer_class = UserDirectoryListSerializer
 
 
 # ==============================================================================
 # 3. Serializers المجموعات
 # ==============================================================================
 
-class GroupMembersSerializer(serializers.ModelSerializer):
+class GroupMembersSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     user_detail = UserSerializer(source='user', read_only=True)
 
     class Meta:
         model = GroupMembers
         fields = ['user', 'user_detail', 'group']
+        list_serializer_class = UserDirectoryListSerializer
 
 
-class GroupSupervisorsSerializer(serializers.ModelSerializer):
+class GroupSupervisorsSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     user_detail = UserSerializer(source='user', read_only=True)
 
     class Meta:
         model = GroupSupervisors
         fields = ['user', 'user_detail', 'group', 'type']
+        list_serializer_class = UserDirectoryListSerializer
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     members = serializers.SerializerMethodField()
     supervisors = serializers.SerializerMethodField()
     members_count = serializers.SerializerMethodField()
+    # عنوان المشروع من الـ select_related بدلاً من تحميل كل المشاريع في الواجهة لربط العناوين
+    project_title = serializers.CharField(source='project.title', read_only=True, default=None)
 
     class Meta:
         model = Group
-        fields = ['group_id', 'group_name', 'project', 'members', 'supervisors', 'members_count']
+        fields = ['group_id', 'group_name', 'project', 'project_title', 'members', 'supervisors', 'members_count']
+        list_serializer_class = UserDirectoryListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """
+        تحميل الأعضاء والمشرفين بعدد ثابت من الاستعلامات مهما كان عدد المجموعات
+        (أدوارهم وانتماؤهم تُحمّل دفعة واحدة عبر دليل المستخدمين)
+
+        Args:
+            queryset: QuerySet للمجموعات أو لنموذج يرتبط بالمجموعة
+            prefix: مسار العلاقة إلى المجموعة (مثل 'group__')
+        """
+        return queryset.select_related(f'{prefix}project').prefetch_related(
+            Prefetch(f'{prefix}groupmembers_set', queryset=GroupMembers.objects.select_related('user')),
+            Prefetch(f'{prefix}groupsupervisors_set', queryset=GroupSupervisors.objects.select_related('user')),
+        )
+
+    def get_directory_users(self, instance):
+        for member in instance.groupmembers_set.all():
+            yield member.user
+        for supervisor in instance.groupsupervisors_set.all():
+            yield supervisor.user
 
     def get_members(self, obj):
-        qs = GroupMembers.objects.filter(group=obj)
-        return GroupMembersSerializer(qs, many=True).data
+        return GroupMembersSerializer(obj.groupmembers_set.all(), many=True, context=self.context).data
 
     def get_supervisors(self, obj):
-        qs = GroupSupervisors.objects.filter(group=obj)
-        return GroupSupervisorsSerializer(qs, many=True).data
+        return GroupSupervisorsSerializer(obj.groupsupervisors_set.all(), many=True, context=self.context).data
 
     def get_members_count(self, obj):
-        return GroupMembers.objects.filter(group=obj).count()
+        return len(obj.groupmembers_set.all())
 
 
 class GroupDetailSerializer(GroupSerializer):
@@ -171,7 +246,7 @@ class GroupDetailSerializer(GroupSerializer):
 # 4. Serializers الدعوات
 # ==============================================================================
 
-class GroupInvitationSerializer(serializers.ModelSerializer):
+class GroupInvitationSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     invited_student_detail = UserSerializer(source='invited_student', read_only=True)
     invited_by_detail = UserSerializer(source='invited_by', read_only=True)
     group_detail = GroupSerializer(source='group', read_only=True)
@@ -180,6 +255,7 @@ class GroupInvitationSerializer(serializers.ModelSerializer):
     class Meta:
         model = GroupInvitation
         fields = '__all__'
+        list_serializer_class = UserDirectoryListSerializer
 
     def get_is_expired(self, obj):
         return obj.is_expired()
@@ -199,7 +275,7 @@ class CreateGroupInvitationSerializer(serializers.Serializer):
 # 5. Serializers المشاريع
 # ==============================================================================
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     college_name = serializers.CharField(source='college.name_ar', read_only=True)
     year = serializers.SerializerMethodField()
     supervisor_name = serializers.SerializerMethodField()
@@ -211,12 +287,27 @@ class ProjectSerializer(serializers.ModelSerializer):
             'project_id', 'title', 'type', 'college', 'college_name',
             'supervisor_name', 'start_date', 'end_date', 'year', 'state', 'description', 'created_by'
         ]
+        list_serializer_class = UserDirectoryListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        تحميل الكلية ومنشئ المشروع واسم المشرف الرئيسي ضمن نفس استعلام المشاريع
+        """
+        primary_supervisor = GroupSupervisors.objects.filter(
+            group__project=OuterRef('pk'), type='supervisor'
+        ).order_by('pk').values('user__name')[:1]
+        return queryset.select_related('college', 'created_by').annotate(
+            primary_supervisor_name=Subquery(primary_supervisor)
+        )
 
     def get_year(self, obj):
         return obj.start_date.year if obj.start_date else None
 
     def get_supervisor_name(self, obj):
-        rel = GroupSupervisors.objects.filter(group__project=obj, type='supervisor').select_related('user').first()
+        if hasattr(obj, 'primary_supervisor_name'):
+            return obj.primary_supervisor_name or "لا يوجد مشرف"
+        rel = GroupSupervisors.objects.filter(group__project=obj, type='supervisor').select_related('user').order_by('pk').first()
         if rel and rel.user:
             return rel.user.name
         return "لا يوجد مشرف"
@@ -226,7 +317,7 @@ class ProjectSerializer(serializers.ModelSerializer):
 # 6. Serializers الموافقات
 # ==============================================================================
 
-class ApprovalRequestSerializer(serializers.ModelSerializer):
+class ApprovalRequestSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     requested_by_detail = UserSerializer(source='requested_by', read_only=True)
     current_approver_detail = UserSerializer(source='current_approver', read_only=True)
     group_detail = GroupSerializer(source='group', read_only=True)
@@ -234,6 +325,7 @@ class ApprovalRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = ApprovalRequest
         fields = '__all__'
+        list_serializer_class = UserDirectoryListSerializer
 
 
 # ==============================================================================
@@ -281,6 +373,7 @@ class GroupCreateSerializer(serializers.Serializer):
             title=validated_data['project_title'],
             type=validated_data['project_type'],
             description=validated_data['project_description'],
+            college_id=validated_data['college_id'],
             start_date=timezone.now().date(),
             state='Pending Approval'
         )
@@ -302,7 +395,9 @@ class GroupCreateSerializer(serializers.Serializer):
             project=project,
             requested_by=requested_by,
             current_approver=requested_by,
-            comments=json.dumps(group_data),
+            # الطالب يؤكد الطلب أولاً ثم ينتقل إلى المشرف فرئيس القسم
+            approval_level=approval_workflow.LEVEL_REQUESTER,
+            request_data=group_data,
             status='pending'
         )
         return approval_request
@@ -312,7 +407,7 @@ class GroupCreateSerializer(serializers.Serializer):
 # 8. Serializers الإشعارات
 # ==============================================================================
 
-class NotificationLogSerializer(serializers.ModelSerializer):
+class NotificationLogSerializer(UserDirectoryMixin, serializers.ModelSerializer):
     recipient_detail = UserSerializer(source='recipient', read_only=True)
     related_user_detail = UserSerializer(source='related_user', read_only=True)
     notification_type_display = serializers.CharField(source='get_notification_type_display', read_only=True)
@@ -331,10 +426,12 @@ class NotificationLogSerializer(serializers.ModelSerializer):
             'related_project',
             'related_user', 'related_user_name', 'related_user_detail',
             'related_approval_type',
+            'related_items',
             'is_read', 'is_sent_email',
             'created_at', 'read_at',
         ]
         read_only_fields = fields
+        list_serializer_class = UserDirectoryListSerializer
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -386,3 +483,13 @@ class UserRolesSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserRoles
         fields = ['id', 'user', 'user_detail', 'role', 'role_detail']
+
+
+class JobRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobRun
+        fields = [
+            'run_id', 'job_name', 'source', 'status', 'worker',
+            'started_at', 'finished_at', 'duration_ms', 'rows_processed', 'error',
+        ]
+        read_only_fields = fields
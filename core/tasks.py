@@ -1,11 +1,13 @@
 # core/tasks.py
 
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
-from .models import GroupInvitation, NotificationLog
+from django.db import transaction
+from django.db.models import Q
+from .models import GroupInvitation, NotificationLog, User
 from datetime import timedelta
+from . import email_outbox, job_runs
 
 # ==============================================================================
 # 1. مهام الإشعارات البريدية
@@ -14,47 +16,38 @@ from datetime import timedelta
 @shared_task
 def send_email_task(subject, message, recipient_email):
     """
-    مهمة غير متزامنة لإرسال البريد الإلكتروني
+    مهمة لإضافة بريد إلى صندوق البريد الصادر ثم إرساله مع الرسائل المستحقة
     """
-    try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            fail_silently=False,
-        )
-        return f"تم إرسال البريد إلى {recipient_email}"
-    except Exception as e:
-        return f"خطأ في إرسال البريد: {str(e)}"
+    email_outbox.enqueue_email(subject, message, recipient_email)
+    drain_email_outbox.delay()
+    return f"تمت إضافة البريد إلى {recipient_email} للإرسال"
 
 
 @shared_task
 def send_notification_email(notification_id):
     """
-    مهمة لإرسال إشعار عبر البريد الإلكتروني
+    مهمة لإضافة بريد إشعار إلى صندوق البريد الصادر
     """
     try:
-        from .models import NotificationLog
-        notification = NotificationLog.objects.get(notification_id=notification_id)
-        
-        subject = f"[{notification.get_notification_type_display()}] {notification.title}"
-        message = f"{notification.message}\n\nتم الإرسال في: {notification.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [notification.recipient.email],
-            fail_silently=False,
-        )
-        
-        notification.is_sent_email = True
-        notification.save()
-        
-        return f"تم إرسال الإشعار إلى {notification.recipient.email}"
-    except Exception as e:
-        return f"خطأ: {str(e)}"
+        notification = NotificationLog.objects.select_related('recipient').get(notification_id=notification_id)
+    except NotificationLog.DoesNotExist:
+        return f"خطأ: الإشعار {notification_id} غير موجود"
+    
+    email_outbox.enqueue([notification])
+    drain_email_outbox.delay()
+    return f"تمت إضافة الإشعار إلى {notification.recipient.email} للإرسال"
+
+
+@shared_task
+@job_runs.tracked('celery')
+def drain_email_outbox():
+    """
+    مهمة لإرسال الرسائل المستحقة في صندوق البريد الصادر عبر اتصال واحد
+    تُشغل كل دقيقة وعند إضافة رسائل جديدة
+    """
+    totals = email_outbox.drain()
+    job_runs.record_rows(totals['sent'] + totals['failed'])
+    return f"أُرسل {totals['sent']} بريد، فشل {totals['failed']}"
 
 
 # ==============================================================================
@@ -62,35 +55,16 @@ def send_notification_email(notification_id):
 # ==============================================================================
 
 @shared_task
+@job_runs.tracked('celery')
 def expire_pending_invitations():
     """
     مهمة دورية لتحديد الدعوات المنتهية الصلاحية
     تُشغل كل ساعة
     """
-    now = timezone.now()
-    expired_count = 0
+    from .utils import InvitationService
     
-    # الحصول على الدعوات المعلقة التي انتهت صلاحيتها
-    expired_invitations = GroupInvitation.objects.filter(
-        status='pending',
-        expires_at__lt=now
-    )
-    
-    for invitation in expired_invitations:
-        invitation.status = 'expired'
-        invitation.save()
-        expired_count += 1
-        
-        # إشعار منشئ المجموعة
-        from .utils import NotificationService
-        NotificationService.create_notification(
-            recipient=invitation.invited_by,
-            notification_type='reminder',
-            title='انتهت صلاحية الدعوة',
-            message=f'انتهت صلاحية دعوة {invitation.invited_student.name} للانضمام إلى مجموعة {invitation.group.group_name}',
-            related_group=invitation.group,
-            related_user=invitation.invited_student,
-        )
+    expired_count = InvitationService.expire_pending_invitations()
+    job_runs.record_rows(expired_count)
     
     return f"تم تحديد {expired_count} دعوة منتهية الصلاحية"
 
@@ -100,58 +74,108 @@ def expire_pending_invitations():
 # ==============================================================================
 
 @shared_task
+@job_runs.tracked('celery')
 def send_pending_approvals_reminder():
     """
     مهمة دورية لإرسال تذكيرات للموافقين بالطلبات المعلقة
     تُشغل يومياً
     """
     from .models import ApprovalRequest
+    from .reminders import ReminderDigest
+    
+    now = timezone.now()
+    digest = ReminderDigest('pending_approvals', 'تذكير: طلبات موافقة معلقة')
+    
+    # الطلبات المعلقة منذ أكثر من 24 ساعة ولم يُذكَّر بها خلال آخر 24 ساعة (الفلترة في قاعدة البيانات)
+    day_ago = now - timedelta(days=1)
+    due_approvals = ApprovalRequest.objects.filter(
+        Q(last_reminded_at__isnull=True) | Q(last_reminded_at__lte=day_ago),
+        status='pending',
+        created_at__lte=day_ago,
+        current_approver__isnull=False
+    ).order_by()
     
-    # الحصول على طلبات الموافقة المعلقة
-    pending_approvals = ApprovalRequest.objects.filter(status='pending')
+    # صفوف خفيفة بدلاً من كائنات كاملة، والموافقون (وهم قلة) يُحمّلون باستعلام واحد
+    rows = list(due_approvals.values_list(
+        'approval_id', 'approval_type', 'created_at', 'group_id', 'project_id', 'current_approver_id'
+    ))
+    approvers = User.objects.in_bulk({row[5] for row in rows})
+    type_labels = dict(ApprovalRequest.APPROVAL_TYPE_CHOICES)
+    approval_ids = {}
     
-    for approval in pending_approvals:
-        # إرسال تذكير إذا مرت أكثر من 24 ساعة
-        if (timezone.now() - approval.created_at).days >= 1:
-            from .utils import NotificationService
-            NotificationService.create_notification(
-                recipient=approval.current_approver,
+    for approval_id, approval_type, created_at, group_id, project_id, approver_id in rows:
+        approval_ids.setdefault(approver_id, []).append(approval_id)
+        days = (now - created_at).days
+        type_display = type_labels.get(approval_type, approval_type)
+        digest.add(
+            approvers[approver_id],
+            f'- {type_display} منذ {days} أيام',
+            {'type': 'approval', 'id': approval_id},
+            lambda approver=approvers[approver_id], approval_id=approval_id, group_id=group_id,
+                   project_id=project_id, days=days, type_display=type_display: NotificationLog(
+                recipient=approver,
                 notification_type='reminder',
                 title='تذكير: طلب موافقة معلق',
-                message=f'لديك طلب موافقة معلق من نوع {approval.get_approval_type_display()} منذ {(timezone.now() - approval.created_at).days} أيام',
-                related_group=approval.group,
-                related_project=approval.project,
-                related_approval=approval,
+                message=f'لديك طلب موافقة معلق من نوع {type_display} منذ {days} أيام',
+                related_group_id=group_id,
+                related_project_id=project_id,
+                related_approval_id=approval_id,
             )
+        )
     
-    return f"تم إرسال تذكيرات للموافقين"
+    with transaction.atomic():
+        count = digest.send(now)
+        # تعليم الطلبات التي شملها التذكير فعلاً (لا إعادة تقييم due_approvals، فقد تتغير
+        # الطلبات أو موافقوها بين القراءة والتحديث). reminded_recipients هم من حجزهم هذا
+        # التشغيل فقط، فموافق حجزه تشغيل متزامن يُعلّم ذلك التشغيل طلباته
+        reminded_ids = [
+            approval_id
+            for approver_id in digest.reminded_recipients
+            for approval_id in approval_ids[approver_id]
+        ]
+        reminded = ApprovalRequest.objects.filter(approval_id__in=reminded_ids).update(last_reminded_at=now)
+    job_runs.record_rows(reminded)
+    return f"تم إرسال {count} تذكير للموافقين"
 
 
 @shared_task
+@job_runs.tracked('celery')
 def send_pending_invitations_reminder():
     """
     مهمة دورية لإرسال تذكيرات للطلاب بالدعوات المعلقة
     تُشغل كل 12 ساعة
     """
     from .models import GroupInvitation
+    from .reminders import ReminderDigest
+    
+    now = timezone.now()
+    digest = ReminderDigest('pending_invitations', 'تذكير: دعوات مجموعات معلقة')
     
-    # الحصول على الدعوات المعلقة
-    pending_invitations = GroupInvitation.objects.filter(status='pending')
+    # الحصول على الدعوات المعلقة منذ أكثر من 24 ساعة
+    pending_invitations = GroupInvitation.objects.filter(
+        status='pending',
+        created_at__lte=now - timedelta(hours=24)
+    ).select_related('invited_student', 'invited_by', 'group')
     
     for invitation in pending_invitations:
-        # إرسال تذكير إذا مرت أكثر من 24 ساعة
-        if (timezone.now() - invitation.created_at).hours >= 24:
-            from .utils import NotificationService
-            NotificationService.create_notification(
+        hours_left = max(int((invitation.expires_at - now).total_seconds() // 3600), 0)
+        digest.add(
+            invitation.invited_student,
+            f'- مجموعة {invitation.group.group_name} (تنتهي خلال {hours_left} ساعات)',
+            {'type': 'invitation', 'id': invitation.invitation_id},
+            lambda invitation=invitation, hours_left=hours_left: NotificationLog(
                 recipient=invitation.invited_student,
                 notification_type='reminder',
                 title='تذكير: دعوة مجموعة معلقة',
-                message=f'لديك دعوة معلقة للانضمام إلى مجموعة {invitation.group.group_name}. الدعوة تنتهي صلاحيتها في {(invitation.expires_at - timezone.now()).hours} ساعات',
+                message=f'لديك دعوة معلقة للانضمام إلى مجموعة {invitation.group.group_name}. الدعوة تنتهي صلاحيتها في {hours_left} ساعات',
                 related_group=invitation.group,
                 related_user=invitation.invited_by,
             )
+        )
     
-    return f"تم إرسال تذكيرات للطلاب"
+    count = digest.send(now)
+    job_runs.record_rows(sum(len(entries) for entries in digest.items.values()))
+    return f"تم إرسال {count} تذكير للطلاب"
 
 
 # ==============================================================================
@@ -159,22 +183,41 @@ def send_pending_invitations_reminder():
 # ==============================================================================
 
 @shared_task
+@job_runs.tracked('celery')
 def cleanup_old_notifications():
     """
-    مهمة دورية لحذف الإشعارات القديمة (أكثر من 90 يوم)
+    مهمة دورية لحذف الإشعارات القديمة والمؤرشفة (أقدم من NOTIFICATION_RETENTION_DAYS)
     تُشغل أسبوعياً
     """
-    from .models import NotificationLog
+    from .retention import NotificationPurge, NotificationArchivePurge
     
-    cutoff_date = timezone.now() - timedelta(days=90)
-    deleted_count, _ = NotificationLog.objects.filter(
-        created_at__lt=cutoff_date
-    ).delete()
+    report = NotificationPurge().run()
+    archive_report = NotificationArchivePurge().run()
+    job_runs.record_rows(report['deleted'] + archive_report['deleted'])
+    
+    return (
+        f"تم حذف {report['deleted']} إشعار قديم ({report['rows_per_second']} صف/ثانية) "
+        f"و {archive_report['deleted']} إشعار مؤرشف"
+    )
+
+
+@shared_task
+@job_runs.tracked('celery')
+def archive_read_notifications():
+    """
+    مهمة دورية لنقل الإشعارات المقروءة القديمة إلى جدول الأرشيف
+    تُشغل يومياً
+    """
+    from .retention import NotificationArchiver
+    
+    report = NotificationArchiver().run()
+    job_runs.record_rows(report['deleted'])
     
-    return f"تم حذف {deleted_count} إشعار قديم"
+    return f"تم أرشفة {report['deleted']} إشعار ({report['rows_per_second']} صف/ثانية)"
 
 
 @shared_task
+@job_runs.tracked('celery')
 def cleanup_old_expired_invitations():
     """
     مهمة دورية لحذف الدعوات المنتهية القديمة (أكثر من 30 يوم)
@@ -187,5 +230,19 @@ def cleanup_old_expired_invitations():
         status__in=['expired', 'rejected'],
         responded_at__lt=cutoff_date
     ).delete()
+    job_runs.record_rows(deleted_count)
     
     return f"تم حذف {deleted_count} دعوة قديمة"
+
+
+@shared_task
+@job_runs.tracked('celery')
+def cleanup_old_job_runs():
+    """
+    مهمة دورية لحذف سجلات تشغيل المهام القديمة
+    تُشغل يومياً
+    """
+    deleted_count = job_runs.prune()
+    job_runs.record_rows(deleted_count)
+    
+    return f"تم حذف {deleted_count} سجل تشغيل قديم"
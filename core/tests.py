@@ -1,3 +1,1945 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from . import (
+    approval_workflow, email_outbox, filter_options, notification_counters, notification_sync, permission_cache,
+    realtime, reminders, tasks
+)
+from .models import (
+    AcademicAffiliation, ApprovalRequest, Branch, City, College, Department, EmailOutbox, Group,
+    GroupCreationRequest, GroupInvitation, GroupMemberApproval, GroupMembers, GroupSupervisors, JobRun,
+    NotificationArchive, NotificationCounter, NotificationLog, Permission, Project, Role, RolePermission,
+    SchedulerLease, University, User, UserRoles, check_and_finalize_group
+)
+from .leader_lease import LeaderLease
+from .notification_manager import InvitationNotificationManager, NotificationManager, SystemNotificationManager
+from .permissions import PermissionManager
+from .reminders import ReminderDigest
+from .retention import NotificationArchivePurge, NotificationArchiver, NotificationPurge
+from .scheduler import NotificationScheduler
+from .serializers import ProjectSerializer
+from .utils import InvitationService, NotificationService
+from .views import submit_group_creation_request
+
+# الاختبارات لا تحتاج خادم Redis: cache محلي لكل عملية الاختبار
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'core-tests',
+    }
+}
+
+ROLE_TABLES = (Role._meta.db_table, RolePermission._meta.db_table, UserRoles._meta.db_table)
+
+
+def role_queries(captured):
+    """عدد الاستعلامات التي قرأت جداول الأدوار والصلاحيات"""
+    return sum(
+        1 for query in captured
+        if any(f'"{table}"' in query['sql'] or f'`{table}`' in query['sql'] for table in ROLE_TABLES)
+    )
+
+
+# ==============================================================================
+# 1. لقطة الصلاحيات
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PermissionSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dean_role = Role.objects.create(type='Dean')
+        cls.student_role = Role.objects.create(type='Student')
+        cls.supervisor_role = Role.objects.create(type='Supervisor')
+        permission = Permission.objects.create(name='approve_projects')
+        RolePermission.objects.create(role=cls.dean_role, permission=permission)
+        cls.dean = User.objects.create_user(username='dean', password='x')
+        UserRoles.objects.create(user=cls.dean, role=cls.dean_role)
+
+    def setUp(self):
+        cache.clear()
+        permission_cache.invalidate_roles()
+
+    def fresh_user(self):
+        # كائن جديد كما في كل طلب HTTP (اللقطة محفوظة على الكائن)
+        return User.objects.get(pk=self.dean.pk)
+
+    def test_cold_snapshot_costs_three_queries(self):
+        user = self.fresh_user()
+        # أدوار وصلاحيات النظام (استعلامان) + أدوار المستخدم (استعلام)
+        with self.assertNumQueries(3):
+            snapshot = PermissionManager.get_snapshot(user)
+        self.assertEqual(snapshot.role_types, ('Dean',))
+        self.assertIn('approve_projects', snapshot.permissions)
+
+    def test_predicates_reuse_snapshot_within_request(self):
+        user = self.fresh_user()
+        PermissionManager.get_snapshot(user)
+        with self.assertNumQueries(0):
+            self.assertTrue(PermissionManager.is_admin(user))
+            self.assertFalse(PermissionManager.is_student(user))
+            self.assertFalse(PermissionManager.is_supervisor(user))
+            self.assertTrue(PermissionManager.has_permission(user, 'approve_projects'))
+            self.assertFalse(PermissionManager.has_permission(user, 'delete_projects'))
+
+    def test_warm_cache_serves_later_requests_without_queries(self):
+        PermissionManager.get_snapshot(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(PermissionManager.is_admin(user))
+
+    def test_user_role_change_invalidates_cached_roles(self):
+        PermissionManager.get_snapshot(self.fresh_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRoles.objects.create(user=self.dean, role=self.supervisor_role)
+        user = self.fresh_user()
+        # فهرس الأدوار لا يزال صالحاً، فقط أدوار المستخدم تُقرأ من جديد
+        with self.assertNumQueries(1):
+            self.assertTrue(PermissionManager.is_supervisor(user))
+
+    def test_role_permission_change_invalidates_role_index(self):
+        PermissionManager.get_snapshot(self.fresh_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            RolePermission.objects.create(
+                role=self.dean_role,
+                permission=Permission.objects.create(name='delete_projects')
+            )
+        user = self.fresh_user()
+        with self.assertNumQueries(2):
+            self.assertTrue(PermissionManager.has_permission(user, 'delete_projects'))
+
+    def test_invalidation_waits_for_commit(self):
+        PermissionManager.get_snapshot(self.fresh_user())
+        with self.captureOnCommitCallbacks() as callbacks:
+            UserRoles.objects.create(user=self.dean, role=self.supervisor_role)
+            # قبل الاعتماد: قراءة متزامنة ترى الأدوار المحفوظة ولا تعيد حفظ القديمة بعده
+            self.assertFalse(PermissionManager.is_supervisor(self.fresh_user()))
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(PermissionManager.is_supervisor(self.fresh_user()))
+
+    def test_role_change_invalidates_index_after_commit(self):
+        PermissionManager.get_snapshot(self.fresh_user())
+        with self.captureOnCommitCallbacks() as callbacks:
+            RolePermission.objects.create(
+                role=self.dean_role,
+                permission=Permission.objects.create(name='delete_projects')
+            )
+        self.assertFalse(PermissionManager.has_permission(self.fresh_user(), 'delete_projects'))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(PermissionManager.has_permission(self.fresh_user(), 'delete_projects'))
+
+    def test_endpoints_skip_role_queries_on_warm_cache(self):
+        client = APIClient()
+        for url in ('/api/projects/', '/api/approvals/'):
+            with self.subTest(url=url):
+                cache.clear()
+                permission_cache.invalidate_roles()
+
+                client.force_authenticate(self.fresh_user())
+                with CaptureQueriesContext(connection) as cold:
+                    self.assertEqual(client.get(url).status_code, 200)
+                # لقطة واحدة للطلب كاملاً مهما تعددت عمليات التحقق
+                self.assertEqual(role_queries(cold.captured_queries), 3)
+
+                client.force_authenticate(self.fresh_user())
+                with CaptureQueriesContext(connection) as warm:
+                    self.assertEqual(client.get(url).status_code, 200)
+                self.assertEqual(role_queries(warm.captured_queries), 0)
+                self.assertEqual(len(warm.captured_queries), len(cold.captured_queries) - 3)
+
+
+# ==============================================================================
+# 2. خيارات فلترة المشاريع
+# ==============================================================================
+
+def make_projects(count, college=None):
+    Project.objects.bulk_create([
+        Project(
+            title=f'Project {i}',
+            type=('Government', 'Private')[i % 2],
+            college=college,
+            start_date=date(2020 + i % 6, 1, 1),
+            description='-'
+        )
+        for i in range(count)
+    ], batch_size=1000)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FilterOptionsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = College.objects.create(name_ar='كلية الهندسة')
+        make_projects(10, cls.college)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_is_five_queries_regardless_of_rows(self):
+        with self.assertNumQueries(5):
+            filter_options.get_filter_options()
+        cache.clear()
+        make_projects(300, self.college)
+        with self.assertNumQueries(5):
+            options = filter_options.get_filter_options()
+        self.assertEqual(options['years'], [str(year) for year in range(2025, 2019, -1)])
+
+    def test_cache_hit_costs_no_queries(self):
+        expected = filter_options.get_filter_options()
+        with self.assertNumQueries(0):
+            self.assertEqual(filter_options.get_filter_options(), expected)
+
+    def test_project_change_rebuilds_after_commit(self):
+        filter_options.get_filter_options()
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(
+                title='New', type='Government', start_date=date(2030, 1, 1), description='-'
+            )
+        with self.assertNumQueries(5):
+            self.assertIn('2030', filter_options.get_filter_options()['years'])
+
+    def test_supervisor_change_rebuilds_after_commit(self):
+        filter_options.get_filter_options()
+        supervisor = User.objects.create_user(username='sup', first_name='Ali', last_name='Omar')
+        project = Project.objects.first()
+        group = Group.objects.create(project=project, group_name='G1')
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupSupervisors.objects.create(user=supervisor, group=group)
+        names = [s['name'] for s in filter_options.get_filter_options()['supervisors']]
+        self.assertEqual(names, ['Ali Omar'])
+
+    def test_login_does_not_invalidate(self):
+        filter_options.get_filter_options()
+        user = User.objects.create_user(username='student')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@skipUnless(os.environ.get('FILTER_OPTIONS_BENCHMARK'), 'set FILTER_OPTIONS_BENCHMARK=1 to run')
+class FilterOptionsBenchmark(TestCase):
+    """
+    مقارنة البناء الكامل بالقراءة من الـ cache حتى 100 ألف مشروع
+    """
+
+    SIZES = (1000, 10000, 100000)
+    HITS = 100
+
+    def test_cache_hit_is_constant(self):
+        college = College.objects.create(name_ar='كلية')
+        created = 0
+        for size in self.SIZES:
+            make_projects(size - created, college)
+            created = size
+            cache.clear()
+
+            started = time.perf_counter()
+            with self.assertNumQueries(5):
+                filter_options.get_filter_options()
+            build_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            with self.assertNumQueries(0):
+                for _ in range(self.HITS):
+                    filter_options.get_filter_options()
+            hit_ms = (time.perf_counter() - started) * 1000 / self.HITS
+
+            print(f"\n{size:>7} projects: build {build_ms:.1f}ms, cache hit {hit_ms:.3f}ms")
+            self.assertLess(hit_ms, build_ms)
+
+
+# ==============================================================================
+# 3. ترقيم الصفحات بالمفتاح
+# ==============================================================================
+
+def encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        make_projects(7)
+        cls.student = User.objects.create_user(username='student')
+        UserRoles.objects.create(user=cls.student, role=Role.objects.create(type='Student'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_next_links_walk_every_project_once(self):
+        seen = []
+        url = '/api/projects/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [project['project_id'] for project in response.data['results']]
+            url = response.data['next']
+        self.assertCountEqual(seen, Project.objects.values_list('project_id', flat=True))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_invalid_cursor_is_not_found(self):
+        cursors = [
+            'not-base64!',
+            encode({'v': 'notadate', 'pk': 1}),
+            encode({'v': '2024-01-01', 'pk': 'abc'}),
+            encode({'v': None, 'pk': 1}),
+            encode({'v': ['2024-01-01'], 'pk': {}}),
+            encode({'pk': 1}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/projects/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_stats_cover_every_project_without_loading_rows(self):
+        Project.objects.filter(pk=Project.objects.first().pk).update(state='Accepted')
+        response = self.client.get('/api/projects/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(response.data['states'], {'Pending': 6, 'Accepted': 1})
+        self.assertEqual(response.data['types'], {'Government': 4, 'Private': 3})
+
+        response = self.client.get('/api/projects/stats/', {'type': 'Government'})
+        self.assertEqual(response.data['count'], 4)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/projects/stats/')
+        make_projects(50)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/projects/stats/')
+        self.assertEqual(response.data['count'], 57)
+        self.assertEqual(len(many), len(few))
+
+    def test_cursor_is_validated_against_ordering_field(self):
+        cursor = encode({'v': 'notadate', 'pk': 1})
+        response = self.client.get('/api/projects/', {'cursor': cursor, 'ordering': 'title'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/projects/', {'cursor': cursor, 'ordering': 'project_id'})
+        self.assertEqual(response.status_code, 404)
+
+
+# ==============================================================================
+# 4. تنبيهات WebSocket
+# ==============================================================================
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RealtimePingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'user{i}') for i in range(3)]
+
+    def setUp(self):
+        self.layer = get_channel_layer()
+        self.channels = {}
+        for user in self.users:
+            channel = async_to_sync(self.layer.new_channel)()
+            async_to_sync(self.layer.group_add)(realtime.notification_group_name(user.pk), channel)
+            async_to_sync(self.layer.group_add)(realtime.BROADCAST_GROUP, channel)
+            self.channels[user.pk] = channel
+        # متصل لا يستلم أياً من هذه الإشعارات
+        self.bystander = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(realtime.BROADCAST_GROUP, self.bystander)
+
+    def received(self, channel):
+        messages = []
+        while True:
+            try:
+                messages.append(async_to_sync(asyncio.wait_for)(self.layer.receive(channel), 0.01))
+            except asyncio.TimeoutError:
+                return messages
+
+    def notifications(self):
+        return [
+            NotificationLog(recipient=user, title='t', message='m')
+            for user in self.users for _ in range(2)
+        ]
+
+    def test_one_sync_ping_per_recipient(self):
+        realtime.publish_notifications(self.notifications())
+        for channel in self.channels.values():
+            self.assertEqual(self.received(channel), [{'type': 'notification_sync'}])
+        self.assertEqual(self.received(self.bystander), [])
+
+    @override_settings(REALTIME_PING_MAX_RECIPIENTS=2)
+    def test_large_fan_out_sends_single_broadcast(self):
+        with self.assertNumQueries(0):
+            realtime.publish_notifications(self.notifications())
+        for channel in self.channels.values():
+            self.assertEqual(self.received(channel), [{'type': 'notification_sync'}])
+        self.assertEqual(self.received(self.bystander), [{'type': 'notification_sync'}])
+
+    def test_ping_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            NotificationLog.objects.create(recipient=self.users[0], title='t', message='m')
+        self.assertEqual(self.received(self.channels[self.users[0].pk]), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.received(self.channels[self.users[0].pk]), [{'type': 'notification_sync'}])
+
+
+# ==============================================================================
+# 5. مزامنة الإشعارات
+# ==============================================================================
+
+class NotificationSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+
+    def notify(self, count=1):
+        return NotificationManager.bulk_create_notifications([
+            NotificationLog(recipient=self.user, notification_type='system', title='t', message='m')
+            for _ in range(count)
+        ])
+
+    def ids(self, changes):
+        return [n.notification_id for n in changes['notifications']]
+
+    def test_late_committed_rows_are_resent(self):
+        early, late = self.notify(2)
+        # العميل رأى late فقط (early اعتُمد بعد المزامنة رغم أن معرفه أصغر)
+        cursor = notification_sync.encode_cursor(late.notification_id, timezone.now())
+        changes = notification_sync.get_changes(self.user, cursor)
+        self.assertIn(early.notification_id, self.ids(changes))
+        self.assertFalse(changes['reset'])
+
+    def test_rows_outside_lookback_are_not_resent(self):
+        old, = self.notify()
+        NotificationLog.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        cursor = notification_sync.encode_cursor(old.notification_id, timezone.now())
+        self.assertEqual(self.ids(notification_sync.get_changes(self.user, cursor)), [])
+
+    def test_paging_advances_past_recent_rows(self):
+        self.notify(12)
+        cursor = notification_sync.encode_cursor(0, timezone.now())
+        seen = set()
+        for _ in range(5):
+            changes = notification_sync.get_changes(self.user, cursor, limit=5)
+            seen.update(self.ids(changes))
+            cursor = changes['cursor']
+            if not changes['has_more']:
+                break
+        self.assertFalse(changes['has_more'])
+        self.assertEqual(len(seen), 12)
+
+    def test_deletion_forces_full_refresh(self):
+        first, second = self.notify(2)
+        changes = notification_sync.get_changes(self.user)
+        NotificationManager.delete_notification(first.notification_id, self.user)
+        changes = notification_sync.get_changes(self.user, changes['cursor'])
+        self.assertTrue(changes['reset'])
+        self.assertEqual(self.ids(changes), [second.notification_id])
+
+    def test_incremental_sync_is_three_queries(self):
+        self.notify(3)
+        cursor = notification_sync.get_changes(self.user)['cursor']
+        counts = notification_counters.get_counts(self.user)
+        # الجديدة + المعتمدة متأخرة + المقروءة
+        with self.assertNumQueries(3):
+            notification_sync.get_changes(self.user, cursor, counts=counts)
+
+
+# ==============================================================================
+# 6. الاحتفاظ بالإشعارات
+# ==============================================================================
+
+class NotificationPurgeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='purged')
+
+    def notify(self, days_old, count):
+        notifications = NotificationManager.bulk_create_notifications([
+            NotificationLog(recipient=self.user, notification_type='system', title='t', message='m')
+            for _ in range(count)
+        ])
+        NotificationLog.objects.filter(pk__in=[n.pk for n in notifications]).update(
+            created_at=timezone.now() - timedelta(days=days_old)
+        )
+
+    def test_deletes_in_batches_with_a_pause_between_them(self):
+        self.notify(days_old=120, count=5)
+        self.notify(days_old=10, count=1)
+        with mock.patch('core.retention.time.sleep') as sleep:
+            report = NotificationPurge(days=90, batch_size=2, pause=0.25).run()
+        self.assertEqual((report['deleted'], report['batches'], report['completed']), (5, 3, True))
+        self.assertEqual(sleep.call_args_list, [mock.call(0.25)] * 3)
+        self.assertEqual(NotificationLog.objects.count(), 1)
+        self.assertEqual(notification_counters.get_counts(self.user)['unread_count'], 1)
+        self.assertIsNone(NotificationPurge().load_checkpoint())
+
+    def test_max_seconds_stops_after_a_batch_and_resumes(self):
+        self.notify(days_old=120, count=5)
+        report = NotificationPurge(days=90, batch_size=2, pause=0, max_seconds=0).run()
+        self.assertEqual((report['deleted'], report['batches'], report['completed']), (2, 1, False))
+        self.assertIsNotNone(NotificationPurge().load_checkpoint())
+
+        report = NotificationPurge(days=90, batch_size=2, pause=0).run()
+        self.assertEqual((report['deleted'], report['completed']), (3, True))
+        self.assertFalse(NotificationLog.objects.exists())
+
+    def test_report_rows_per_second(self):
+        self.notify(days_old=120, count=4)
+        clock = iter([0.0, 1.0, 2.0, 2.0])
+        with mock.patch('core.retention.time.monotonic', side_effect=lambda: next(clock)):
+            report = NotificationPurge(days=90, batch_size=2, pause=0).run()
+        self.assertEqual(report['seconds'], 2.0)
+        self.assertEqual(report['rows_per_second'], 2.0)
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS=30)
+    def test_cleanup_task_uses_retention_setting(self):
+        self.notify(days_old=40, count=2)
+        self.notify(days_old=10, count=1)
+        tasks.cleanup_old_notifications()
+        self.assertEqual(NotificationLog.objects.count(), 1)
+
+
+class NotificationArchivePurgeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='archived')
+
+    def archive(self, days_old, count):
+        notifications = NotificationManager.bulk_create_notifications([
+            NotificationLog(recipient=self.user, notification_type='system', title='t', message='m', is_read=True)
+            for _ in range(count)
+        ])
+        NotificationLog.objects.filter(pk__in=[n.pk for n in notifications]).update(
+            created_at=timezone.now() - timedelta(days=days_old)
+        )
+
+    def test_archiver_then_purge_removes_expired_archive_rows(self):
+        self.archive(days_old=120, count=3)
+        self.archive(days_old=40, count=2)
+        self.assertEqual(NotificationArchiver(pause=0).run()['deleted'], 5)
+        self.assertEqual(NotificationArchive.objects.count(), 5)
+
+        report = NotificationArchivePurge(days=90, batch_size=2, pause=0).run()
+        self.assertEqual(report['deleted'], 3)
+        self.assertTrue(report['completed'])
+        self.assertEqual(NotificationArchive.objects.count(), 2)
+        # المؤرشف جزء من الإجمالي، فيُنقص عند حذفه
+        self.assertEqual(notification_counters.get_counts(self.user)['total_count'], 2)
+        self.assertEqual(notification_counters.reconcile(dry_run=True), [])
+
+    def test_purge_resumes_from_its_own_checkpoint(self):
+        self.archive(days_old=120, count=5)
+        NotificationArchiver(pause=0).run()
+        NotificationPurge().save_checkpoint(timezone.now(), 10 ** 9)
+
+        report = NotificationArchivePurge(days=90, batch_size=2, pause=0, max_seconds=0).run()
+        self.assertEqual((report['deleted'], report['completed']), (2, False))
+        report = NotificationArchivePurge(days=90, batch_size=2, pause=0).run()
+        self.assertEqual((report['deleted'], report['completed']), (3, True))
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS=100)
+    def test_cleanup_task_uses_retention_setting(self):
+        self.archive(days_old=120, count=2)
+        self.archive(days_old=95, count=1)
+        NotificationArchiver(pause=0).run()
+        tasks.cleanup_old_notifications()
+        self.assertEqual(NotificationArchive.objects.count(), 1)
+
+
+# ==============================================================================
+# 7. صندوق البريد الصادر
+# ==============================================================================
+
+class EmailOutboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'mail{i}', email=f'mail{i}@example.com') for i in range(4)]
+
+    def notifications(self):
+        return [
+            NotificationLog(recipient=user, notification_type='system', title=f'title {i}', message='m')
+            for user in self.users for i in range(2)
+        ]
+
+    def test_enqueue_loads_emails_in_one_query(self):
+        created = NotificationManager.bulk_create_notifications(self.notifications())
+        created = list(NotificationLog.objects.filter(pk__in=[n.pk for n in created]))
+        # البريد + الإدراج
+        with self.assertNumQueries(2):
+            entries = email_outbox.enqueue(created)
+        self.assertEqual(len(entries), 8)
+
+    def test_ids_are_linked_without_bulk_insert_returning(self):
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False):
+            created = NotificationService.bulk_create_notifications(self.notifications())
+
+        self.assertTrue(all(n.pk for n in created))
+        outbox = EmailOutbox.objects.order_by('outbox_id')
+        self.assertEqual(
+            [(entry.notification_id, entry.recipient_email) for entry in outbox],
+            [(n.pk, n.recipient.email) for n in created]
+        )
+        # لم يُرسل شيء بعد
+        self.assertFalse(NotificationLog.objects.filter(is_sent_email=True).exists())
+
+    def test_is_sent_email_set_only_after_send(self):
+        created = NotificationService.bulk_create_notifications(self.notifications()[:2])
+        sent, failed = list(EmailOutbox.objects.order_by('outbox_id'))
+        email_outbox.record_results([sent], [(failed, 'smtp down')])
+        self.assertEqual(
+            dict(NotificationLog.objects.filter(pk__in=[n.pk for n in created]).values_list('pk', 'is_sent_email')),
+            {created[0].pk: True, created[1].pk: False}
+        )
+
+
+# ==============================================================================
+# 8. تذكيرات الموافقات
+# ==============================================================================
+
+class PendingApprovalsReminderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='requester')
+        cls.approver = User.objects.create_user(username='approver')
+
+    def approval(self, days_old):
+        approval = ApprovalRequest.objects.create(
+            approval_type='project_proposal', requested_by=self.student, current_approver=self.approver
+        )
+        ApprovalRequest.objects.filter(pk=approval.pk).update(created_at=timezone.now() - timedelta(days=days_old))
+        return approval
+
+    def test_stamps_only_the_approvals_in_the_digest(self):
+        due = [self.approval(days_old=2), self.approval(days_old=3)]
+        # يصبح مستحقاً أثناء الإرسال، فلا يجوز تعليمه لأنه لم يدخل في التذكير
+        late = self.approval(days_old=0)
+        send = ReminderDigest.send
+
+        def send_and_age(digest, now=None):
+            ApprovalRequest.objects.filter(pk=late.pk).update(created_at=timezone.now() - timedelta(days=2))
+            return send(digest, now)
+
+        with mock.patch.object(ReminderDigest, 'send', autospec=True, side_effect=send_and_age):
+            tasks.send_pending_approvals_reminder()
+
+        stamped = set(ApprovalRequest.objects.filter(last_reminded_at__isnull=False).values_list('pk', flat=True))
+        self.assertEqual(stamped, {approval.pk for approval in due})
+        self.assertEqual(NotificationLog.objects.filter(recipient=self.approver).count(), 1)
+
+    def test_approver_claimed_by_concurrent_run_is_not_stamped(self):
+        other = User.objects.create_user(username='other-approver')
+        mine = self.approval(days_old=2)
+        theirs = ApprovalRequest.objects.create(
+            approval_type='project_proposal', requested_by=self.student, current_approver=other
+        )
+        ApprovalRequest.objects.filter(pk=theirs.pk).update(created_at=timezone.now() - timedelta(days=2))
+        record = reminders.record_reminders
+
+        def concurrent_claim_first(kind, keys):
+            # تشغيل آخر حجز الموافق الأول في نفس النافذة قبل هذا التشغيل
+            window = next(window for recipient_id, _, window in keys if recipient_id == self.approver.pk)
+            record(kind, [(self.approver.pk, 0, window)])
+            return record(kind, keys)
+
+        with mock.patch.object(reminders, 'record_reminders', side_effect=concurrent_claim_first):
+            tasks.send_pending_approvals_reminder()
+
+        stamped = set(ApprovalRequest.objects.filter(last_reminded_at__isnull=False).values_list('pk', flat=True))
+        self.assertEqual(stamped, {theirs.pk})
+        self.assertNotIn(mine.pk, stamped)
+        self.assertEqual(
+            list(NotificationLog.objects.values_list('recipient_id', flat=True)), [other.pk]
+        )
+
+
+# ==============================================================================
+# 9. تذكيرات الدعوات
+# ==============================================================================
+
+class InvitationExpiringReminderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.leader = User.objects.create_user(username='leader')
+        cls.students = [User.objects.create_user(username=f'invitee{i}') for i in range(2)]
+        expires_at = timezone.now() + timedelta(minutes=30)
+        cls.invitations = [
+            GroupInvitation.objects.create(
+                group=Group.objects.create(group_name=f'G{i}'),
+                invited_student=student,
+                invited_by=cls.leader,
+                expires_at=expires_at
+            )
+            for i, student in enumerate(cls.students)
+        ]
+
+    def reminded(self):
+        return sorted(NotificationLog.objects.filter(notification_type='reminder').values_list('recipient_id', flat=True))
+
+    def test_each_invitation_is_reminded_once(self):
+        self.assertEqual(InvitationNotificationManager.notify_invitations_expiring_soon(), 2)
+        self.assertEqual(InvitationNotificationManager.notify_invitations_expiring_soon(), 0)
+        self.assertEqual(self.reminded(), [student.pk for student in self.students])
+
+    def test_invitation_claimed_by_concurrent_run_is_skipped(self):
+        record = reminders.record_reminders
+        taken = self.invitations[0]
+
+        def concurrent_claim_first(kind, keys):
+            # تشغيل آخر قرأ نفس الدعوات وحجز الأولى قبل هذا التشغيل
+            record(kind, [(taken.invited_student_id, taken.invitation_id, taken.expires_at)])
+            return record(kind, keys)
+
+        with mock.patch.object(reminders, 'record_reminders', side_effect=concurrent_claim_first):
+            sent = InvitationNotificationManager.notify_invitations_expiring_soon()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(self.reminded(), [self.students[1].pk])
+
+
+class ReminderDigestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'pending{i}') for i in range(2)]
+
+    def digest(self):
+        digest = ReminderDigest('pending_items', 'تذكير')
+        for user in self.users:
+            for i in range(2):
+                digest.add(
+                    user, f'- {i}', {'type': 'item', 'id': i},
+                    lambda user=user: NotificationLog(recipient=user, notification_type='reminder', title='t', message='m')
+                )
+        return digest
+
+    def reminded(self):
+        return sorted(NotificationLog.objects.filter(notification_type='reminder').values_list('recipient_id', flat=True))
+
+    def test_each_recipient_gets_one_digest_per_window(self):
+        now = timezone.now()
+        self.assertEqual(self.digest().send(now), 2)
+        self.assertEqual(self.digest().send(now), 0)
+        self.assertEqual(self.reminded(), [user.pk for user in self.users])
+
+    def test_recipient_claimed_by_concurrent_run_is_skipped(self):
+        now = timezone.now()
+        digest = self.digest()
+        record = reminders.record_reminders
+        taken = self.users[0]
+
+        def concurrent_claim_first(kind, keys):
+            # تشغيل آخر بنى نفس الملخص وحجز المستلم الأول قبل هذا التشغيل
+            record(kind, [(taken.pk, 0, digest.window_start(now))])
+            return record(kind, keys)
+
+        with mock.patch.object(reminders, 'record_reminders', side_effect=concurrent_claim_first):
+            sent = digest.send(now)
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(digest.reminded_recipients, [self.users[1].pk])
+        self.assertEqual(self.reminded(), [self.users[1].pk])
+
+
+# ==============================================================================
+# 10. تقرير المهام الدورية
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class JobRunsReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager')
+        UserRoles.objects.create(user=cls.manager, role=Role.objects.create(type='System Manager'))
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        JobRun.objects.create(job_name='drain_email_outbox', source='scheduler', worker='w1')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_admin_role_can_view_report(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/job-runs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['runs']), 1)
+
+    def test_django_staff_without_admin_role_is_forbidden(self):
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/job-runs/').status_code, 403)
+
+
+# ==============================================================================
+# 11. إنهاء طلب إنشاء المجموعة بالتزامن
+# ==============================================================================
+
+@skipUnless(connection.features.has_select_for_update, 'requires SELECT ... FOR UPDATE')
+class ConcurrentGroupFinalizeTests(TransactionTestCase):
+    """
+    عدة موافقات أخيرة متزامنة على نفس الطلب: مجموعة واحدة بدون أعضاء مكررين
+    """
+
+    THREADS = 4
+
+    def setUp(self):
+        creator = User.objects.create_user(username='creator')
+        self.group_request = GroupCreationRequest.objects.create(
+            group_name='Concurrent', creator=creator, department_id=1, college_id=1
+        )
+        self.students = [creator] + [User.objects.create_user(username=f'member{i}') for i in range(3)]
+        supervisor = User.objects.create_user(username='supervisor')
+        GroupMemberApproval.objects.bulk_create(
+            [GroupMemberApproval(request=self.group_request, user=user, role='student', status='accepted')
+             for user in self.students]
+            + [GroupMemberApproval(request=self.group_request, user=supervisor, role='supervisor', status='accepted')]
+        )
+
+    def finalize_concurrently(self):
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(check_and_finalize_group(self.group_request.pk))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_single_group_without_duplicate_members(self):
+        results = self.finalize_concurrently()
+
+        self.assertEqual(results.count(True), 1)
+        group = Group.objects.get(group_name='Concurrent')
+        members = list(GroupMembers.objects.filter(group=group).values_list('user_id', flat=True))
+        self.assertCountEqual(members, [student.pk for student in self.students])
+        self.assertEqual(GroupSupervisors.objects.filter(group=group).count(), 1)
+        self.group_request.refresh_from_db()
+        self.assertTrue(self.group_request.is_fully_confirmed)
+
+
+# ==============================================================================
+# 12. تسلسل الموافقات
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApprovalWorkflowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(uname_ar='الجامعة')
+        branch = Branch.objects.create(university=university, city=City.objects.create(bname_ar='المدينة'))
+        cls.college = College.objects.create(branch=branch, name_ar='الكلية')
+        cls.department = Department.objects.create(college=cls.college, name='القسم')
+        cls.other_department = Department.objects.create(college=cls.college, name='قسم آخر')
+
+        cls.head = User.objects.create_user(username='head')
+        UserRoles.objects.create(user=cls.head, role=Role.objects.create(type='Department Head'))
+        AcademicAffiliation.objects.create(
+            user=cls.head, university=university, college=cls.college, department=cls.department,
+            start_date=date(2020, 1, 1)
+        )
+        cls.student = User.objects.create_user(username='proposer')
+        student_role = Role.objects.create(type='Student')
+        UserRoles.objects.create(user=cls.student, role=student_role)
+        AcademicAffiliation.objects.create(
+            user=cls.student, university=university, college=cls.college, department=cls.department,
+            start_date=date(2020, 1, 1)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def proposal(self, department):
+        # نفس شكل الطلب الذي ينشئه GroupCreateSerializer: الموافق الأول هو الطالب نفسه
+        project = Project.objects.create(
+            title='P', type='Private', college=self.college, start_date=date(2025, 1, 1), description='-'
+        )
+        return ApprovalRequest.objects.create(
+            approval_type='project_proposal',
+            project=project,
+            requested_by=self.student,
+            current_approver=self.student,
+            request_data={'department_id': department.department_id, 'college_id': self.college.cid},
+        )
+
+    def approve(self, approval, user, **data):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/approvals/{approval.pk}/approve/', data, format='json')
+
+    def test_student_approver_is_forwarded_to_department_head(self):
+        approval = self.proposal(self.department)
+
+        response = self.approve(approval, self.student)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_approver'], self.head.pk)
+
+        response = self.approve(approval, self.head)
+        self.assertEqual(response.status_code, 200)
+        approval.refresh_from_db()
+        self.assertEqual(approval.status, 'approved')
+
+    def test_approver_comments_keep_the_proposal_data(self):
+        approval = self.proposal(self.department)
+
+        response = self.approve(approval, self.student, comments='ok')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_approver'], self.head.pk)
+        approval.refresh_from_db()
+        self.assertEqual(approval.comments, 'ok')
+        self.assertEqual(approval.request_data['department_id'], self.department.department_id)
+
+        self.client.force_authenticate(self.student)
+        response = self.client.post(
+            '/api/approvals/bulk-decide/', {'ids': [self.proposal(self.department).pk], 'decision': 'approve',
+                                            'comments': 'ok'}, format='json'
+        )
+        self.assertEqual(response.data['results'][0]['outcome'], 'advanced')
+
+    def make_supervisor(self, username='supervisor', affiliated=True):
+        supervisor = User.objects.create_user(username=username)
+        UserRoles.objects.create(user=supervisor, role=Role.objects.get_or_create(type='Supervisor')[0])
+        if affiliated:
+            AcademicAffiliation.objects.create(
+                user=supervisor, university=self.college.branch.university, college=self.college,
+                department=self.department, start_date=date(2020, 1, 1)
+            )
+        return supervisor
+
+    def test_proposal_goes_through_requested_supervisor(self):
+        supervisor = self.make_supervisor()
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/groups/', {
+            'group_name': 'G', 'project_title': 'P', 'project_type': 'Private', 'project_description': '-',
+            'student_ids': [self.student.pk], 'supervisor_ids': [supervisor.pk],
+            'department_id': self.department.department_id, 'college_id': self.college.cid,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        approval = ApprovalRequest.objects.get(pk=response.data['approval_request_id'])
+        self.assertEqual(approval.approval_level, approval_workflow.LEVEL_REQUESTER)
+
+        response = self.approve(approval, self.student)
+        self.assertEqual(response.data['current_approver'], supervisor.pk)
+        self.assertEqual(response.data['approval_level'], approval_workflow.LEVEL_SUPERVISOR)
+        response = self.approve(approval, supervisor)
+        self.assertEqual(response.data['current_approver'], self.head.pk)
+        self.assertEqual(self.approve(approval, self.head).status_code, 200)
+        approval.refresh_from_db()
+        self.assertEqual(approval.status, 'approved')
+
+    def test_group_supervisor_is_preferred_over_co_supervisor(self):
+        co_supervisor = self.make_supervisor('co', affiliated=False)
+        supervisor = self.make_supervisor('main', affiliated=False)
+        group = Group.objects.create(group_name='G')
+        GroupSupervisors.objects.create(group=group, user=co_supervisor, type='co_supervisor')
+        GroupSupervisors.objects.create(group=group, user=supervisor, type='supervisor')
+        approval = ApprovalRequest.objects.create(
+            approval_type='group_transfer', group=group, requested_by=self.student, current_approver=self.student,
+            approval_level=approval_workflow.LEVEL_REQUESTER
+        )
+        self.assertEqual(approval_workflow.get_next_step(approval), (approval_workflow.LEVEL_SUPERVISOR, supervisor.pk))
+
+    def test_requested_supervisor_without_approver_affiliation_is_skipped(self):
+        supervisor = self.make_supervisor(affiliated=False)
+        approval = self.proposal(self.department)
+        approval.approval_level = approval_workflow.LEVEL_REQUESTER
+        approval.request_data['supervisor_ids'] = [supervisor.pk]
+        approval.save()
+        with self.assertLogs('core.approval_workflow', 'WARNING'):
+            step = approval_workflow.get_next_step(approval)
+        self.assertEqual(step, (approval_workflow.LEVEL_DEPARTMENT_HEAD, self.head.pk))
+
+    def test_missing_higher_approver_finalizes_instead_of_409(self):
+        approval = self.proposal(self.other_department)
+        with self.assertLogs('core.approval_workflow', 'WARNING'):
+            response = self.approve(approval, self.student)
+        self.assertEqual(response.status_code, 200)
+        approval.refresh_from_db()
+        self.assertEqual((approval.status, approval.current_approver_id), ('approved', self.student.pk))
+
+    def test_index_reads_only_approver_roles_with_affiliations(self):
+        with self.assertNumQueries(4):
+            index = approval_workflow._build_index()
+        self.assertEqual(set(index.user_units), {self.head.pk})
+        self.assertEqual(index.approver_for(approval_workflow.LEVEL_DEPARTMENT_HEAD, index.unit_of(self.head.pk)), self.head.pk)
+
+
+# ==============================================================================
+# 13. قائمة المجموعات وتفاصيلها
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GroupQueryCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = University.objects.create(uname_ar='الجامعة')
+        cls.college = College.objects.create(name_ar='الكلية')
+        cls.department = Department.objects.create(college=cls.college, name='القسم')
+        cls.student_role = Role.objects.create(type='Student')
+        cls.supervisor_role = Role.objects.create(type='Supervisor')
+        cls.viewer = User.objects.create_user(username='viewer')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def make_group(self, index, members=3):
+        project = Project.objects.create(
+            title=f'P{index}', type='Private', college=self.college, start_date=date(2025, 1, 1), description='-'
+        )
+        group = Group.objects.create(project=project, group_name=f'G{index}')
+        users = [User.objects.create_user(username=f'g{index}-{i}') for i in range(members + 1)]
+        for user in users:
+            AcademicAffiliation.objects.create(
+                user=user, university=self.university, college=self.college, department=self.department,
+                start_date=date(2020, 1, 1)
+            )
+        for user in users[:members]:
+            UserRoles.objects.create(user=user, role=self.student_role)
+            GroupMembers.objects.create(user=user, group=group)
+        UserRoles.objects.create(user=users[-1], role=self.supervisor_role)
+        GroupSupervisors.objects.create(user=users[-1], group=group, type='supervisor')
+        return group
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured), response
+
+    def test_list_query_count_does_not_grow_with_groups(self):
+        self.make_group(0)
+        single, response = self.queries('/api/groups/')
+        self.assertEqual(len(response.data), 1)
+
+        for index in range(1, 6):
+            self.make_group(index)
+        many, response = self.queries('/api/groups/')
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(many, single)
+        self.assertTrue(all(len(group['members']) == 3 for group in response.data))
+        self.assertTrue(all(group['members_count'] == 3 for group in response.data))
+        self.assertCountEqual([group['project_title'] for group in response.data], [f'P{i}' for i in range(6)])
+
+    def test_detail_query_count_does_not_grow_with_members(self):
+        small = self.make_group(0, members=1)
+        large = self.make_group(1, members=6)
+        small_count, _ = self.queries(f'/api/groups/{small.pk}/')
+        large_count, response = self.queries(f'/api/groups/{large.pk}/')
+        self.assertEqual(large_count, small_count)
+        self.assertEqual(len(response.data['members']), 6)
+        self.assertEqual(response.data['project_detail']['title'], 'P1')
+
+
+# ==============================================================================
+# 14. دليل المستخدمين
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserDirectoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = University.objects.create(uname_ar='الجامعة')
+        cls.college = College.objects.create(name_ar='الكلية')
+        cls.department = Department.objects.create(college=cls.college, name='القسم')
+        cls.new_college = College.objects.create(name_ar='كلية جديدة')
+        cls.new_department = Department.objects.create(college=cls.new_college, name='قسم جديد')
+        cls.student_role = Role.objects.create(type='Student')
+        cls.viewer = User.objects.create_user(username='viewer')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def affiliate(self, user, department, start_date, end_date=None):
+        AcademicAffiliation.objects.create(
+            user=user, university=self.university, college=department.college, department=department,
+            start_date=start_date, end_date=end_date
+        )
+
+    def make_users(self, count):
+        for i in range(count):
+            user = User.objects.create_user(username=f'user-{User.objects.count()}')
+            UserRoles.objects.create(user=user, role=self.student_role)
+            self.affiliate(user, self.department, date(2020, 1, 1))
+
+    def list_users(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        return len(captured), {user['id']: user for user in response.data}
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.make_users(1)
+        few, _ = self.list_users()
+        self.make_users(10)
+        many, users = self.list_users()
+        self.assertEqual(len(users), 12)
+        self.assertEqual(many, few)
+
+    def test_department_and_college_come_from_current_affiliation(self):
+        today = timezone.localdate()
+        moved = User.objects.create_user(username='moved')
+        self.affiliate(moved, self.department, date(2020, 1, 1), end_date=today - timedelta(days=1))
+        self.affiliate(moved, self.new_department, today - timedelta(days=1))
+        # انتماء لم يبدأ بعد لا يغلب الانتماء الساري رغم أنه الأحدث تاريخ بداية
+        self.affiliate(moved, self.department, today + timedelta(days=30))
+        left = User.objects.create_user(username='left')
+        self.affiliate(left, self.department, date(2020, 1, 1), end_date=date(2021, 1, 1))
+
+        _, users = self.list_users()
+        self.assertEqual(
+            (users[moved.pk]['department_id'], users[moved.pk]['college_id']),
+            (self.new_department.department_id, self.new_college.cid)
+        )
+        self.assertEqual((users[left.pk]['department_id'], users[left.pk]['college_id']), (None, None))
+        self.assertEqual(users[self.viewer.pk]['department_id'], None)
+
+
+# ==============================================================================
+# 15. قائمة المشاريع
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProjectListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = College.objects.create(name_ar='الكلية')
+        cls.student = User.objects.create_user(username='student')
+        UserRoles.objects.create(user=cls.student, role=Role.objects.create(type='Student'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def make_project(self, index, supervisors=(('supervisor', 'Ali'),)):
+        creator = User.objects.create_user(username=f'creator-{index}', name=f'Creator {index}')
+        project = Project.objects.create(
+            title=f'P{index}', type='Government', college=self.college, start_date=date(2025, 1, 1),
+            description='-', created_by=creator
+        )
+        group = Group.objects.create(project=project, group_name=f'G{index}')
+        for position, (kind, name) in enumerate(supervisors):
+            user = User.objects.create_user(username=f'sup-{index}-{position}', name=name)
+            GroupSupervisors.objects.create(user=user, group=group, type=kind)
+        return project
+
+    def list_projects(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/projects/', {'page_size': 200})
+        self.assertEqual(response.status_code, 200)
+        return len(captured), response.data['results']
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.make_project(0)
+        few, _ = self.list_projects()
+        for index in range(1, 8):
+            self.make_project(index)
+        many, results = self.list_projects()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(many, few)
+
+    def test_annotated_supervisor_name_matches_per_row_lookup(self):
+        projects = [
+            self.make_project(0),
+            self.make_project(1, supervisors=(('supervisor', 'First'), ('supervisor', 'Second'))),
+            self.make_project(2, supervisors=(('co_supervisor', 'Helper'), ('supervisor', 'Main'))),
+            self.make_project(3, supervisors=(('co_supervisor', 'Helper'),)),
+            self.make_project(4, supervisors=()),
+        ]
+        _, results = self.list_projects()
+        annotated = {row['project_id']: row['supervisor_name'] for row in results}
+        # بدون setup_eager_loading يرجع الـ Serializer إلى الاستعلام القديم لكل مشروع
+        per_row = {
+            project.pk: ProjectSerializer(Project.objects.get(pk=project.pk)).data['supervisor_name']
+            for project in projects
+        }
+        self.assertEqual(annotated, per_row)
+        self.assertEqual(
+            [annotated[project.pk] for project in projects],
+            ['Ali', 'First', 'Main', 'لا يوجد مشرف', 'لا يوجد مشرف']
+        )
+
+
+# ==============================================================================
+# 16. الإشعارات الجماعية
+# ==============================================================================
+
+class FanOutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'user{i}') for i in range(7)]
+        cls.inactive = User.objects.create_user(username='inactive', is_active=False)
+
+    def fan_out(self, recipients, **kwargs):
+        with mock.patch.object(realtime, 'publish_notifications') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as captured:
+                    total = NotificationManager.fan_out(recipients, 'system_info', 't', 'm', **kwargs)
+        table = NotificationLog._meta.db_table
+        inserts = [q for q in captured if q['sql'].startswith('INSERT') and table in q['sql']]
+        pinged = {n.recipient_id for call in publish.call_args_list for n in call.args[0]}
+        return total, len(inserts), pinged
+
+    def test_recipients_are_inserted_in_chunks_with_progress(self):
+        progress = []
+        total, inserts, _ = self.fan_out(
+            User.objects.filter(pk__in=[u.pk for u in self.users]), chunk_size=3, progress=progress.append
+        )
+        self.assertEqual(total, 7)
+        self.assertEqual(inserts, 3)
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertEqual(NotificationLog.objects.count(), 7)
+
+    def test_counters_and_pings_cover_every_recipient(self):
+        total, _, pinged = self.fan_out([user.pk for user in self.users], chunk_size=4)
+        self.assertEqual(total, 7)
+        self.assertEqual(pinged, {user.pk for user in self.users})
+        for user in self.users:
+            counts = notification_counters.get_counts(user)
+            self.assertEqual((counts['total_count'], counts['unread_count']), (1, 1))
+
+    def test_side_effects_do_not_need_returned_ids(self):
+        # MySQL لا يعيد المعرفات من bulk_create: العدادات والتنبيهات تعتمد على المستلم فقط
+        bulk_create = NotificationLog.objects.bulk_create
+
+        def bulk_create_without_ids(objs, **kwargs):
+            created = bulk_create(objs, **kwargs)
+            for notification in created:
+                notification.pk = None
+            return created
+
+        with mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert',
+            new_callable=mock.PropertyMock, return_value=False
+        ), mock.patch.object(NotificationLog.objects, 'bulk_create', side_effect=bulk_create_without_ids):
+            total, _, pinged = self.fan_out(self.users, chunk_size=5)
+        self.assertEqual(total, 7)
+        self.assertEqual(pinged, {user.pk for user in self.users})
+        self.assertEqual(
+            sum(notification_counters.get_counts(user)['unread_count'] for user in self.users), 7
+        )
+
+    def test_notify_all_users_skips_inactive_users(self):
+        progress = []
+        with mock.patch.object(NotificationManager, 'FAN_OUT_CHUNK_SIZE', 3):
+            with self.captureOnCommitCallbacks(execute=True):
+                count = SystemNotificationManager.notify_all_users('t', 'm', progress=progress.append)
+        self.assertEqual(count, 7)
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertFalse(NotificationLog.objects.filter(recipient=self.inactive).exists())
+
+
+# ==============================================================================
+# 17. انتهاء صلاحية الدعوات
+# ==============================================================================
+
+class ExpirePendingInvitationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.leader = User.objects.create_user(username='leader')
+        cls.students = [User.objects.create_user(username=f'invitee{i}') for i in range(3)]
+        past = timezone.now() - timedelta(hours=1)
+        cls.expired = [
+            GroupInvitation.objects.create(
+                group=Group.objects.create(group_name=f'G{i}'),
+                invited_student=student, invited_by=cls.leader, expires_at=past
+            )
+            for i, student in enumerate(cls.students[:2])
+        ]
+        cls.active = GroupInvitation.objects.create(
+            group=Group.objects.create(group_name='Active'),
+            invited_student=cls.students[2], invited_by=cls.leader,
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+    def expired_notices(self):
+        return sorted(NotificationLog.objects.filter(
+            notification_type='invitation_expired'
+        ).values_list('recipient_id', flat=True))
+
+    def test_running_twice_notifies_each_invitation_once(self):
+        self.assertEqual(InvitationService.expire_pending_invitations(), 2)
+        self.assertEqual(InvitationService.expire_pending_invitations(), 0)
+
+        self.assertEqual(self.expired_notices(), [student.pk for student in self.students[:2]])
+        self.assertEqual(NotificationLog.objects.filter(recipient=self.leader, notification_type='reminder').count(), 2)
+        self.active.refresh_from_db()
+        self.assertEqual(self.active.status, 'pending')
+
+    def test_previously_expired_invitations_are_not_renotified(self):
+        GroupInvitation.objects.filter(pk=self.expired[0].pk).update(status='expired', responded_at=timezone.now())
+        self.assertEqual(InvitationService.expire_pending_invitations(), 1)
+        self.assertEqual(self.expired_notices(), [self.students[1].pk])
+
+
+@skipUnless(connection.features.has_select_for_update, 'requires SELECT ... FOR UPDATE')
+class ConcurrentExpireInvitationsTests(TransactionTestCase):
+    """
+    عدة عمال متزامنين: كل دعوة منتهية تُعالج ويُرسل إشعارها مرة واحدة
+    """
+
+    THREADS = 4
+
+    def setUp(self):
+        leader = User.objects.create_user(username='leader')
+        past = timezone.now() - timedelta(hours=1)
+        for i in range(10):
+            GroupInvitation.objects.create(
+                group=Group.objects.create(group_name=f'G{i}'),
+                invited_student=User.objects.create_user(username=f'invitee{i}'),
+                invited_by=leader, expires_at=past
+            )
+
+    def test_each_invitation_is_expired_by_one_worker(self):
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(InvitationService.expire_pending_invitations())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(results), 10)
+        self.assertEqual(NotificationLog.objects.filter(notification_type='invitation_expired').count(), 10)
+
+
+# ==============================================================================
+# 18. عدادات الإشعارات
+# ==============================================================================
+
+class NotificationCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+
+    def notify(self, user=None, notification_type='system', count=1):
+        return NotificationManager.bulk_create_notifications([
+            NotificationLog(recipient=user or self.user, notification_type=notification_type, title='t', message='m')
+            for _ in range(count)
+        ])
+
+    def counts(self, user=None):
+        counts = notification_counters.get_counts(user or self.user)
+        return counts['unread_count'], counts['total_count']
+
+    def type_counts(self, field='unread_count'):
+        return {
+            row['notification_type']: row['count']
+            for row in notification_counters.get_type_counts(self.user, field)
+        }
+
+    def test_apply_deltas_creates_rows_and_never_goes_negative(self):
+        notification_counters.apply_deltas({(self.user.pk, 'system'): (2, 3), (self.other.pk, 'system'): (2, 3)})
+        self.assertEqual(self.counts(), (2, 3))
+        self.assertEqual(self.counts(self.other), (2, 3))
+
+        notification_counters.apply_deltas({(self.user.pk, 'system'): (-5, -1)})
+        self.assertEqual(self.counts(), (0, 2))
+        self.assertEqual(self.type_counts('total_count'), {'system': 2})
+        self.assertIsNotNone(notification_counters.get_counts(self.user)['deleted_at'])
+        self.assertIsNone(notification_counters.get_counts(self.other)['deleted_at'])
+
+    def test_apply_deltas_skips_empty_and_negative_only_users(self):
+        with self.assertNumQueries(0):
+            notification_counters.apply_deltas({(self.user.pk, 'system'): (0, 0), (None, 'system'): (1, 1)})
+        notification_counters.apply_deltas({(self.user.pk, 'system'): (-1, -1)})
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertEqual(self.type_counts('total_count'), {})
+
+    def test_mark_as_read_decrements_once(self):
+        first, second = self.notify(count=2)
+        self.assertTrue(NotificationManager.mark_as_read(first.pk, self.user))
+        self.assertTrue(NotificationManager.mark_as_read(first.pk, self.user))
+        self.assertEqual(self.counts(), (1, 2))
+        self.assertFalse(NotificationManager.mark_as_read(second.pk, self.other))
+        self.assertEqual(self.counts(), (1, 2))
+
+    def test_mark_all_as_read_clears_every_type(self):
+        self.notify(count=2)
+        self.notify(notification_type='reminder')
+        self.notify(user=self.other)
+        self.assertEqual(NotificationManager.mark_all_as_read(self.user), 3)
+        self.assertEqual(self.counts(), (0, 3))
+        self.assertEqual(self.type_counts(), {})
+        self.assertEqual(self.type_counts('total_count'), {'system': 2, 'reminder': 1})
+        self.assertEqual(self.counts(self.other), (1, 1))
+        self.assertEqual(NotificationManager.mark_all_as_read(self.user), 0)
+
+    def test_delete_notification_decrements_once(self):
+        unread, read = self.notify(count=2)
+        NotificationManager.mark_as_read(read.pk, self.user)
+
+        self.assertTrue(NotificationManager.delete_notification(unread.pk, self.user))
+        self.assertFalse(NotificationManager.delete_notification(unread.pk, self.user))
+        self.assertEqual(self.counts(), (0, 1))
+        self.assertFalse(NotificationManager.delete_notification(read.pk, self.other))
+        self.assertTrue(NotificationManager.delete_notification(read.pk, self.user))
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_reconcile_command_reports_and_repairs_drift(self):
+        self.notify(count=3)
+        self.notify(user=self.other)
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=7, total_count=1)
+
+        out = io.StringIO()
+        call_command('reconcile_notification_counters', '--dry-run', stdout=out)
+        self.assertIn(f'- {self.user.pk}', out.getvalue())
+        self.assertNotIn(f'- {self.other.pk}', out.getvalue())
+        self.assertEqual(self.counts(), (7, 1))
+
+        call_command('reconcile_notification_counters', '--user', str(self.user.pk), stdout=io.StringIO())
+        self.assertEqual(self.counts(), (3, 3))
+
+        out = io.StringIO()
+        call_command('reconcile_notification_counters', stdout=out)
+        self.assertIn('✓', out.getvalue())
+
+
+# ==============================================================================
+# 19. عقد قيادة الجدولة
+# ==============================================================================
+
+class LeaderLeaseTests(TestCase):
+
+    def expire(self, name='jobs'):
+        SchedulerLease.objects.filter(name=name).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_acquire_then_renew(self):
+        lease = LeaderLease('jobs', holder='a', ttl=60)
+        self.assertFalse(lease.is_leader)
+        self.assertTrue(lease.heartbeat())
+        self.assertTrue(lease.is_leader)
+        first = SchedulerLease.objects.get(name='jobs')
+        self.assertEqual(first.holder, 'a')
+
+        self.assertTrue(lease.heartbeat())
+        renewed = SchedulerLease.objects.get(name='jobs')
+        self.assertEqual(renewed.acquired_at, first.acquired_at)
+        self.assertGreater(renewed.expires_at, first.expires_at)
+
+    def test_only_one_contender_holds_a_valid_lease(self):
+        a = LeaderLease('jobs', holder='a', ttl=60)
+        b = LeaderLease('jobs', holder='b', ttl=60)
+        self.assertTrue(a.heartbeat())
+        self.assertFalse(b.heartbeat())
+        self.assertFalse(b.is_leader)
+        self.assertTrue(a.heartbeat())
+        self.assertEqual(SchedulerLease.objects.get(name='jobs').holder, 'a')
+
+    def test_standby_takes_over_after_expiry(self):
+        a = LeaderLease('jobs', holder='a', ttl=60)
+        b = LeaderLease('jobs', holder='b', ttl=60)
+        a.heartbeat()
+        self.expire()
+
+        self.assertTrue(b.heartbeat())
+        self.assertEqual(SchedulerLease.objects.get(name='jobs').holder, 'b')
+        # القائدة السابقة تكتشف فقدان العقد في نبضها التالي وتتوقف عن التنفيذ
+        self.assertFalse(a.heartbeat())
+        self.assertFalse(a.is_leader)
+        self.assertTrue(b.is_leader)
+
+    def test_release_hands_over_immediately(self):
+        a = LeaderLease('jobs', holder='a', ttl=60)
+        b = LeaderLease('jobs', holder='b', ttl=60)
+        a.heartbeat()
+        a.release()
+        self.assertFalse(a.is_leader)
+        self.assertTrue(b.heartbeat())
+
+    def test_leader_stops_at_local_deadline(self):
+        lease = LeaderLease('jobs', holder='a', ttl=60)
+        lease.heartbeat()
+        with mock.patch('core.leader_lease.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertFalse(lease.is_leader)
+
+
+class ConcurrentLeaderLeaseTests(TransactionTestCase):
+    """
+    عدة عمليات تبدأ معاً ولا يوجد صف للعقد بعد: واحدة فقط تصبح القائدة
+    """
+
+    THREADS = 4
+
+    def test_one_of_many_contenders_wins(self):
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = {}, []
+
+        def contender(holder):
+            try:
+                lease = LeaderLease('jobs', holder=holder, ttl=60)
+                barrier.wait()
+                results[holder] = lease.heartbeat()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=contender, args=(f'h{i}',)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        winners = [holder for holder, acquired in results.items() if acquired]
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(SchedulerLease.objects.get(name='jobs').holder, winners[0])
+
+
+class SchedulerLeaderTests(TestCase):
+
+    def setUp(self):
+        self.job = mock.Mock(__name__='job')
+        self.wrapped = NotificationScheduler.run_as_leader(self.job)
+
+    def test_job_is_skipped_without_lease(self):
+        with mock.patch.object(NotificationScheduler, 'lease', None):
+            self.wrapped()
+        self.job.assert_not_called()
+        self.assertFalse(JobRun.objects.exists())
+
+    def test_standby_skips_job(self):
+        LeaderLease('jobs', holder='leader', ttl=60).heartbeat()
+        standby = LeaderLease('jobs', holder='standby', ttl=60)
+        standby.heartbeat()
+        with mock.patch.object(NotificationScheduler, 'lease', standby):
+            self.wrapped()
+        self.job.assert_not_called()
+        self.assertFalse(JobRun.objects.exists())
+
+    def test_leader_runs_and_tracks_job(self):
+        leader = LeaderLease('jobs', holder='leader', ttl=60)
+        leader.heartbeat()
+        with mock.patch.object(NotificationScheduler, 'lease', leader):
+            self.wrapped()
+        self.job.assert_called_once_with()
+        run = JobRun.objects.get()
+        self.assertEqual((run.job_name, run.source, run.status), ('job', 'scheduler', 'success'))
+
+    def test_stop_releases_lease(self):
+        leader = LeaderLease(NotificationScheduler.LEASE_NAME, holder='leader', ttl=60)
+        leader.heartbeat()
+        with mock.patch.object(NotificationScheduler, 'scheduler', mock.Mock()), \
+                mock.patch.object(NotificationScheduler, 'lease', leader):
+            NotificationScheduler.stop()
+        self.assertTrue(LeaderLease(NotificationScheduler.LEASE_NAME, holder='standby', ttl=60).heartbeat())
+
+    def test_run_scheduler_stops_on_interrupt(self):
+        lease = LeaderLease(NotificationScheduler.LEASE_NAME, holder='cmd', ttl=60)
+
+        def start():
+            NotificationScheduler.lease = lease
+
+        out = io.StringIO()
+        with mock.patch.object(NotificationScheduler, 'lease', None), \
+                mock.patch.object(NotificationScheduler, 'start', side_effect=start), \
+                mock.patch.object(NotificationScheduler, 'stop') as stop, \
+                mock.patch('core.management.commands.run_scheduler.signal.signal'), \
+                mock.patch('core.management.commands.run_scheduler.time.sleep', side_effect=KeyboardInterrupt):
+            call_command('run_scheduler', stdout=out)
+        stop.assert_called_once_with()
+        self.assertIn('cmd', out.getvalue())
+
+
+# ==============================================================================
+# 20. طلب إنشاء مجموعة
+# ==============================================================================
+
+class GroupCreationRequestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = College.objects.create(name_ar='الكلية')
+        cls.department = Department.objects.create(college=cls.college, name='القسم')
+        cls.creator = User.objects.create_user(username='creator')
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(3)]
+        cls.supervisors = [User.objects.create_user(username=f'supervisor{i}') for i in range(2)]
+
+    def submit(self, **data):
+        payload = {
+            'group_name': 'G', 'department_id': self.department.pk, 'college_id': self.college.pk,
+            'student_ids': [student.pk for student in self.students],
+            'supervisor_ids': [supervisor.pk for supervisor in self.supervisors],
+        }
+        payload.update(data)
+        request = APIRequestFactory().post('/', payload, format='json')
+        force_authenticate(request, user=self.creator)
+        return submit_group_creation_request(request)
+
+    def queries_on(self, captured, model, verb):
+        table = model._meta.db_table
+        return [
+            query for query in captured
+            if query['sql'].startswith(verb) and (f'"{table}"' in query['sql'] or f'`{table}`' in query['sql'])
+        ]
+
+    def test_creates_approvals_in_one_insert(self):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as captured:
+            response = self.submit(
+                student_ids=[self.students[0].pk, self.students[0].pk, self.creator.pk, self.students[1].pk]
+            )
+
+        self.assertEqual(response.status_code, 201)
+        group_request = GroupCreationRequest.objects.get(pk=response.data['request_id'])
+        approvals = {
+            (approval.user_id, approval.role, approval.status)
+            for approval in GroupMemberApproval.objects.filter(request=group_request)
+        }
+        self.assertEqual(approvals, {
+            (self.creator.pk, 'student', 'accepted'),
+            (self.students[0].pk, 'student', 'pending'),
+            (self.students[1].pk, 'student', 'pending'),
+            (self.supervisors[0].pk, 'supervisor', 'pending'),
+            (self.supervisors[1].pk, 'supervisor', 'pending'),
+        })
+        self.assertEqual(len(self.queries_on(captured, GroupMemberApproval, 'INSERT')), 1)
+        self.assertEqual(len(self.queries_on(captured, User, 'SELECT')), 1)
+        self.assertEqual(
+            set(NotificationLog.objects.values_list('recipient_id', 'notification_type')),
+            {(self.students[0].pk, 'invitation'), (self.students[1].pk, 'invitation'),
+             (self.supervisors[0].pk, 'approval_request'), (self.supervisors[1].pk, 'approval_request')}
+        )
+
+    def test_unknown_ids_are_rejected_before_any_write(self):
+        missing = User.objects.order_by('-pk').first().pk + 1
+        response = self.submit(student_ids=[self.students[0].pk, missing + 1], supervisor_ids=[missing])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['unknown_ids'], [missing, missing + 1])
+        self.assertFalse(GroupCreationRequest.objects.exists())
+        self.assertFalse(GroupMemberApproval.objects.exists())
+        self.assertFalse(NotificationLog.objects.exists())
+
+    def test_non_numeric_ids_are_rejected(self):
+        response = self.submit(student_ids=['abc'])
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('unknown_ids', response.data)
+        self.assertFalse(GroupCreationRequest.objects.exists())
+
+    def test_same_user_as_student_and_supervisor_is_rejected(self):
+        response = self.submit(supervisor_ids=[self.students[0].pk])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GroupCreationRequest.objects.exists())
+
+
+# ==============================================================================
+# 21. إضافة أعضاء ومشرفين للمجموعة
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GroupAssignUsersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager')
+        UserRoles.objects.create(user=cls.manager, role=Role.objects.create(type='System Manager'))
+        cls.outsider = User.objects.create_user(username='outsider')
+        cls.group = Group.objects.create(group_name='G')
+        cls.users = [User.objects.create_user(username=f'user{i}') for i in range(3)]
+        GroupMembers.objects.create(group=cls.group, user=cls.users[0])
+        cls.missing = cls.users[-1].pk + 100
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def post(self, action, data):
+        return self.client.post(f'/api/groups/{self.group.pk}/{action}/', data, format='json')
+
+    def test_add_member_reports_added_existing_and_unknown(self):
+        ids = [self.users[1].pk, self.users[0].pk, self.missing, self.users[2].pk, self.users[1].pk]
+        response = self.post('add_member', {'student_ids': ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [self.users[1].pk, self.users[2].pk])
+        self.assertEqual(response.data['existing'], [self.users[0].pk])
+        self.assertEqual(response.data['unknown'], [self.missing])
+        self.assertCountEqual(
+            GroupMembers.objects.filter(group=self.group).values_list('user_id', flat=True),
+            [user.pk for user in self.users]
+        )
+
+    def test_add_member_is_idempotent(self):
+        ids = [user.pk for user in self.users[1:]]
+        self.post('add_member', {'student_ids': ids})
+        response = self.post('add_member', {'student_ids': ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [])
+        self.assertEqual(response.data['existing'], ids)
+        self.assertEqual(GroupMembers.objects.filter(group=self.group).count(), 3)
+
+    def test_add_member_inserts_in_one_query(self):
+        table = GroupMembers._meta.db_table
+        with CaptureQueriesContext(connection) as captured:
+            self.post('add_member', {'student_ids': [user.pk for user in self.users]})
+        inserts = [query for query in captured if query['sql'].startswith('INSERT') and table in query['sql']]
+        self.assertEqual(len(inserts), 1)
+
+    def test_add_member_rejects_bad_ids_and_outsiders(self):
+        self.assertEqual(self.post('add_member', {'student_ids': ['x']}).status_code, 400)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.post('add_member', {'student_ids': [self.users[1].pk]}).status_code, 403)
+        self.assertEqual(GroupMembers.objects.filter(group=self.group).count(), 1)
+
+    def test_add_supervisor_accepts_single_id_and_is_idempotent(self):
+        response = self.post('add_supervisor', {'supervisor_id': self.users[1].pk, 'type': 'co_supervisor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [self.users[1].pk])
+
+        response = self.post('add_supervisor', {'supervisor_ids': [self.users[1].pk, self.missing]})
+        self.assertEqual(response.data['added'], [])
+        self.assertEqual(response.data['existing'], [self.users[1].pk])
+        self.assertEqual(response.data['unknown'], [self.missing])
+        self.assertEqual(
+            list(GroupSupervisors.objects.filter(group=self.group).values_list('user_id', 'type')),
+            [(self.users[1].pk, 'co_supervisor')]
+        )
+
+    def test_add_supervisor_validates_type_and_role(self):
+        self.assertEqual(self.post('add_supervisor', {'supervisor_id': self.users[1].pk, 'type': 'x'}).status_code, 400)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.post('add_supervisor', {'supervisor_id': self.users[1].pk}).status_code, 403)
+        self.assertFalse(GroupSupervisors.objects.exists())
+
+
+# ==============================================================================
+# 22. البت الجماعي في طلبات الموافقة
+# ==============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkDecideTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(uname_ar='الجامعة')
+        branch = Branch.objects.create(university=university, city=City.objects.create(bname_ar='المدينة'))
+        cls.college = College.objects.create(branch=branch, name_ar='الكلية')
+        cls.department = Department.objects.create(college=cls.college, name='القسم')
+        cls.other_department = Department.objects.create(college=cls.college, name='قسم آخر')
+
+        cls.head = User.objects.create_user(username='head')
+        UserRoles.objects.create(user=cls.head, role=Role.objects.create(type='Department Head'))
+        AcademicAffiliation.objects.create(
+            user=cls.head, university=university, college=cls.college, department=cls.department,
+            start_date=date(2020, 1, 1)
+        )
+        cls.student = User.objects.create_user(username='proposer')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def proposal(self, department=None, **fields):
+        values = {
+            'approval_type': 'project_proposal',
+            'requested_by': self.student,
+            'current_approver': self.student,
+            'request_data': {'department_id': (department or self.department).department_id},
+        }
+        values.update(fields)
+        return ApprovalRequest.objects.create(**values)
+
+    def decide(self, ids, decision='approve', **data):
+        return self.client.post('/api/approvals/bulk-decide/', {'ids': ids, 'decision': decision, **data}, format='json')
+
+    def outcomes(self, response):
+        return {result['id']: result['outcome'] for result in response.data['results']}
+
+    def test_reports_outcome_per_id(self):
+        advanced = self.proposal()
+        approved = self.proposal(self.other_department)
+        decided = self.proposal(status='approved')
+        forbidden = self.proposal(current_approver=self.head)
+        hidden = self.proposal(requested_by=self.stranger, current_approver=self.stranger)
+        missing = hidden.pk + 100
+        ids = [advanced.pk, approved.pk, decided.pk, forbidden.pk, hidden.pk, missing]
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertLogs('core.approval_workflow', 'WARNING'):
+            response = self.decide(ids + [advanced.pk])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual([result['id'] for result in response.data['results']], ids)
+        self.assertEqual(self.outcomes(response), {
+            advanced.pk: 'advanced',
+            approved.pk: 'approved',
+            decided.pk: 'not_pending',
+            forbidden.pk: 'forbidden',
+            hidden.pk: 'not_found',
+            missing: 'not_found',
+        })
+        advanced.refresh_from_db()
+        self.assertEqual((advanced.status, advanced.current_approver_id), ('pending', self.head.pk))
+        approved.refresh_from_db()
+        self.assertEqual(approved.status, 'approved')
+        forbidden.refresh_from_db()
+        self.assertEqual(forbidden.status, 'pending')
+
+    def test_reject_sets_status_and_comments(self):
+        approvals = [self.proposal() for _ in range(3)]
+        ids = [approval.pk for approval in approvals]
+
+        response = self.decide(ids, 'reject', comments='لا')
+
+        self.assertEqual(set(self.outcomes(response).values()), {'rejected'})
+        self.assertEqual(
+            set(ApprovalRequest.objects.filter(pk__in=ids).values_list('status', 'comments')), {('rejected', 'لا')}
+        )
+        self.assertEqual(self.decide(ids, 'reject').data['updated'], 0)
+
+    def test_eligible_rows_are_locked(self):
+        approval = self.proposal()
+        with mock.patch.object(
+            QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update
+        ) as select_for_update:
+            self.decide([approval.pk], 'reject')
+        select_for_update.assert_called_once()
+        locked = select_for_update.call_args.args[0]
+        self.assertEqual(locked.model, ApprovalRequest)
+        # القفل على الطلبات المعلقة لهذا الموافق فقط، والطلب لم يعد معلقاً بعد البت فيه
+        self.assertEqual(list(locked), [])
+
+    def test_notifications_are_batched(self):
+        table = NotificationLog._meta.db_table
+        rejected = [self.proposal() for _ in range(5)]
+        with CaptureQueriesContext(connection) as captured:
+            self.decide([approval.pk for approval in rejected], 'reject')
+        inserts = [query for query in captured if query['sql'].startswith('INSERT') and table in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            NotificationLog.objects.filter(notification_type='approval_rejected', recipient=self.student).count(), 5
+        )
+
+        advanced = [self.proposal() for _ in range(3)]
+        with CaptureQueriesContext(connection) as captured:
+            self.decide([approval.pk for approval in advanced])
+        inserts = [query for query in captured if query['sql'].startswith('INSERT') and table in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            NotificationLog.objects.filter(notification_type='approval_request', recipient=self.head).count(), 3
+        )
+
+    def test_invalid_payloads_are_rejected(self):
+        approval = self.proposal()
+        self.assertEqual(self.decide([approval.pk], 'maybe').status_code, 400)
+        self.assertEqual(self.decide('1,2').status_code, 400)
+        self.assertEqual(self.decide([]).status_code, 400)
+        self.assertEqual(self.decide(list(range(1, 502))).status_code, 400)
+        approval.refresh_from_db()
+        self.assertEqual(approval.status, 'pending')
+
+
+@skipUnless(connection.features.has_select_for_update, 'requires SELECT ... FOR UPDATE')
+class ConcurrentBulkDecideTests(TransactionTestCase):
+    """
+    موافقة ورفض متزامنان لنفس الطلبات: كل طلب يُبت فيه مرة واحدة
+    """
+
+    def setUp(self):
+        self.approver = User.objects.create_user(username='approver')
+        self.ids = [
+            ApprovalRequest.objects.create(
+                approval_type='project_proposal', requested_by=self.approver, current_approver=self.approver
+            ).pk
+            for _ in range(10)
+        ]
+
+    def test_each_request_is_decided_once(self):
+        barrier = threading.Barrier(2)
+        responses, errors = [], []
+
+        def worker(decision):
+            try:
+                client = APIClient()
+                client.force_authenticate(self.approver)
+                barrier.wait()
+                responses.append(client.post(
+                    '/api/approvals/bulk-decide/', {'ids': self.ids, 'decision': decision}, format='json'
+                ))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(decision,)) for decision in ('approve', 'reject')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(response.data['updated'] for response in responses), len(self.ids))
+        decided = [
+            result['outcome'] for response in responses for result in response.data['results']
+            if result['outcome'] in ('approved', 'rejected')
+        ]
+        self.assertEqual(len(decided), len(self.ids))
+        self.assertEqual(
+            NotificationLog.objects.filter(notification_type__in=['approval_approved', 'approval_rejected']).count(),
+            len(self.ids)
+        )
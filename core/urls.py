@@ -5,7 +5,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     RoleViewSet, UserViewSet, GroupViewSet, GroupInvitationViewSet,
     ProjectViewSet, ApprovalRequestViewSet, NotificationViewSet,
-    dropdown_data, UserRolesViewSet
+    dropdown_data, UserRolesViewSet, job_runs_report
 )
 
 # إنشاء router للـ ViewSets
@@ -23,6 +23,7 @@ urlpatterns = [
     # API Endpoints
     path('', include(router.urls)),
     path('dropdown-data/', dropdown_data, name='dropdown-data'),
+    path('job-runs/', job_runs_report, name='job-runs'),
     
     # Custom Approval Actions
     path('approvals/<int:pk>/approve/', ApprovalRequestViewSet.as_view({'post': 'approve'}), name='approval-approve'),
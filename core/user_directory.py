@@ -0,0 +1,64 @@
+# core/user_directory.py
+
+from .models import UserRoles, AcademicAffiliation
+
+
+class UserDirectory:
+    """
+    دليل المستخدمين - يحمّل أدوار المستخدمين وانتماءهم الأكاديمي الحالي لدفعة كاملة
+    باستعلامين فقط مهما كان عدد المستخدمين، ويُشارك بين جميع الـ Serializers عبر الـ context
+    """
+
+    CONTEXT_KEY = 'user_directory'
+
+    def __init__(self):
+        self._roles = {}
+        self._affiliations = {}
+
+    @classmethod
+    def from_context(cls, context):
+        """
+        الحصول على الدليل المحفوظ في context الـ Serializer أو إنشاء دليل جديد
+        """
+        directory = context.get(cls.CONTEXT_KEY)
+        if directory is None:
+            directory = cls()
+            context[cls.CONTEXT_KEY] = directory
+        return directory
+
+    def load(self, users):
+        """
+        تحميل بيانات المستخدمين غير المحملين مسبقاً
+
+        Args:
+            users: مستخدمون أو معرفات مستخدمين
+        """
+        user_ids = {getattr(user, 'pk', user) for user in users if user is not None}
+        user_ids.discard(None)
+        user_ids -= self._roles.keys()
+        if not user_ids:
+            return
+
+        roles = {user_id: [] for user_id in user_ids}
+        for row in UserRoles.objects.filter(user_id__in=user_ids).values('user_id', 'role__role_ID', 'role__type'):
+            roles[row.pop('user_id')].append(row)
+
+        # الانتماء الحالي بنفس تعريف تسلسل الموافقات: الساري اليوم والأحدث تاريخ بداية
+        affiliations = dict.fromkeys(user_ids)
+        rows = AcademicAffiliation.objects.current().filter(user_id__in=user_ids).values(
+            'user_id', 'college_id', 'department_id'
+        )
+        for row in rows:
+            if affiliations[row['user_id']] is None:
+                affiliations[row['user_id']] = row
+
+        self._roles.update(roles)
+        self._affiliations.update(affiliations)
+
+    def get_roles(self, user):
+        self.load([user])
+        return self._roles.get(user.pk, [])
+
+    def get_affiliation(self, user):
+        self.load([user])
+        return self._affiliations.get(user.pk)
@@ -1,10 +1,11 @@
 # core/utils.py
 
 from django.utils import timezone
+from django.db import transaction, connection
 from datetime import timedelta
 from .models import NotificationLog, GroupInvitation, ApprovalRequest, SystemSettings
-from django.core.mail import send_mail
 from django.conf import settings
+from . import email_outbox
 
 # ==============================================================================
 # 1. دوال الإشعارات
@@ -22,70 +23,90 @@ class NotificationService:
         """
         إنشاء إشعار جديد
         """
-        notification = NotificationLog.objects.create(
-            recipient=recipient,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            related_group=related_group,
-            related_project=related_project,
-            related_user=related_user,
-            related_approval=related_approval,
-        )
-        
-        # إرسال البريد الإلكتروني (يمكن جعله async مع Celery)
-        NotificationService.send_email_notification(notification)
+        with transaction.atomic():
+            notification = NotificationLog.objects.create(
+                recipient=recipient,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                related_group=related_group,
+                related_project=related_project,
+                related_user=related_user,
+                related_approval=related_approval,
+            )
+            
+            # البريد يُرسل لاحقاً من صندوق البريد الصادر دون انتظار SMTP
+            NotificationService.send_email_notification(notification)
         
         return notification
     
     @staticmethod
     def send_email_notification(notification):
         """
-        إرسال إشعار عبر البريد الإلكتروني
+        إضافة بريد الإشعار إلى صندوق البريد الصادر (is_sent_email يُحدَّث بعد الإرسال الفعلي)
         """
-        try:
-            subject = f"[{notification.get_notification_type_display()}] {notification.title}"
-            message = f"{notification.message}\n\nتم الإرسال في: {notification.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
-            
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [notification.recipient.email],
-                fail_silently=True,
-            )
-            
-            notification.is_sent_email = True
-            notification.save()
-        except Exception as e:
-            print(f"خطأ في إرسال البريد: {str(e)}")
+        email_outbox.enqueue([notification])
+    
+    @staticmethod
+    def bulk_create_notifications(notifications):
+        """
+        إنشاء عدة إشعارات دفعة واحدة مع إضافة بريدها إلى صندوق البريد الصادر
+        (is_sent_email يُحدَّث بعد الإرسال الفعلي كما في send_email_notification)
+        """
+        from .notification_manager import NotificationManager
+        
+        with transaction.atomic():
+            created = NotificationManager.bulk_create_notifications(notifications)
+            # قواعد البيانات التي لا تعيد المعرفات من bulk_create (MySQL) تُقرأ معرفاتها
+            # حتى ترتبط صفوف الصندوق بإشعاراتها
+            if not connection.features.can_return_rows_from_bulk_insert:
+                NotificationService.fetch_created_ids(created)
+            email_outbox.enqueue(created)
+        return created
+    
+    @staticmethod
+    def fetch_created_ids(notifications):
+        """
+        تعيين المعرفات لإشعارات أُدرجت للتو بـ bulk_create بمطابقة (المستلم، وقت الإنشاء، العنوان)
+        وقت الإنشاء يُعيَّن لكل كائن قبل الإدراج بدقة الميكروثانية، والتكرار النادر لنفس
+        المفتاح يُوزَّع بترتيب المعرفات لأنه من نفس الإدراج
+        """
+        pending = [n for n in notifications if n.pk is None and n.recipient_id]
+        if not pending:
+            return notifications
+        
+        rows = NotificationLog.objects.filter(
+            recipient_id__in={n.recipient_id for n in pending},
+            created_at__gte=min(n.created_at for n in pending),
+            created_at__lte=max(n.created_at for n in pending),
+        ).order_by('notification_id').values_list('notification_id', 'recipient_id', 'created_at', 'title')
+        
+        ids = {}
+        for notification_id, recipient_id, created_at, title in rows:
+            ids.setdefault((recipient_id, created_at, title), []).append(notification_id)
+        for notification in pending:
+            matches = ids.get((notification.recipient_id, notification.created_at, notification.title))
+            if matches:
+                notification.pk = matches.pop(0)
+        return notifications
     
     @staticmethod
     def mark_as_read(notification_id, user):
         """
         تحديد الإشعار كمقروء
         """
-        try:
-            notification = NotificationLog.objects.get(
-                notification_id=notification_id,
-                recipient=user
-            )
-            notification.is_read = True
-            notification.read_at = timezone.now()
-            notification.save()
-            return True
-        except NotificationLog.DoesNotExist:
-            return False
+        from .notification_manager import NotificationManager
+        
+        return NotificationManager.mark_as_read(notification_id, user)
     
     @staticmethod
     def get_unread_count(user):
         """
         الحصول على عدد الإشعارات غير المقروءة
         """
-        return NotificationLog.objects.filter(
-            recipient=user,
-            is_read=False
-        ).count()
+        from .notification_counters import get_unread_count
+        
+        return get_unread_count(user)
     
     @staticmethod
     def get_user_notifications(user, limit=20):
@@ -216,23 +237,84 @@ class InvitationService:
         except GroupInvitation.DoesNotExist:
             return None, 'الدعوة غير موجودة'
     
+    @staticmethod
+    def expire_pending_invitations(now=None):
+        """
+        إنهاء صلاحية جميع الدعوات المعلقة المنتهية في تمريرة واحدة
+        
+        تُقفل معرفات الصفوف (status='pending' و expires_at < now) بـ select_for_update(skip_locked=True)
+        ثم تُحدَّث وتُقرأ بالمعرف، لذلك عند تشغيل عاملين في نفس الوقت يتخطى كل منهما صفوف
+        الآخر ولا يُعالج أي صف مرتين ولا يُرسل إشعاره مرتين
+        
+        Returns:
+            int: عدد الدعوات التي انتهت صلاحيتها في هذه التمريرة
+        """
+        from .notification_manager import NotificationManager
+        
+        now = now or timezone.now()
+        with transaction.atomic():
+            claimed_ids = list(GroupInvitation.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                expires_at__lt=now
+            ).values_list('invitation_id', flat=True))
+            if not claimed_ids:
+                return 0
+            
+            GroupInvitation.objects.filter(invitation_id__in=claimed_ids).update(
+                status='expired', responded_at=timezone.now()
+            )
+            expired_invitations = list(GroupInvitation.objects.filter(
+                invitation_id__in=claimed_ids
+            ).select_related('invited_student', 'invited_by', 'group'))
+            
+            # إشعار الطلاب المدعوين
+            NotificationManager.bulk_create_notifications(
+                NotificationLog(
+                    recipient=invitation.invited_student,
+                    notification_type='invitation_expired',
+                    title='انتهت صلاحية الدعوة',
+                    message=f'انتهت صلاحية دعوتك للانضمام إلى مجموعة "{invitation.group.group_name}"',
+                    related_group=invitation.group,
+                )
+                for invitation in expired_invitations
+            )
+            
+            # إشعار منشئي المجموعات
+            NotificationService.bulk_create_notifications(
+                NotificationLog(
+                    recipient=invitation.invited_by,
+                    notification_type='reminder',
+                    title='انتهت صلاحية الدعوة',
+                    message=f'انتهت صلاحية دعوة {invitation.invited_student.name} للانضمام إلى مجموعة {invitation.group.group_name}',
+                    related_group=invitation.group,
+                    related_user=invitation.invited_student,
+                )
+                for invitation in expired_invitations
+            )
+        
+        return len(expired_invitations)
+    
     @staticmethod
     def remove_from_pending_groups(user, accepted_group):
         """
         إزالة الطالب من جميع المجموعات المعلقة الأخرى
         """
-        pending_invitations = GroupInvitation.objects.filter(
+        pending_invitations = list(GroupInvitation.objects.filter(
             invited_student=user,
             status='pending'
-        ).exclude(group=accepted_group)
+        ).exclude(group=accepted_group).select_related('invited_by', 'group'))
         
-        for invitation in pending_invitations:
-            invitation.status = 'expired'
-            invitation.responded_at = timezone.now()
-            invitation.save()
-            
-            # إشعار منشئ المجموعة
-            NotificationService.create_notification(
+        if not pending_invitations:
+            return
+        
+        GroupInvitation.objects.filter(
+            invitation_id__in=[invitation.invitation_id for invitation in pending_invitations],
+            status='pending'
+        ).update(status='expired', responded_at=timezone.now())
+        
+        # إشعار منشئي المجموعات دفعة واحدة
+        NotificationService.bulk_create_notifications(
+            NotificationLog(
                 recipient=invitation.invited_by,
                 notification_type='message',
                 title=f'انسحاب من الدعوة',
@@ -240,6 +322,8 @@ class InvitationService:
                 related_group=invitation.group,
                 related_user=user,
             )
+            for invitation in pending_invitations
+        )
 
 
 # ==============================================================================
@@ -294,57 +378,45 @@ class ApprovalService:
         """
         الحصول على الموافق بناءً على مستوى الموافقة
         """
-        from .models import User, GroupSupervisors, Department
+        from .models import User, GroupSupervisors
+        from . import approval_workflow
         
-        if level == 1:  # المشرف
-            if group:
-                supervisor = GroupSupervisors.objects.filter(group=group).first()
-                return supervisor.user if supervisor else None
-        elif level == 2:  # رئيس القسم
-            if group:
-                department = group.project.department if hasattr(group.project, 'department') else None
-                if department:
-                    # هنا نحتاج إلى ربط رئيس القسم بالقسم
-                    # يمكنك إضافة حقل في نموذج Department
-                    pass
-        elif level == 3:  # العميد
-            pass
-        elif level == 4:  # رئيس الجامعة
-            pass
+        supervisor_id = None
+        if group:
+            supervisor_id = GroupSupervisors.objects.filter(group=group).values_list('user_id', flat=True).first()
         
-        return None
+        if level == approval_workflow.LEVEL_SUPERVISOR:  # المشرف
+            approver_id = supervisor_id
+        else:
+            # رئيس القسم / العميد / رئيس الجامعة من فهرس الموافقين حسب وحدة المشرف أو كلية المشروع
+            index = approval_workflow.get_index()
+            unit = index.unit_of(supervisor_id) if supervisor_id else None
+            if unit is None and project is not None and project.college_id:
+                unit = index.unit_of_college(project.college_id)
+            approver_id = index.approver_for(level, unit)
+        
+        return User.objects.filter(pk=approver_id).first() if approver_id else None
     
     @staticmethod
     def approve_request(approval_id, approver, comments=None):
         """
-        الموافقة على طلب
+        الموافقة على طلب: ينتقل إلى المستوى التالي في تسلسله أو يُعتمد نهائياً
         """
+        from . import approval_workflow
+        
         try:
-            approval = ApprovalRequest.objects.get(
+            approval = ApprovalRequest.objects.select_related('project', 'requested_by').get(
                 approval_id=approval_id,
                 current_approver=approver,
                 status='pending'
             )
-            
-            approval.status = 'approved'
-            approval.comments = comments
-            approval.approved_at = timezone.now()
-            approval.save()
-            
-            # إشعار الطالب/المجموعة
-            if approval.group:
-                NotificationService.create_notification(
-                    recipient=approval.requested_by,
-                    notification_type='approval',
-                    title=f'تمت الموافقة على الطلب',
-                    message=f'تمت الموافقة على طلب {approval.get_approval_type_display()} من قبل {approver.name}',
-                    related_group=approval.group,
-                    related_approval=approval,
-                )
-            
-            return approval, None
         except ApprovalRequest.DoesNotExist:
             return None, 'الطلب غير موجود'
+        
+        outcome = approval_workflow.approve([approval], approver, comments)[approval.approval_id]
+        if outcome == 'conflict':
+            return None, 'تم البت في الطلب مسبقاً'
+        return approval, None
     
     @staticmethod
     def reject_request(approval_id, approver, comments=None):
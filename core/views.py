@@ -2,29 +2,35 @@ from rest_framework import viewsets, status, filters, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db import models, transaction
-from django.db.models.functions import ExtractYear
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
     User, Group, GroupMembers, GroupSupervisors, GroupInvitation,
     Project, ApprovalRequest, Role, AcademicAffiliation,
-    GroupCreationRequest, GroupMemberApproval, NotificationLog, College, UserRoles
+    GroupCreationRequest, GroupMemberApproval, NotificationLog, College, UserRoles, JobRun,
+    check_and_finalize_group
 )
 from .serializers import (
     GroupSerializer, GroupDetailSerializer, GroupCreateSerializer,
     GroupMembersSerializer, GroupInvitationSerializer,
     CreateGroupInvitationSerializer, ProjectSerializer,
     ApprovalRequestSerializer, NotificationLogSerializer,
-    RoleSerializer, UserSerializer
+    RoleSerializer, UserSerializer, JobRunSerializer
 )
 from .serializers import UserRolesSerializer
 from .permissions import PermissionManager
+from .pagination import ProjectKeysetPagination, NotificationKeysetPagination
+from .filter_options import get_filter_options, invalidate_filter_options
+from . import notification_counters, notification_sync, job_runs, approval_workflow
 from .utils import InvitationService, NotificationService
-from core.notification_manager import NotificationManager
+from core.notification_manager import NotificationManager, ApprovalNotificationManager
 
 
 # ============================================================================================
@@ -35,6 +41,9 @@ class GroupViewSet(viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
 
+    def get_queryset(self):
+        return GroupSerializer.setup_eager_loading(Group.objects.all())
+
     def get_serializer_class(self):
         if self.action == 'create':
             return GroupCreateSerializer
@@ -53,6 +62,34 @@ class GroupViewSet(viewsets.ModelViewSet):
             "status": "pending"
         }, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    def _assign_users(model, group, user_ids, **fields):
+        """
+        Add users to a group in one IN query and one bulk insert
+        Returns the added, already present and unknown ids
+        """
+        with transaction.atomic():
+            in_group = dict(User.objects.filter(id__in=user_ids).annotate(
+                in_group=models.Exists(model.objects.filter(group=group, user=models.OuterRef('pk')))
+            ).values_list('id', 'in_group'))
+            added = [uid for uid in user_ids if in_group.get(uid) is False]
+            # ignore_conflicts covers a concurrent request adding the same user
+            model.objects.bulk_create(
+                [model(group=group, user_id=uid, **fields) for uid in added],
+                ignore_conflicts=True
+            )
+        return {
+            "added": added,
+            "existing": [uid for uid in user_ids if in_group.get(uid)],
+            "unknown": [uid for uid in user_ids if uid not in in_group],
+        }
+
+    @staticmethod
+    def _parse_ids(values):
+        if not isinstance(values, list):
+            values = [values]
+        return list(dict.fromkeys(int(value) for value in values))
+
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
         """Add members to a group"""
@@ -60,23 +97,34 @@ class GroupViewSet(viewsets.ModelViewSet):
             return Response({"error": "ليس لديك صلاحية إدارة المجموعة"}, status=status.HTTP_403_FORBIDDEN)
 
         group = self.get_object()
-        student_ids = request.data.get('student_ids', [])
-        for sid in student_ids:
-            user = get_object_or_404(User, id=sid)
-            GroupMembers.objects.get_or_create(user=user, group=group)
-        return Response({"message": "تم إضافة الأعضاء بنجاح"})
+        try:
+            student_ids = self._parse_ids(request.data.get('student_ids', []))
+        except (TypeError, ValueError):
+            return Response({"error": "student_ids يجب أن تكون أرقاماً"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = self._assign_users(GroupMembers, group, student_ids)
+        return Response({"message": f"تم إضافة {len(result['added'])} عضو", **result})
 
     @action(detail=True, methods=['post'])
     def add_supervisor(self, request, pk=None):
-        """Add supervisor to a group"""
+        """Add supervisors to a group (supervisor_ids, or a single supervisor_id)"""
         if not PermissionManager.is_admin(request.user):
             return Response({"error": "فقط الإدارة يمكنها تعيين مشرفين"}, status=status.HTTP_403_FORBIDDEN)
 
         group = self.get_object()
-        supervisor_id = request.data.get('supervisor_id')
-        supervisor = get_object_or_404(User, id=supervisor_id)
-        GroupSupervisors.objects.get_or_create(user=supervisor, group=group)
-        return Response({"message": "تم إضافة المشرف بنجاح"})
+        supervisor_type = request.data.get('type', 'supervisor')
+        if supervisor_type not in dict(GroupSupervisors.SUPERVISOR_TYPE_CHOICES):
+            return Response({"error": "نوع المشرف غير صالح"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            supervisor_ids = self._parse_ids(request.data.get('supervisor_ids', request.data.get('supervisor_id', [])))
+        except (TypeError, ValueError):
+            return Response({"error": "supervisor_ids يجب أن تكون أرقاماً"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = self._assign_users(GroupSupervisors, group, supervisor_ids, type=supervisor_type)
+        if result['added']:
+            # bulk_create لا يرسل post_save
+            invalidate_filter_options()
+        return Response({"message": f"تم إضافة {len(result['added'])} مشرف", **result})
 
     @action(detail=True, methods=['post'], url_path='add-member')
     def send_member_approval(self, request, pk=None):
@@ -103,9 +151,9 @@ class GroupViewSet(viewsets.ModelViewSet):
     def my_group(self, request):
         """Return the group the user belongs to"""
         user = request.user
-        group = Group.objects.filter(groupmembers__user=user).first()
+        group = GroupSerializer.setup_eager_loading(Group.objects.filter(groupmembers__user=user)).first()
         if group:
-            serializer = GroupDetailSerializer(group)
+            serializer = GroupDetailSerializer(group, context=self.get_serializer_context())
             return Response(serializer.data)
         return Response({"error": "أنت لست عضواً في أي مجموعة حالياً"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -120,9 +168,13 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        qs = GroupSerializer.setup_eager_loading(
+            ApprovalRequest.objects.select_related('requested_by', 'current_approver', 'group'),
+            prefix='group__'
+        )
         if PermissionManager.is_admin(user):
-            return ApprovalRequest.objects.all()
-        return ApprovalRequest.objects.filter(
+            return qs
+        return qs.filter(
             models.Q(requested_by=user) | models.Q(current_approver=user)
         ).distinct()
 
@@ -132,9 +184,17 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
         user = request.user
         if approval_request.current_approver != user:
             return Response({"error": "ليس لديك صلاحية الموافقة على هذا الطلب"}, status=status.HTTP_403_FORBIDDEN)
-        approval_request.status = 'approved'
-        approval_request.approved_at = timezone.now()
-        approval_request.save()
+        if approval_request.status != 'pending':
+            return Response({"error": "تم البت في هذا الطلب مسبقاً"}, status=status.HTTP_400_BAD_REQUEST)
+        outcome = approval_workflow.approve([approval_request], user, request.data.get('comments'))[approval_request.approval_id]
+        if outcome == 'conflict':
+            return Response({"error": "تم البت في هذا الطلب مسبقاً"}, status=status.HTTP_409_CONFLICT)
+        if outcome == 'advanced':
+            return Response({
+                "message": "تمت الموافقة وأُحيل الطلب إلى المستوى التالي",
+                "approval_level": approval_request.approval_level,
+                "current_approver": approval_request.current_approver_id,
+            }, status=status.HTTP_200_OK)
         return Response({"message": "تمت الموافقة على الطلب بنجاح"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -148,6 +208,64 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
         approval_request.save()
         return Response({"message": "تم رفض الطلب بنجاح"}, status=status.HTTP_200_OK)
 
+    # أقصى عدد طلبات في دفعة واحدة
+    BULK_DECISION_LIMIT = 500
+
+    @action(detail=False, methods=['post'], url_path='bulk-decide')
+    def bulk_decide(self, request):
+        """
+        Approve or reject many requests at once: {"ids": [...], "decision": "approve|reject", "comments": ""}
+        Returns an outcome per id: approved, advanced (forwarded to the next level),
+        rejected, not_pending, forbidden or not_found
+        """
+        user = request.user
+        decision = {'approve': 'approved', 'reject': 'rejected'}.get(request.data.get('decision'))
+        if decision is None:
+            return Response({"error": "decision يجب أن يكون approve أو reject"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = request.data.get('ids')
+        try:
+            if not isinstance(ids, list):
+                raise TypeError
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            return Response({"error": "ids يجب أن تكون قائمة أرقام"}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > self.BULK_DECISION_LIMIT:
+            return Response({"error": f"عدد الطلبات يجب أن يكون بين 1 و {self.BULK_DECISION_LIMIT}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        comments = request.data.get('comments')
+        with transaction.atomic():
+            eligible = ApprovalRequest.objects.filter(approval_id__in=ids, current_approver=user, status='pending')
+            # قفل الصفوف المؤهلة حتى لا يبت فيها طلب آخر بين القراءة والتحديث
+            decided = list(eligible.select_for_update())
+            if decision == 'approved':
+                # كل طلب ينتقل إلى المستوى التالي في تسلسله أو يُعتمد نهائياً
+                outcomes = approval_workflow.approve(decided, user, comments)
+            else:
+                now = timezone.now()
+                changes = {'status': decision, 'updated_at': now}
+                if 'comments' in request.data:
+                    changes['comments'] = comments
+                eligible.filter(approval_id__in=[approval.approval_id for approval in decided]).update(**changes)
+                for approval in decided:
+                    for field, value in changes.items():
+                        setattr(approval, field, value)
+                ApprovalNotificationManager.notify_approvals_decided(decided, user, decision)
+                outcomes = {approval.approval_id: decision for approval in decided}
+        remaining = [i for i in ids if i not in outcomes]
+        if remaining:
+            others = ApprovalRequest.objects.filter(approval_id__in=remaining)
+            if not PermissionManager.is_admin(user):
+                others = others.filter(models.Q(requested_by=user) | models.Q(current_approver=user))
+            for approval_id, approver_id in others.values_list('approval_id', 'current_approver_id'):
+                outcomes[approval_id] = 'forbidden' if approver_id != user.id else 'not_pending'
+
+        results = [{"id": i, "outcome": outcomes.get(i, 'not_found')} for i in ids]
+        return Response({
+            "decision": decision,
+            "updated": sum(1 for outcome in outcomes.values() if outcome in ('approved', 'advanced', 'rejected')),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
 
 # ============================================================================================
 # 3. GroupInvitationViewSet
@@ -159,10 +277,14 @@ class GroupInvitationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        qs = GroupSerializer.setup_eager_loading(
+            GroupInvitation.objects.select_related('invited_student', 'invited_by', 'group'),
+            prefix='group__'
+        )
         if PermissionManager.is_student(user):
-            return GroupInvitation.objects.filter(invited_student=user)
+            return qs.filter(invited_student=user)
         if PermissionManager.is_supervisor(user):
-            return GroupInvitation.objects.filter(invited_by=user)
+            return qs.filter(invited_by=user)
         return GroupInvitation.objects.none()
 
     def create(self, request, *args, **kwargs):
@@ -225,10 +347,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProjectFilter
     search_fields = ['title', 'description']
+    ordering_fields = ['start_date', 'title', 'project_id']
+    pagination_class = ProjectKeysetPagination
 
     def get_queryset(self):
         user = self.request.user
-        qs = Project.objects.all().order_by('-start_date')
+        qs = ProjectSerializer.setup_eager_loading(Project.objects.all()).order_by('-start_date')
         project_type = self.request.query_params.get("type")
         if project_type:
             qs = qs.filter(type=project_type)
@@ -241,34 +365,40 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='filter-options')
     def filter_options(self, request):
         try:
-            colleges = College.objects.values('cid', 'name_ar')
-            college_list = [{"id": c['cid'], "name": c['name_ar']} for c in colleges]
-
-            active_supervisors = User.objects.filter(groupsupervisors__isnull=False).distinct().values('id', 'first_name', 'last_name')
-            supervisor_list = [{"id": s['id'], "name": f"{s['first_name']} {s['last_name']}".strip() or "Unnamed Supervisor"} for s in active_supervisors]
-
-            years_qs = Project.objects.annotate(year=ExtractYear('start_date')).values_list('year', flat=True).distinct().order_by('-year')
-            years = [str(int(y)) for y in years_qs if y is not None]
-
-            return Response({
-                "colleges": college_list,
-                "supervisors": supervisor_list,
-                "years": years if years else ["2025"],
-                "types": list(Project.objects.values_list('type', flat=True).distinct()),
-                "states": list(Project.objects.values_list('state', flat=True).distinct())
-            })
+            return Response(get_filter_options())
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        إحصائيات المشاريع بنفس فلاتر القائمة دون تحميل الصفوف:
+        العدد الكلي والتوزيع حسب الحالة والنوع (لوحات التحكم والتقارير)
+        """
+        projects = Project.objects.filter(pk__in=self.filter_queryset(self.get_queryset()).values('pk'))
+
+        def breakdown(field):
+            rows = projects.order_by().values_list(field).annotate(total=models.Count('pk'))
+            return {value: total for value, total in rows}
+
+        states = breakdown('state')
+        return Response({
+            'count': sum(states.values()),
+            'states': states,
+            'types': breakdown('type'),
+        })
+
     @action(detail=False, methods=['get'])
     def my_project(self, request):
         user = request.user
         if not PermissionManager.is_student(user):
             return Response({'error': 'Unauthorized'}, status=403)
-        project = Project.objects.filter(group__groupmembers__user=user).first()
+        project = ProjectSerializer.setup_eager_loading(
+            Project.objects.filter(group__groupmembers__user=user)
+        ).first()
         if not project:
             return Response({'message': 'No project found'}, status=200)
-        return Response(ProjectSerializer(project).data)
+        return Response(ProjectSerializer(project, context=self.get_serializer_context()).data)
 
 
 # ============================================================================================
@@ -318,14 +448,78 @@ def dropdown_data(request):
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = NotificationLogSerializer
+    pagination_class = NotificationKeysetPagination
 
     def get_queryset(self):
-        return NotificationLog.objects.filter(recipient=self.request.user).order_by('-created_at')
+        return NotificationLog.objects.filter(recipient=self.request.user).select_related(
+            'recipient', 'related_user', 'related_group', 'related_approval'
+        ).order_by('-created_at')
+
+    @action(detail=False, methods=['get'], url_path='history')
+    def history(self, request):
+        """
+        سجل الإشعارات الكامل بما فيه الأرشيف (?cursor=... للصفحة التالية)
+        """
+        paginator = NotificationKeysetPagination()
+        cursor = paginator.decode_cursor(request)
+        before = (parse_datetime(str(cursor['v'])), cursor['pk']) if cursor else None
+        if before and before[0] is None:
+            raise NotFound(paginator.invalid_cursor_message)
+        page_size = paginator.get_page_size(request)
+
+        notifications = NotificationManager.get_user_notifications(request.user, limit=page_size, before=before)
+        models.prefetch_related_objects(notifications, 'recipient', 'related_user', 'related_group', 'related_approval')
+
+        next_link = None
+        if len(notifications) == page_size:
+            last = notifications[-1]
+            token = paginator.encode_cursor(last.created_at, last.notification_id, False)
+            next_link = replace_query_param(request.build_absolute_uri(), paginator.cursor_query_param, token)
+        return Response({
+            'next': next_link,
+            'results': self.get_serializer(notifications, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'], url_path='sync')
+    def sync(self, request):
+        """
+        التغييرات منذ رمز المزامنة ?since=... مع 304 إذا لم يتغير شيء
+        """
+        counts = notification_counters.get_counts(request.user)
+        etag = notification_sync.get_etag(request.user, counts)
+        since = request.query_params.get('since')
+        if since and etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        try:
+            changes = notification_sync.get_changes(request.user, since or None, counts=counts)
+        except ValueError:
+            return Response({'detail': 'invalid cursor'}, status=400)
+
+        # إذا بقيت تغييرات لم تُرسل لا تُعاد ETag حتى لا يُرد بـ 304 قبل استلامها
+        return Response({
+            'notifications': self.get_serializer(changes['notifications'], many=True).data,
+            'read_ids': changes['read_ids'],
+            'unread_count': counts['unread_count'],
+            'cursor': changes['cursor'],
+            'has_more': changes['has_more'],
+            'reset': changes['reset'],
+        }, headers={} if changes['has_more'] else {'ETag': etag})
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'count': NotificationManager.get_unread_count(request.user)})
+
+    @action(detail=True, methods=['post'], url_path='mark-read')
+    def mark_read(self, request, pk=None):
+        if not NotificationManager.mark_as_read(pk, request.user):
+            return Response({'detail': 'not found'}, status=404)
+        return Response({'status': 'success'})
 
     @action(detail=False, methods=['post'], url_path='mark-all-read')
     def mark_all_read(self, request):
-        self.get_queryset().update(status='read')
-        return Response({'status': 'success'})
+        count = NotificationManager.mark_all_as_read(request.user)
+        return Response({'status': 'success', 'count': count})
 
 
 # ============================================================================================
@@ -399,13 +593,59 @@ def get_all_users(request):
 
 
 # ============================================================================================
-# 10. Group creation & approval APIs
+# 10. Job runs
+# ============================================================================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_runs_report(request):
+    """
+    ملخص أداء المهام الدورية خلال آخر ?days= يوم وآخر التشغيلات (?job= لمهمة واحدة)
+    """
+    if not PermissionManager.is_admin(request.user):
+        return Response({"error": "فقط الإدارة يمكنها عرض تقرير المهام"}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        days = max(int(request.query_params.get('days', 7)), 1)
+        limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+    except ValueError:
+        return Response({"error": "days و limit يجب أن تكون أرقاماً"}, status=400)
+
+    runs = JobRun.objects.all()
+    job_name = request.query_params.get('job')
+    if job_name:
+        runs = runs.filter(job_name=job_name)
+
+    return Response({
+        "days": days,
+        "summary": job_runs.get_summary(days),
+        "runs": JobRunSerializer(runs[:limit], many=True).data,
+    })
+
+
+# ============================================================================================
+# 11. Group creation & approval APIs
 # ============================================================================================
 
 @api_view(['POST'])
 def submit_group_creation_request(request):
     data = request.data
     user = request.user
+    try:
+        # dict.fromkeys يحذف التكرار مع الحفاظ على الترتيب
+        student_ids = [i for i in dict.fromkeys(int(i) for i in data.get('student_ids', [])) if i != user.id]
+        supervisor_ids = list(dict.fromkeys(int(i) for i in data.get('supervisor_ids', [])))
+    except (TypeError, ValueError):
+        return Response({"error": "معرفات الطلاب والمشرفين يجب أن تكون أرقاماً"}, status=400)
+    if set(student_ids) & set(supervisor_ids):
+        return Response({"error": "لا يمكن إضافة نفس المستخدم كطالب ومشرف"}, status=400)
+
+    # التحقق من جميع المعرفات باستعلام واحد قبل أي كتابة
+    requested_ids = set(student_ids) | set(supervisor_ids)
+    unknown_ids = sorted(requested_ids - set(User.objects.filter(id__in=requested_ids).values_list('id', flat=True)))
+    if unknown_ids:
+        return Response({"error": "بعض المستخدمين غير موجودين", "unknown_ids": unknown_ids}, status=400)
+
     try:
         with transaction.atomic():
             group_request = GroupCreationRequest.objects.create(
@@ -415,26 +655,34 @@ def submit_group_creation_request(request):
                 college_id=data['college_id'],
                 note=data.get('note', '')
             )
-            GroupMemberApproval.objects.create(request=group_request, user=user, role='student', status='accepted', responded_at=timezone.now())
-            for student_id in data.get('student_ids', []):
-                if int(student_id) != user.id:
-                    member = GroupMemberApproval.objects.create(request=group_request, user_id=student_id, role='student')
-                    NotificationManager.create_notification(
-                        recipient=member.user,
+            GroupMemberApproval.objects.bulk_create(
+                [GroupMemberApproval(request=group_request, user=user, role='student', status='accepted', responded_at=timezone.now())]
+                + [GroupMemberApproval(request=group_request, user_id=student_id, role='student') for student_id in student_ids]
+                + [GroupMemberApproval(request=group_request, user_id=supervisor_id, role='supervisor') for supervisor_id in supervisor_ids]
+            )
+            # الطلب ليس ApprovalRequest، لذلك يُربط بالإشعار عبر related_items
+            related_items = {'kind': 'group_creation_request', 'items': [{'type': 'group_creation_request', 'id': group_request.id}]}
+            NotificationManager.bulk_create_notifications(
+                [
+                    NotificationLog(
+                        recipient_id=student_id,
                         notification_type='invitation',
                         title='دعوة انضمام لمجموعة',
                         message=f'دعاك {user.username} للانضمام لمجموعة {group_request.group_name}',
-                        related_approval_id=group_request.id
+                        related_items=related_items
+                    )
+                    for student_id in student_ids
+                ] + [
+                    NotificationLog(
+                        recipient_id=supervisor_id,
+                        notification_type='approval_request',
+                        title='طلب إشراف على مجموعة',
+                        message=f'طلب منك الطالب {user.username} الإشراف على مجموعة {group_request.group_name}',
+                        related_items=related_items
                     )
-            for supervisor_id in data.get('supervisor_ids', []):
-                member = GroupMemberApproval.objects.create(request=group_request, user_id=supervisor_id, role='supervisor')
-                NotificationManager.create_notification(
-                    recipient=member.user,
-                    notification_type='approval_request',
-                    title='طلب إشراف على مجموعة',
-                    message=f'طلب منك الطالب {user.username} الإشراف على مجموعة {group_request.group_name}',
-                    related_approval_id=group_request.id
-                )
+                    for supervisor_id in supervisor_ids
+                ]
+            )
             return Response({"message": "تم تقديم الطلب بنجاح وهو قيد انتظار موافقة الجميع", "request_id": group_request.id}, status=201)
     except Exception as e:
         return Response({"error": str(e)}, status=400)
@@ -453,7 +701,7 @@ def respond_to_group_request(request, approval_id):
         approval.save()
         message = "تمت الموافقة" if response_status == 'accepted' else "تم رفض الطلب"
         if response_status == 'accepted':
-            is_finalized = check_and_finalize_group(approval.request.id)
+            is_finalized = check_and_finalize_group(approval.request_id)
             if is_finalized:
                 message = "تمت الموافقة، واكتمل إنشاء المجموعة رسمياً!"
         return Response({"message": message})
@@ -1,37 +1,41 @@
 import React, { useState, useEffect } from 'react'; 
 import { useAuthStore } from '../../store/useStore';
 import Layout from '../../components/Layout';
-import { projectService, Project } from '../../services/projectService';
+import LoadMoreButton from '../../components/LoadMoreButton';
+import { projectService, Project, ProjectStats } from '../../services/projectService';
+import { useProjects } from '../../hooks/useProjects';
 import { FiPlus, FiEdit2, FiTrash2, FiClock, FiCheckCircle, FiActivity, FiInfo, FiCalendar } from 'react-icons/fi';
 
 const ExternalCompanyDashboard: React.FC = () => {
   const { user } = useAuthStore();
-  const [projects, setProjects] = useState<Project[]>([]);
-  const [loading, setLoading] = useState(false);
+  const { projects, isLoading, hasMore, loadMore, refetch, error } = useProjects();
+  const [stats, setStats] = useState<ProjectStats>({ count: 0, states: {}, types: {} });
   const [showForm, setShowForm] = useState(false);
   const [selectedProject, setSelectedProject] = useState<Project | null>(null);
   const [editingProject, setEditingProject] = useState<Project | null>(null);
   const [formData, setFormData] = useState({ title: '', description: '', type: 'external' });
+  const loading = isLoading && projects.length === 0;
 
   useEffect(() => {
-    fetchProjects();
+    projectService.getProjectStats().then(setStats);
   }, []);
 
-  const fetchProjects = async () => {
-    setLoading(true);
-    try {
-      const data = await projectService.getProjects(); // already uses trailing slash in service
-      setProjects(Array.isArray(data) ? data : []);
-      if (Array.isArray(data) && data.length > 0 && !selectedProject) {
-        setSelectedProject(data[0]);
-      }
-    } catch (error) {
+  useEffect(() => {
+    if (projects.length > 0 && !selectedProject) {
+      setSelectedProject(projects[0]);
+    }
+  }, [projects, selectedProject]);
+
+  useEffect(() => {
+    if (error) {
       console.error('Error fetching projects:', error);
       alert('فشل تحميل المشاريع. تحقق من اتصالك بالخادم.');
-      setProjects([]);
-    } finally {
-      setLoading(false);
     }
+  }, [error]);
+
+  const fetchProjects = () => {
+    refetch();
+    projectService.getProjectStats().then(setStats);
   };
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -97,21 +101,21 @@ const ExternalCompanyDashboard: React.FC = () => {
             <div className="p-3 bg-blue-50 rounded-xl text-blue-600"><FiActivity className="w-8 h-8" /></div>
             <div>
               <p className="text-gray-500 text-sm font-medium">إجمالي المقترحات</p>
-              <p className="text-3xl font-bold text-gray-900">{projects.length}</p>
+              <p className="text-3xl font-bold text-gray-900">{stats.count}</p>
             </div>
           </div>
           <div className="bg-white p-6 rounded-2xl shadow-sm border-b-4 border-green-500 flex items-center gap-4">
             <div className="p-3 bg-green-50 rounded-xl text-green-600"><FiCheckCircle className="w-8 h-8" /></div>
             <div>
               <p className="text-gray-500 text-sm font-medium">المشاريع المعتمدة</p>
-              <p className="text-3xl font-bold text-gray-900">{projects.filter(p => p.state === 'Approved').length}</p>
+              <p className="text-3xl font-bold text-gray-900">{stats.states.Approved || 0}</p>
             </div>
           </div>
           <div className="bg-white p-6 rounded-2xl shadow-sm border-b-4 border-purple-500 flex items-center gap-4">
             <div className="p-3 bg-purple-50 rounded-xl text-purple-600"><FiClock className="w-8 h-8" /></div>
             <div>
               <p className="text-gray-500 text-sm font-medium">قيد المراجعة</p>
-              <p className="text-3xl font-bold text-gray-900">{projects.filter(p => p.state === 'Pending Approval').length}</p>
+              <p className="text-3xl font-bold text-gray-900">{stats.states['Pending Approval'] || 0}</p>
             </div>
           </div>
         </div>
@@ -173,6 +177,7 @@ const ExternalCompanyDashboard: React.FC = () => {
                   </tbody>
                 </table>
               </div>
+              <LoadMoreButton hasMore={hasMore} isLoading={isLoading} onClick={loadMore} />
             </div>
           </div>
 
@@ -1,10 +1,10 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect } from 'react';
 import { FiSearch, FiChevronDown, FiX, FiInfo, FiCalendar, FiUser, FiBookOpen } from 'react-icons/fi';
 import { projectService } from '../../services/projectService';
+import { useProjects } from '../../hooks/useProjects';
+import LoadMoreButton from '../../components/LoadMoreButton';
 
 const ProjectSearch: React.FC = () => {
-  const [projects, setProjects] = useState<any[]>([]);
-  const [loading, setLoading] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
   
   // الفلاتر (التي كانت مفقودة في الرد السابق)
@@ -16,32 +16,23 @@ const ProjectSearch: React.FC = () => {
   const [selectedProject, setSelectedProject] = useState<any | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
 
-  // دالة البحث والفلترة المشتركة
-  const fetchProjects = useCallback(async (currentSearch: string, currentFilters: any) => {
-    setLoading(true);
-    try {
-      const params = {
-        search: currentSearch,
-        college: currentFilters.college,
-        supervisor: currentFilters.supervisor,
-        year: currentFilters.year,
-      };
-      const data = await projectService.getProjects(params);
-      setProjects(data);
-    } catch (err) {
-      console.error("Fetch Error:", err);
-    } finally {
-      setLoading(false);
-    }
-  }, []);
+  // معايير البحث المطبقة فعلاً: تتحدث بعد توقف الكتابة، وكل تغيير يعيد التحميل من الصفحة الأولى
+  const [params, setParams] = useState<any>({ search: '', college: '', supervisor: '', year: '' });
+  const { projects, isLoading, hasMore, loadMore } = useProjects(params);
+  const loading = isLoading && projects.length === 0;
 
   // تنفيذ البحث والفلترة اللحظية
   useEffect(() => {
     const timer = setTimeout(() => {
-      fetchProjects(searchQuery, filters);
+      setParams({
+        search: searchQuery,
+        college: filters.college,
+        supervisor: filters.supervisor,
+        year: filters.year,
+      });
     }, 400);
     return () => clearTimeout(timer);
-  }, [searchQuery, filters, fetchProjects]);
+  }, [searchQuery, filters]);
 
   // جلب خيارات الفلاتر عند البداية
   useEffect(() => {
@@ -139,6 +130,7 @@ const ProjectSearch: React.FC = () => {
           </div>
         ))}
       </div>
+      <LoadMoreButton hasMore={hasMore && !loading} isLoading={isLoading} onClick={loadMore} />
 
       {/* 4. مودال التفاصيل (Pop-up) */}
       {isModalOpen && selectedProject && (
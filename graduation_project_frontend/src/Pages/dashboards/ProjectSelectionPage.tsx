@@ -3,16 +3,14 @@ import {
   FiBriefcase, FiGlobe, FiPlusCircle, FiCheckCircle, 
   FiUsers, FiLock, FiAlertCircle, FiArrowLeft 
 } from 'react-icons/fi';
-import { projectService } from '../../services/projectService';
-import type { Project } from '../../services/projectService';
+import { useProjects } from '../../hooks/useProjects';
+import LoadMoreButton from '../../components/LoadMoreButton';
 import { groupService } from '../../services/groupService';
 import ProposeProjectForm from './ProposeProjectForm';
 import GroupForm from './GroupForm';
 
 const ProjectSelectionPage: React.FC = () => {
   const [selectedOption, setSelectedOption] = useState<'Government' | 'PrivateCompany' | 'StudentProposed'>('Government');
-  const [projects, setProjects] = useState<Project[]>([]);
-  const [loading, setLoading] = useState(true);
   const [userGroup, setUserGroup] = useState<any>(null);
   const [isGroupLoading, setIsGroupLoading] = useState(true);
   const [isGroupFormOpen, setIsGroupFormOpen] = useState(false);
@@ -38,21 +36,12 @@ const ProjectSelectionPage: React.FC = () => {
     }
   }, []);
 
-  const fetchProjects = useCallback(async (type: string) => {
-    if (type === 'StudentProposed') { setLoading(false); return; }
-    setLoading(true);
-    try {
-      const data = await projectService.getProjects({ type: type as any });
-      setProjects(data);
-    } catch {
-      console.error("خطأ في جلب المشاريع");
-    } finally {
-      setLoading(false);
-    }
-  }, []);
+  // المشاريع تُحمّل صفحة بصفحة بعد معرفة المجموعة، ولا تُحمّل لخيار المشروع المقترح
+  const projectsEnabled = !isGroupLoading && selectedOption !== 'StudentProposed';
+  const { projects, isLoading, hasMore, loadMore } = useProjects({ type: selectedOption }, projectsEnabled);
+  const loading = isGroupLoading || (isLoading && projects.length === 0);
 
   useEffect(() => { fetchUserGroup(); }, [fetchUserGroup]);
-  useEffect(() => { if (!isGroupLoading) fetchProjects(selectedOption); }, [selectedOption, fetchProjects, isGroupLoading]);
 
   const handleLinkProject = async (projectId: number) => {
     if (!userGroup?.group_id) return;
@@ -173,6 +162,9 @@ const ProjectSelectionPage: React.FC = () => {
               </div>
             );
           })}
+          <div className="col-span-full">
+            <LoadMoreButton hasMore={hasMore && !loading} isLoading={isLoading} onClick={loadMore} />
+          </div>
         </div>
       )}
 
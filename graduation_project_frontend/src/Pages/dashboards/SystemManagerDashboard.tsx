@@ -36,7 +36,7 @@ const SystemManagerDashboard: React.FC = () => {
 
   const [users, setUsers] = useState<any[]>([]);
   const [roles, setRoles] = useState<any[]>([]);
-  const [projects, setProjects] = useState<any[]>([]);
+  const [projectsCount, setProjectsCount] = useState(0);
   const [groups, setGroups] = useState<any[]>([]);
 
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
@@ -51,17 +51,17 @@ const SystemManagerDashboard: React.FC = () => {
   ========================== */
   useEffect(() => {
     const fetchData = async () => {
-      const [fetchedUsers, fetchedRoles, fetchedProjects, fetchedGroups] =
+      const [fetchedUsers, fetchedRoles, projectStats, fetchedGroups] =
         await Promise.all([
           userService.getAllUsers(),
           roleService.getAllRoles(),
-          projectService.getProject(),
+          projectService.getProjectStats(),
           groupService.getGroups()
         ]);
 
       setUsers(fetchedUsers);
       setRoles(fetchedRoles);
-      setProjects(fetchedProjects);
+      setProjectsCount(projectStats.count);
       setGroups(fetchedGroups);
     };
 
@@ -87,7 +87,7 @@ const SystemManagerDashboard: React.FC = () => {
       },
       {
         title: 'المشاريع',
-        value: projects.length,
+        value: projectsCount,
         icon: <FiLayers />,
         gradient: 'from-yellow-400 to-yellow-600'
       },
@@ -105,7 +105,7 @@ const SystemManagerDashboard: React.FC = () => {
         isNotification: true
       }
     ];
-  }, [users, roles, projects, groups, unreadCount]);
+  }, [users, roles, projectsCount, groups, unreadCount]);
 
   /* ==========================
      Render Management Content
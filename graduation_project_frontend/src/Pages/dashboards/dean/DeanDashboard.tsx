@@ -40,9 +40,9 @@ const DeanDashboard: React.FC = () => {
   const fetchDashboardStats = async () => {
     setLoading(true);
     try {
-      const [groups, projects, approvals, allUsers] = await Promise.all([
+      const [groups, projectStats, approvals, allUsers] = await Promise.all([
         groupService.getGroups(),
-        projectService.getProjects(),
+        projectService.getProjectStats(),
         approvalService.getApprovals(),
         userService.getAllUsers()
       ]);
@@ -62,7 +62,7 @@ const DeanDashboard: React.FC = () => {
       ).length;
 
       setStats({
-        projects: Array.isArray(projects) ? projects.length : 0,
+        projects: projectStats.count,
         supervisors: supervisorsCount,
         coSupervisors: coSupervisorsCount,
         groups: Array.isArray(groups) ? groups.length : 0,
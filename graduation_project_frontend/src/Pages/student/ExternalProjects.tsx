@@ -1,19 +1,11 @@
-import React, { useEffect, useState } from "react";
-import { projectService } from "../../services/projectService";
+import React from "react";
 import { useLocation } from "react-router-dom";
+import { useProjects } from "../../hooks/useProjects";
+import LoadMoreButton from "../../components/LoadMoreButton";
 
 const ExternalProjects = () => {
-  const [projects, setProjects] = useState([]);
   const type = new URLSearchParams(useLocation().search).get("type");
-
-  const load = async () => {
-    const data = await projectService.getProjects({ type });
-    setProjects(data);
-  };
-
-  useEffect(() => {
-    load();
-  }, [type]);
+  const { projects, isLoading, hasMore, loadMore } = useProjects({ type });
 
   return (
     <div className="p-6" dir="rtl">
@@ -35,6 +27,7 @@ const ExternalProjects = () => {
           </div>
         ))}
       </div>
+      <LoadMoreButton hasMore={hasMore} isLoading={isLoading} onClick={loadMore} />
     </div>
   );
 };
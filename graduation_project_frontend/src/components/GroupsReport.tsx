@@ -1,6 +1,5 @@
 import React, { useEffect, useState } from "react";
 import { groupService } from "../services/groupService";
-import { projectService } from "../services/projectService";
 
 const PRIMARY = "#4F46E5"; // Indigo
 const ACCENT = "#10B981";  // Emerald
@@ -10,6 +9,7 @@ interface Group {
   id: number;
   group_name: string;
   project?: number | null;
+  project_title?: string | null;
   students?: any[];
   supervisors?: any[];
   co_supervisors?: any[];
@@ -18,25 +18,15 @@ interface Group {
 
 const GroupsReport: React.FC = () => {
   const [groups, setGroups] = useState<Group[]>([]);
-  const [projectsMap, setProjectsMap] = useState<Record<number, string>>({});
   const [loading, setLoading] = useState(true);
   const [barWidths, setBarWidths] = useState<number[]>([]);
 
   useEffect(() => {
     const fetchData = async () => {
-      const [groupsData, projectsData] = await Promise.all([
-        groupService.getGroups(),
-        projectService.getProject(),
-      ]);
+      const groupsData = await groupService.getGroups();
 
       setGroups(Array.isArray(groupsData) ? groupsData : []);
 
-      const map: Record<number, string> = {};
-      (projectsData || []).forEach((p: any) => {
-        if (p?.project_id) map[p.project_id] = p.title;
-      });
-      setProjectsMap(map);
-
       // Animate bars
       const maxCount = Math.max(
         ...(groupsData || []).map(
@@ -158,7 +148,7 @@ const GroupsReport: React.FC = () => {
                 <tr key={g.id} className="hover:bg-slate-50 text-center">
                   <td className="p-2 border">{g.id}</td>
                   <td className="p-2 border font-semibold">{g.group_name}</td>
-                  <td className="p-2 border">{g.project ? projectsMap[g.project] || "غير مرتبط" : "—"}</td>
+                  <td className="p-2 border">{g.project ? g.project_title || "غير مرتبط" : "—"}</td>
                   <td className="p-2 border">{g.students?.length || 0}</td>
                   <td className="p-2 border">{g.supervisors?.length || 0}</td>
                   <td className="p-2 border">{g.co_supervisors?.length || 0}</td>
@@ -1,11 +1,11 @@
 import React, { useEffect, useState } from 'react';
 import { groupService } from '../services/groupService';
-import { projectService } from '../services/projectService';
 
 interface Group {
   id: number;
   group_name: string;
   project?: number | null;
+  project_title?: string | null;
   students?: { id: number; name: string }[];
   supervisors?: { id: number; name: string }[];
   co_supervisors?: { id: number; name: string }[];
@@ -14,34 +14,20 @@ interface Group {
 
 const GroupsTable: React.FC = () => {
   const [groups, setGroups] = useState<Group[]>([]);
-  const [projectsMap, setProjectsMap] = useState<Record<number, string>>({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
   /* ==========================
-     Fetch Groups + Projects
+     Fetch Groups
   ========================== */
   useEffect(() => {
     const fetchData = async () => {
       try {
         setLoading(true);
 
-        const [groupsData, projectsData] = await Promise.all([
-          groupService.getGroups(),
-          projectService.getProject()
-        ]);
-
-        // تأمين البيانات القادمة
+        // عنوان المشروع يصل مع كل مجموعة (project_title) فلا حاجة لتحميل كل المشاريع
+        const groupsData = await groupService.getGroups();
         setGroups(Array.isArray(groupsData) ? groupsData : []);
-
-        // Map المشاريع (project_id => title)
-        const map: Record<number, string> = {};
-        (projectsData || []).forEach((p: any) => {
-          if (p?.project_id) {
-            map[p.project_id] = p.title;
-          }
-        });
-        setProjectsMap(map);
       } catch (err) {
         console.error(err);
         setError('فشل تحميل بيانات المجموعات');
@@ -113,7 +99,7 @@ const GroupsTable: React.FC = () => {
 
               <td className="p-2 border">
                 {group.project
-                  ? projectsMap[group.project] || 'غير مرتبط'
+                  ? group.project_title || 'غير مرتبط'
                   : '—'}
               </td>
 
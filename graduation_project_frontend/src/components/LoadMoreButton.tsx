@@ -0,0 +1,25 @@
+import React from 'react';
+
+interface LoadMoreButtonProps {
+  hasMore: boolean;
+  isLoading: boolean;
+  onClick: () => void;
+}
+
+// زر تحميل الصفحة التالية من قائمة مُرقّمة بالمفتاح؛ يختفي عند آخر صفحة
+const LoadMoreButton: React.FC<LoadMoreButtonProps> = ({ hasMore, isLoading, onClick }) => {
+  if (!hasMore) return null;
+  return (
+    <div className="flex justify-center py-4">
+      <button
+        onClick={onClick}
+        disabled={isLoading}
+        className="px-6 py-2 bg-white border border-slate-200 rounded-xl text-sm font-bold text-slate-700 hover:bg-slate-50 transition-all shadow-sm disabled:opacity-50"
+      >
+        {isLoading ? 'جاري التحميل...' : 'تحميل المزيد'}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMoreButton;
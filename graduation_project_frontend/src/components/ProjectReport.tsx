@@ -1,27 +1,23 @@
 import React, { useEffect, useState } from "react";
-import { projectService, Project } from "../services/projectService";
+import { projectService, ProjectStats } from "../services/projectService";
+import { useProjects } from "../hooks/useProjects";
+import LoadMoreButton from "./LoadMoreButton";
 
 const ProjectReport: React.FC = () => {
-  const [projects, setProjects] = useState<Project[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [stats, setStats] = useState<ProjectStats | null>(null);
+  const { projects, hasMore, isLoading, loadMore } = useProjects();
 
   useEffect(() => {
-    projectService.getProject().then(data => {
-      setProjects(data || []);
-      setLoading(false);
-    });
+    projectService.getProjectStats().then(setStats);
   }, []);
 
-  if (loading) {
+  if (!stats) {
     return <div className="p-6 text-center">جاري تحميل التقرير...</div>;
   }
 
-  const total = projects.length;
-
-  const stateCounts: Record<string, number> = {};
-  projects.forEach(p => {
-    stateCounts[p.state] = (stateCounts[p.state] || 0) + 1;
-  });
+  // الأعداد من الخادم لكل المشاريع، والجدول يُحمّل صفحة بصفحة
+  const total = stats.count;
+  const stateCounts = stats.states;
 
   const maxValue = Math.max(...Object.values(stateCounts), 1);
 
@@ -98,6 +94,7 @@ const ProjectReport: React.FC = () => {
             </tbody>
           </table>
         </div>
+        <LoadMoreButton hasMore={hasMore} isLoading={isLoading} onClick={loadMore} />
       </div>
 
     </div>
@@ -1,45 +1,36 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { FiFileText, FiDownload, FiFilter, FiSearch, FiPrinter, FiLayers } from 'react-icons/fi';
-import { projectService, Project } from '../services/projectService';
+import { projectService, ProjectStats } from '../services/projectService';
+import { useProjects } from '../hooks/useProjects';
+import LoadMoreButton from './LoadMoreButton';
 
 const ProjectReportPage: React.FC = () => {
-  const [projects, setProjects] = useState<Project[]>([]);
-  const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [stateFilter, setStateFilter] = useState('all');
   const [typeFilter, setTypeFilter] = useState('all');
+  const [projectStats, setProjectStats] = useState<ProjectStats>({ count: 0, states: {}, types: {} });
+
+  // الفلاتر تُطبّق في الخادم حتى تشمل كل المشاريع وليس الصفحات المحمّلة فقط
+  const params = useMemo(() => {
+    const query: Record<string, string> = {};
+    if (searchTerm) query.search = searchTerm;
+    if (stateFilter !== 'all') query.state = stateFilter;
+    if (typeFilter !== 'all') query.type = typeFilter;
+    return query;
+  }, [searchTerm, stateFilter, typeFilter]);
+
+  const { projects: filteredProjects, isLoading: loading, hasMore, loadMore } = useProjects(params);
 
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        // Using getProjects() from the updated service
-        const data = await projectService.getProjects();
-        setProjects(Array.isArray(data) ? data : []);
-      } catch (error) {
-        console.error('Error fetching projects:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchData();
+    projectService.getProjectStats().then(setProjectStats);
   }, []);
 
-  const filteredProjects = useMemo(() => {
-    return projects.filter(p => {
-      const matchesSearch = p.title?.toLowerCase().includes(searchTerm.toLowerCase()) || 
-                           p.description?.toLowerCase().includes(searchTerm.toLowerCase());
-      const matchesState = stateFilter === 'all' || p.state === stateFilter;
-      const matchesType = typeFilter === 'all' || p.type === typeFilter;
-      return matchesSearch && matchesState && matchesType;
-    });
-  }, [projects, searchTerm, stateFilter, typeFilter]);
-
   const stats = useMemo(() => ({
-    total: projects.length,
-    approved: projects.filter(p => p.state?.toLowerCase() === 'approved').length,
-    pending: projects.filter(p => p.state?.toLowerCase() === 'pending').length,
-    types: Array.from(new Set(projects.map(p => p.type))).length
-  }), [projects]);
+    total: projectStats.count,
+    approved: projectStats.states.Accepted || 0,
+    pending: projectStats.states.Pending || 0,
+    types: Object.keys(projectStats.types).length
+  }), [projectStats]);
 
   const handleExport = () => {
     const headers = ['Project ID,Title,Type,State,Supervisor,College,Year'];
@@ -115,9 +106,9 @@ const ProjectReportPage: React.FC = () => {
               onChange={(e) => setStateFilter(e.target.value)}
             >
               <option value="all">كل الحالات</option>
-              <option value="approved">معتمد</option>
-              <option value="pending">قيد الانتظار</option>
-              <option value="rejected">مرفوض</option>
+              <option value="Accepted">معتمد</option>
+              <option value="Pending">قيد الانتظار</option>
+              <option value="Rejected">مرفوض</option>
             </select>
           </div>
           <div className="flex items-center gap-2 bg-slate-50 px-3 rounded-xl">
@@ -128,7 +119,7 @@ const ProjectReportPage: React.FC = () => {
               onChange={(e) => setTypeFilter(e.target.value)}
             >
               <option value="all">كل الأنواع</option>
-              {Array.from(new Set(projects.map(p => p.type))).map(type => (
+              {Object.keys(projectStats.types).map(type => (
                 <option key={type} value={type}>{type}</option>
               ))}
             </select>
@@ -150,7 +141,7 @@ const ProjectReportPage: React.FC = () => {
               </tr>
             </thead>
             <tbody className="divide-y divide-slate-50">
-              {loading ? (
+              {loading && filteredProjects.length === 0 ? (
                 <tr><td colSpan={5} className="px-6 py-12 text-center text-slate-400 font-bold italic">جاري جلب البيانات من النظام...</td></tr>
               ) : filteredProjects.length === 0 ? (
                 <tr><td colSpan={5} className="px-6 py-12 text-center text-slate-400 font-bold italic">لا توجد مشاريع تطابق معايير البحث الحالية</td></tr>
@@ -190,6 +181,7 @@ const ProjectReportPage: React.FC = () => {
             </tbody>
           </table>
         </div>
+        <LoadMoreButton hasMore={hasMore} isLoading={loading} onClick={loadMore} />
       </div>
     </div>
   );
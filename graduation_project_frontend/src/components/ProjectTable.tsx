@@ -1,6 +1,8 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useMemo, useState } from 'react';
 import { projectService, Project } from '../services/projectService';
 import { userService, User } from '../services/userService';
+import { useProjects } from '../hooks/useProjects';
+import LoadMoreButton from './LoadMoreButton';
 import { FiDownload } from 'react-icons/fi';
 
 interface ProjectWithUsers extends Project {
@@ -8,38 +10,25 @@ interface ProjectWithUsers extends Project {
 }
 
 const ProjectsTable: React.FC = () => {
-  const [projects, setProjects] = useState<ProjectWithUsers[]>([]);
-  const [loading, setLoading] = useState(true);
+  const { projects: pageProjects, isLoading, hasMore, loadMore } = useProjects();
+  const [allUsers, setAllUsers] = useState<User[]>([]);
 
   useEffect(() => {
-    const fetchProjects = async () => {
-      setLoading(true);
-      try {
-        const fetchedProjects = await projectService.getProject();
-        
-        // Optional: fetch users for each project (if available)
-        // Here assuming each project has a users array or we map manually
-        const projectsWithUsers: ProjectWithUsers[] = await Promise.all(
-          fetchedProjects.map(async (proj: any) => {
-            // Example: get all users and filter by project id if API allows
-            // If your project API includes users directly, you can skip this
-            const allUsers: User[] = await userService.getAllUsers();
-            const projectUsers = allUsers.filter(u => u.roles.some(r => r.type === proj.type));
-            return { ...proj, users: projectUsers };
-          })
-        );
-
-        setProjects(projectsWithUsers);
-      } catch (err) {
-        console.error('Failed to fetch projects:', err);
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchProjects();
+    // المستخدمون يُحمّلون مرة واحدة ويُربطون بكل صفحة مشاريع تصل
+    userService.getAllUsers()
+      .then(setAllUsers)
+      .catch(err => console.error('Failed to fetch users:', err));
   }, []);
 
+  const projects: ProjectWithUsers[] = useMemo(
+    () => pageProjects.map(proj => ({
+      ...proj,
+      users: allUsers.filter(u => u.roles.some(r => r.type === proj.type)),
+    })),
+    [pageProjects, allUsers]
+  );
+  const loading = isLoading && projects.length === 0;
+
   if (loading) return <div className="p-6 text-center">Loading projects...</div>;
 
   if (projects.length === 0) return <div className="p-6 text-center">لا توجد مشاريع</div>;
@@ -85,6 +74,7 @@ const ProjectsTable: React.FC = () => {
           ))}
         </tbody>
       </table>
+      <LoadMoreButton hasMore={hasMore} isLoading={isLoading} onClick={loadMore} />
     </div>
   );
 };
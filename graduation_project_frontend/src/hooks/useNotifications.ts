@@ -18,11 +18,11 @@ export const useNotifications = () => {
 
     fetchNotifications();
 
-    // بدء Polling للإشعارات الجديدة
-    const stopPolling = notificationService.startPolling(5000);
+    // استقبال الإشعارات الجديدة عبر WebSocket (مع Polling احتياطي عند الانقطاع)
+    const disconnect = notificationService.connect();
 
     return () => {
-      stopPolling();
+      disconnect();
     };
   }, []);
 
@@ -0,0 +1,51 @@
+import { useState, useEffect, useCallback, useRef } from 'react';
+import { projectService, Project } from '../services/projectService';
+
+// تحميل المشاريع صفحة بصفحة عند الطلب: الصفحة الأولى عند تغيّر الفلاتر، والتالية عبر loadMore
+export const useProjects = (params?: any, enabled: boolean = true) => {
+  const [projects, setProjects] = useState<Project[]>([]);
+  const [next, setNext] = useState<string | null>(null);
+  const [isLoading, setIsLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  // يتجاهل ردود طلبات قديمة وصلت بعد تغيّر الفلاتر
+  const requestId = useRef(0);
+  const paramsKey = JSON.stringify(params || {});
+
+  const fetchPage = useCallback(async (cursor: string | null) => {
+    const id = ++requestId.current;
+    // الصفحة الأولى تبدأ قائمة جديدة: لا تُعرض نتائج فلاتر سابقة أثناء التحميل
+    if (!cursor) setProjects([]);
+    setIsLoading(true);
+    try {
+      const page = await projectService.getProjectsPage(JSON.parse(paramsKey), cursor);
+      if (id !== requestId.current) return;
+      setProjects(prev => (cursor ? [...prev, ...page.results] : page.results));
+      setNext(page.next);
+      setError(null);
+    } catch (err: any) {
+      if (id === requestId.current) setError(err.message);
+    } finally {
+      if (id === requestId.current) setIsLoading(false);
+    }
+  }, [paramsKey]);
+
+  const refetch = useCallback(() => fetchPage(null), [fetchPage]);
+
+  const loadMore = useCallback(() => {
+    if (next && !isLoading) fetchPage(next);
+  }, [next, isLoading, fetchPage]);
+
+  useEffect(() => {
+    if (enabled) refetch();
+  }, [enabled, refetch]);
+
+  return {
+    projects,
+    setProjects,
+    hasMore: next !== null,
+    isLoading,
+    error,
+    loadMore,
+    refetch,
+  };
+};
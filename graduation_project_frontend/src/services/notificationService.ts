@@ -71,17 +71,87 @@ export const notificationService = {
     }
   },
 
-  // 6. بدء Polling
+  // 6. الاتصال بـ WebSocket لمزامنة الإشعارات فور إنشائها
+  // يعود إلى Polling تلقائياً إذا انقطع الاتصال أو تعذر فتحه
+  connect(fallbackInterval: number = 30000) {
+    const token = localStorage.getItem("access_token");
+    if (!token) return () => {};
+
+    const apiBase = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000/api/";
+    const wsUrl = new URL('/ws/notifications/', apiBase);
+    wsUrl.protocol = wsUrl.protocol === 'https:' ? 'wss:' : 'ws:';
+    wsUrl.searchParams.set('token', token);
+
+    let stopPolling: (() => void) | null = null;
+    let closed = false;
+    const state = { cursor: null as string | null, etag: null as string | null };
+    const socket = new WebSocket(wsUrl.toString());
+
+    // الخادم يرسل تنبيه "sync" فقط، والإشعارات نفسها تُجلب من نقطة المزامنة
+    const sync = () => this.syncNotifications(state).catch(() => {});
+    socket.onopen = sync;
+    socket.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data);
+        if (data.type === 'sync') sync();
+      } catch (error) {}
+    };
+
+    socket.onclose = () => {
+      if (!closed && !stopPolling) {
+        stopPolling = this.startPolling(fallbackInterval);
+      }
+    };
+
+    return () => {
+      closed = true;
+      socket.close();
+      if (stopPolling) stopPolling();
+    };
+  },
+
+  // 7. مزامنة التغييرات فقط منذ آخر رمز (304 إذا لم يتغير شيء)
+  async syncNotifications(state: { cursor: string | null; etag: string | null }) {
+    const token = localStorage.getItem("access_token");
+    if (!token) return;
+
+    const headers: Record<string, string> = { 'Authorization': `Bearer ${token}` };
+    if (state.etag) headers['If-None-Match'] = state.etag;
+
+    const response = await api.get('/notifications/sync/', {
+      params: state.cursor ? { since: state.cursor } : {},
+      headers,
+      validateStatus: (status) => status === 200 || status === 304,
+    });
+    if (response.status === 304) return;
+
+    const store = useNotificationsStore.getState();
+    const { notifications, read_ids, unread_count, cursor, reset } = response.data;
+    if (!state.cursor || reset) {
+      // أول مزامنة أو حُذفت إشعارات منذ المزامنة السابقة: القائمة كاملة من الخادم
+      store.setNotifications(notifications);
+    } else {
+      // قد تُعاد إشعارات استُلمت سابقاً (المعتمدة متأخرة)، فالدمج بالمعرف والترتيب تنازلياً
+      const readIds = new Set<number>(read_ids);
+      const known = new Set(notifications.map((n: any) => n.notification_id));
+      store.setNotifications([
+        ...notifications,
+        ...store.notifications
+          .filter((n) => !known.has(n.notification_id))
+          .map((n) => (readIds.has(n.notification_id) ? { ...n, is_read: true } : n)),
+      ].sort((a, b) => b.notification_id - a.notification_id));
+    }
+    store.setUnreadCount(unread_count);
+    state.cursor = cursor;
+    state.etag = response.headers['etag'] || null;
+  },
+
+  // 8. بدء Polling
   startPolling(interval: number = 5000) {
+    const state = { cursor: null as string | null, etag: null as string | null };
     const pollInterval = setInterval(async () => {
-      const token = localStorage.getItem("access_token");
-      if (!token) return;
-
       try {
-        const notifications = await this.getNotifications();
-        if (Array.isArray(notifications)) {
-           useNotificationsStore.getState().setNotifications(notifications);
-        }
+        await this.syncNotifications(state);
       } catch (error) {}
     }, interval);
 
@@ -14,25 +14,43 @@ export interface Project {
   logo?: string;
 }
 
+export interface ProjectPage {
+  results: Project[];
+  next: string | null;
+}
+
+export interface ProjectStats {
+  count: number;
+  states: Record<string, number>;
+  types: Record<string, number>;
+}
+
 export const projectService = {
+  // القائمة مُرقّمة بالمفتاح (cursor): صفحة واحدة في كل طلب، ورابط next يحمل نفس الفلاتر ورمز الصفحة التالية
+  async getProjectsPage(params?: any, next?: string | null): Promise<ProjectPage> {
+    const response = next ? await api.get(next) : await api.get('/projects/', { params });
+    if (Array.isArray(response.data)) return { results: response.data, next: null };
+    return { results: response.data.results || [], next: response.data.next || null };
+  },
+
+  // الصفحة الأولى فقط: للمزيد استخدم getProjectsPage مع next أو useProjectPages
   async getProjects(params?: any) {
     try {
-      const response = await api.get('/projects/', { params });
-      return response.data;
+      return (await projectService.getProjectsPage(params)).results;
     } catch (error) {
       console.error('Failed to fetch projects:', error);
       return [];
     }
   },
 
-  async getProject() {
+  // الأعداد الكلية (لوحات التحكم والتقارير) تُحسب في الخادم بدلاً من تحميل كل المشاريع
+  async getProjectStats(params?: any): Promise<ProjectStats> {
     try {
-      const response = await api.get('/projects/');
-      console.log('Projects fetched:', response.data);
+      const response = await api.get('/projects/stats/', { params });
       return response.data;
     } catch (error) {
-      console.error('Failed to fetch projects:', error);
-      return [];
+      console.error('Failed to fetch project stats:', error);
+      return { count: 0, states: {}, types: {} };
     }
   },
 
@@ -30,18 +30,22 @@ interface UniversityStore {
   universities: University[];
   colleges: College[];
   projects: Project[];
+  // رابط الصفحة التالية من ترقيم المشاريع بالمفتاح (null عند آخر صفحة)
+  projectsNext: string | null;
   supervisors: Supervisor[];
   isLoading: boolean;
   fetchUniversities: () => Promise<void>;
   fetchColleges: () => Promise<void>;
   fetchProjects: () => Promise<void>;
+  fetchMoreProjects: () => Promise<void>;
   fetchSupervisors: () => Promise<void>;
 }
 
-export const useUniversityStore = create<UniversityStore>((set) => ({
+export const useUniversityStore = create<UniversityStore>((set, get) => ({
   universities: [],
   colleges: [],
   projects: [],
+  projectsNext: null,
   supervisors: [],
   isLoading: false,
 
@@ -72,8 +76,22 @@ export const useUniversityStore = create<UniversityStore>((set) => ({
   fetchProjects: async () => {
     set({ isLoading: true });
     try {
-      const res = await axios.get(`${API_BASE_URL}/projects`);
-      set({ projects: res.data });
+      const res = await axios.get(`${API_BASE_URL}/projects/`);
+      set({ projects: res.data.results, projectsNext: res.data.next });
+    } catch (err) {
+      console.error("Failed to fetch projects:", err);
+    } finally {
+      set({ isLoading: false });
+    }
+  },
+
+  fetchMoreProjects: async () => {
+    const next = get().projectsNext;
+    if (!next || get().isLoading) return;
+    set({ isLoading: true });
+    try {
+      const res = await axios.get(next);
+      set({ projects: [...get().projects, ...res.data.results], projectsNext: res.data.next });
     } catch (err) {
       console.error("Failed to fetch projects:", err);
     } finally {